@@ -8,6 +8,8 @@ const API_ENDPOINT = "http://localhost:8000";
 const AGENT_ENDPOINT = `${API_ENDPOINT}/chat_stream`;
 /** @constant {string} Models endpoint */
 const MODELS_ENDPOINT = `${API_ENDPOINT}/models`;
+/** @constant {string} Conversation id, letting the server reuse work across chat turns */
+const SESSION_ID = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
 
 /** @constant {Object} Default issues with descriptions, keywords, and resolutions */
 const DEFAULT_ISSUES = {
@@ -118,7 +120,8 @@ export const initChatbot = () => {
                     known_issues: workspaces[currentWorkspace],
                     model: currentModel,
                     logs: allLogs,
-                    log_id: currentLogId
+                    log_id: currentLogId,
+                    session_id: SESSION_ID
                 })
             });
 
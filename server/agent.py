@@ -1,13 +1,45 @@
 import json
+import logging
 from utils import (
     get_log_level_counts,
     compute_stats,
     get_simple_stats,
     clean_response_content,
+    stats_interval,
 )
+from anomaly import detect_anomalies
 from model_client.model_client import ModelClient
+from metrics import span
+from offload import run_blocking
+from router import IntentRouter
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
+# Routing decisions (as named by the router) and their keys in the planner response.
+PLAN_DECISIONS = {
+    "summary": "generate_summary",
+    "issues": "evaluate_issues",
+    "filter": "add_filter",
+}
+
+_DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "decision": {"type": "boolean"},
+        "explanation": {"type": "string"},
+    },
+    "required": ["decision", "explanation"],
+    "additionalProperties": False,
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {key: _DECISION_SCHEMA for key in PLAN_DECISIONS.values()},
+    "required": list(PLAN_DECISIONS.values()),
+    "additionalProperties": False,
+}
+
 
 class ChatAgent:
     """
@@ -18,20 +50,177 @@ class ChatAgent:
         model (ModelClient): The model client used for chat completions.
         base_prompt (str): The base prompt string used as a template for generating prompts.
         stats (Any): Statistics computed from log levels.
+        anomalies (list[dict] | None): Ranked level bursts with their top message templates.
+        simple_stats (dict | None): Overall level counts and common keywords.
+        router (IntentRouter | None): Local router tried before the LLM for yes/no decisions.
+        routes (dict[str, str]): Route taken per decision ("local" or "llm").
     """
 
-    def __init__(self, model: ModelClient, base_prompt: str):
+    def __init__(
+        self,
+        model: ModelClient,
+        base_prompt: str,
+        stored_stats: dict[str, Any] | None = None,
+        router: IntentRouter | None = None,
+    ):
         """
         Initialize the ChatAgent with a model and a base prompt.
 
         Args:
             model (ModelClient): An instance of ModelClient to handle chat completions.
             base_prompt (str): The base prompt to be prepended to every generated prompt.
+            stored_stats (dict[str, Any] | None, optional): Statistics materialized at ingest
+                (see utils.compute_log_stats). When given, they are used instead of
+                recomputing the statistics from the logs.
+            router (IntentRouter | None, optional): Local intent router used to answer
+                confident yes/no decisions without an LLM call.
         """
 
         self.model = model
         self.base_prompt = base_prompt
         self.stats = None
+        self.anomalies = None
+        self.simple_stats = None
+        self.router = router
+        self.routes: dict[str, str] = {}
+        if stored_stats:
+            self.stats = stored_stats.get("level_stats")
+            self.anomalies = stored_stats.get("anomalies")
+            self.simple_stats = stored_stats.get("simple_stats")
+
+    async def _ensure_stats(self, logs: list[dict[str, Any]]):
+        """
+        Compute the level statistics and anomalies from the logs unless they are already known.
+
+        The computation runs on the CPU executor so it doesn't block the event loop.
+
+        Args:
+            logs (list[dict[str, Any]]): A list of log entries.
+        """
+
+        if self.stats is not None and self.anomalies is not None:
+            return
+
+        def compute() -> tuple[Any, Any]:
+            # Buckets coarsen with the length of the log (see utils.stats_interval).
+            interval = stats_interval(logs)
+            level_counts = get_log_level_counts(logs, interval)
+            stats = (
+                self.stats if self.stats is not None else compute_stats(level_counts)
+            )
+            anomalies = (
+                self.anomalies
+                if self.anomalies is not None
+                else detect_anomalies(level_counts, logs, interval)
+            )
+            return stats, anomalies
+
+        with span("stats", rows=len(logs)):
+            self.stats, self.anomalies = await run_blocking(compute)
+
+    async def _route_locally(
+        self, decision: str, message: str
+    ) -> tuple[bool, str] | None:
+        """
+        Ask the local router for a decision and record which route was taken.
+
+        Args:
+            decision (str): Decision name ("summary", "issues" or "filter").
+            message (str): The user query.
+
+        Returns:
+            tuple[bool, str] | None: The local decision and explanation, or None if the LLM should decide.
+        """
+
+        routed = None
+        if self.router is not None:
+            routed = await run_blocking(self.router.route, decision, message)
+        self.routes[decision] = "local" if routed else "llm"
+        return routed
+
+    async def plan(
+        self, message: str, logs: list[dict[str, Any]]
+    ) -> dict[str, tuple[bool, str]]:
+        """
+        Make the summary, issue and filter decisions for a query with at most one model call.
+
+        Decisions the local router is confident about are answered locally. The rest are
+        requested together in a single structured (JSON) model call. Any decision missing
+        from that response falls back to its dedicated yes/no prompt.
+
+        The filter decision is based on the query alone; callers should reconsider it
+        with decide_filter once issues have been detected.
+
+        Args:
+            message (str): The user query.
+            logs (list[dict[str, Any]]): A list of log entries.
+
+        Returns:
+            dict[str, tuple[bool, str]]: Decision and explanation for "summary", "issues"
+            and "filter". The route taken for each is recorded in self.routes
+            ("local", "planner" or "llm").
+        """
+
+        decisions: dict[str, tuple[bool, str]] = {}
+        for decision in PLAN_DECISIONS:
+            routed = await self._route_locally(decision, message)
+            if routed:
+                decisions[decision] = routed
+        pending = [decision for decision in PLAN_DECISIONS if decision not in decisions]
+        if not pending:
+            return decisions
+
+        stats_section = ""
+        if "summary" in pending:
+            await self._ensure_stats(logs)
+            stats_section = f"""Log Statistics:
+{json.dumps(self.stats, default=str, indent=2)}
+
+Detected Anomalies (per-level bursts, most significant first):
+{json.dumps(self.anomalies, default=str)}
+
+"""
+        instructions = {
+            "summary": '- generate_summary: true if additional context is needed and a summary of the log statistics would be helpful; false if the query is specific (e.g. "filter for debug logs").',
+            "issues": '- evaluate_issues: true only if the query asks for detecting issues or problems in the logs; false for specific queries (e.g. "generate me a summary", "filter for debug logs") that do not mention problems or issues.',
+            "filter": '- add_filter: true if the query implies filtering (e.g. "show only errors", "filter out debug logs") or mentions keywords/regex; false otherwise.',
+        }
+        prompt = f"""{self.base_prompt}
+{stats_section}User Query: {message}
+
+Decide which steps are needed to answer the query:
+{chr(10).join(instructions[decision] for decision in PLAN_DECISIONS)}
+
+Respond with a JSON object in the following format, with a brief explanation for each decision:
+{{
+  "generate_summary": {{"decision": boolean, "explanation": string}},
+  "evaluate_issues": {{"decision": boolean, "explanation": string}},
+  "add_filter": {{"decision": boolean, "explanation": string}}
+}}
+Do not include any extra text.
+"""
+        try:
+            response = await self.model.structured_completion(prompt, PLAN_SCHEMA)
+        except Exception:
+            logger.exception("Error requesting plan")
+            response = {}
+
+        fallbacks = {
+            "summary": lambda: self.decide_summary(message, logs),
+            "issues": lambda: self.evaluate_decision(message),
+            "filter": lambda: self.decide_filter(message, {}),
+        }
+        for decision in pending:
+            entry = response.get(PLAN_DECISIONS[decision])
+            if isinstance(entry, dict) and isinstance(entry.get("decision"), bool):
+                decisions[decision] = (
+                    entry["decision"],
+                    str(entry.get("explanation", "")).strip(),
+                )
+                self.routes[decision] = "planner"
+            else:
+                decisions[decision] = await fallbacks[decision]()
+        return decisions
 
     async def decide_summary(
         self, message: str, logs: list[dict[str, Any]]
@@ -39,9 +228,11 @@ class ChatAgent:
         """
         Decide whether a summary should be generated for the given user message and logs.
 
-        The method computes log level statistics, incorporates them into a prompt,
+        The method computes log level statistics and anomalies (or reuses the stored ones),
+        incorporates them into a prompt,
         and asks the model to decide if a summary is needed. The response must be in a specific
-        one-line format ("yes: explanation" or "no: explanation").
+        one-line format ("yes: explanation" or "no: explanation"). A confident answer from the
+        local router skips the model call.
 
         Args:
             message (str): The user query message.
@@ -52,14 +243,21 @@ class ChatAgent:
                               (True for yes, False for no), and the second element contains the brief explanation.
         """
 
-        level_counts = get_log_level_counts(logs)
-        self.stats = compute_stats(level_counts)
+        routed = await self._route_locally("summary", message)
+        if routed:
+            return routed
+
+        await self._ensure_stats(logs)
         stats_str = json.dumps(self.stats, default=str, indent=2)
+        anomalies_str = json.dumps(self.anomalies, default=str)
 
         prompt = f"""{self.base_prompt}
 Log Statistics:
 {stats_str}
 
+Detected Anomalies (per-level bursts, most significant first):
+{anomalies_str}
+
 User Query: {message}
 
 Should a summary be generated?
@@ -74,7 +272,7 @@ no: [brief explanation]
 Do not include any extra text.
 """
         response = await self.model.chat_completion(prompt)
-        print("Response:", response)
+        logger.debug("Summary decision response: %s", response)
         if response:
             try:
                 cleaned = response.strip()
@@ -93,7 +291,7 @@ Do not include any extra text.
         """
         Generate a summary of the log statistics based on the user query.
 
-        If the statistics haven't been computed yet, they are computed from the provided logs.
+        If the statistics haven't been computed or stored yet, they are computed from the provided logs.
         A prompt is built with the log statistics and the user query, and the model is asked to provide
         a summary. Additionally, simple log statistics are returned.
 
@@ -106,20 +304,25 @@ Do not include any extra text.
             and the second element is a dictionary containing simple log statistics.
         """
 
-        if self.stats is None:
-            level_counts = get_log_level_counts(logs)
-            self.stats = compute_stats(level_counts)
+        await self._ensure_stats(logs)
         stats_str = json.dumps(self.stats, default=str, indent=2)
+        anomalies_str = json.dumps(self.anomalies, default=str)
 
         prompt = f"""{self.base_prompt}
 Log Statistics:
 {stats_str}
 
+Detected Anomalies (per-level bursts, most significant first):
+{anomalies_str}
+
 User Query: {message}
 
 Generate a summary of the log statistics. Respond with just the explanation:"""
         summary = await self.model.chat_completion(prompt)
-        return summary, get_simple_stats(logs)
+        if self.simple_stats is None:
+            with span("simple_stats", rows=len(logs)):
+                self.simple_stats = await run_blocking(get_simple_stats, logs)
+        return summary, self.simple_stats
 
     async def evaluate_decision(self, message: str) -> tuple[bool, str]:
         """
@@ -127,6 +330,7 @@ Generate a summary of the log statistics. Respond with just the explanation:"""
 
         Constructs a prompt with the user query and instructions on when to detect issues, and expects
         a one-line response in the format "yes: <brief explanation>" or "no: <brief explanation>".
+        A confident answer from the local router skips the model call.
 
         Args:
             message (str): The user query.
@@ -136,6 +340,10 @@ Generate a summary of the log statistics. Respond with just the explanation:"""
             searched for, and the second element is a brief explanation provided by the model.
         """
 
+        routed = await self._route_locally("issues", message)
+        if routed:
+            return routed
+
         prompt = f"""{self.base_prompt}
 User Query: {message}
 
@@ -169,6 +377,7 @@ no: [brief explanation]
         details: str | dict,
         message: str,
         similar_logs: list[dict[str, Any]],
+        similar_incidents: list[dict[str, Any]] | None = None,
     ) -> str:
         """
         Evaluate a known issue against the logs and user query to decide if it should be flagged.
@@ -176,26 +385,37 @@ no: [brief explanation]
         Constructs a prompt that includes the issue, its details, a set of similar logs, and the user query.
         The model should respond with either a detailed issue summary and resolution in the specified format,
         or an empty string if the issue should not be flagged. Note that if the details JSON does not have a
-        'logs' field or it is empty, an empty string should be returned.
+        'logs' field or it is empty, an empty string should be returned. The details may carry
+        'surrounding_logs', the raw lines around each matched log (see context_index).
 
         Args:
             issue (str): The title or identifier of the known issue.
             details (str | dict): Details about the issue, can be a JSON string or a dictionary.
             message (str): The user query.
             similar_logs (list[dict[str, Any]]): A list of log entries that are similar to the issue.
+            similar_incidents (list[dict[str, Any]] | None, optional): Similar entries from other
+                stored logs, each with its 'log_id'. Defaults to None.
 
         Returns:
             str: A formatted string with the issue summary and resolution if flagged, or an empty string otherwise.
         """
 
+        incidents = ""
+        if similar_incidents:
+            incidents = f"""
+Similar Logs From Previous Captures (same caveat; 'log_id' names the capture, which may be a past occurrence of this issue):
+{json.dumps(similar_incidents, indent=2)}
+"""
         prompt = f"""{self.base_prompt}
 Known Issue: "{issue}"
 Issue Details:
 {json.dumps(details, indent=2)}
 
+The "surrounding_logs" field holds, for each category, windows of raw log lines around the lines in "logs" (their rows are listed in "hits"); use them to judge the conditions leading up to and following each match.
+
 Similar Logs (note that these are done through a simple semantic search, and is very prone to not being relevant):
 {json.dumps(similar_logs, indent=2)}
-
+{incidents}
 User Query: {message}
 
 Based on the above, should this issue be flagged?
@@ -207,7 +427,8 @@ If yes, respond in the following format:
 Else, respond with an empty string.
 Note: if the details json does not have a logs field or the logs field is empty, respond with an empty string.
 """
-        print("Prompt:", prompt)
+        # Prompts include the extracted logs, so only dump them when debugging.
+        logger.debug("Issue evaluation prompt: %s", prompt)
         return await self.model.chat_completion(prompt)
 
         # New method to decide if a filter should be added.
@@ -220,7 +441,8 @@ Note: if the details json does not have a logs field or the logs field is empty,
 
         The prompt instructs the model to analyze the user query and the detected issues (with their keywords),
         and decide if a filter is appropriate. The expected response is a single line in the format:
-        "yes: <brief explanation>" or "no: <brief explanation>".
+        "yes: <brief explanation>" or "no: <brief explanation>". A confident answer from the local
+        router skips the model call, except for a "no" when issues were detected.
 
         Args:
             message (str): The user query.
@@ -231,6 +453,13 @@ Note: if the details json does not have a logs field or the logs field is empty,
             and the second element is the explanation provided by the model.
         """
 
+        routed = await self._route_locally("filter", message)
+        # Detected issues usually carry keywords worth filtering on, so only trust a
+        # local "no" when nothing was detected.
+        if routed and (routed[0] or not detected_issues):
+            return routed
+        self.routes["filter"] = "llm"
+
         prompt = f"""{self.base_prompt}
 User Query: {message}
 
@@ -0,0 +1,215 @@
+import math
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any
+from histogram import LOG_LEVELS, parse_timestamp
+from sketch import log_template
+
+# After this many consecutive empty buckets the EWMA state is effectively back at
+# zero, so longer gaps are not walked bucket by bucket.
+_MAX_GAP_STEPS = 200
+
+
+class LevelBurstDetector:
+    """
+    Streaming EWMA/z-score burst detector for one log level.
+
+    Each bucket count is scored against the exponentially weighted mean and
+    variance of the buckets before it, then folded into them. The standard
+    deviation is floored at 1 so sparse levels (e.g. a handful of errors) do not
+    produce infinite scores.
+
+    Attributes:
+        alpha (float): EWMA smoothing factor.
+        mean (float): Current weighted mean of the bucket counts.
+        var (float): Current weighted variance of the bucket counts.
+    """
+
+    def __init__(self, alpha: float = 0.1, mean: float = 0.0):
+        """
+        Initialize the detector.
+
+        Args:
+            alpha (float, optional): EWMA smoothing factor. Defaults to 0.1.
+            mean (float, optional): Initial expected count per bucket. The initial
+                variance is set to the same value (Poisson). Defaults to 0.
+        """
+
+        self.alpha = alpha
+        self.mean = mean
+        self.var = mean
+
+    def score(self, count: int) -> tuple[float, float]:
+        """
+        Score a bucket count, then update the state with it.
+
+        Args:
+            count (int): Number of logs of this level in the bucket.
+
+        Returns:
+            tuple[float, float]: The z-score and the expected (mean) count before the update.
+        """
+
+        expected = self.mean
+        z_score = (count - expected) / max(math.sqrt(self.var), 1.0)
+        diff = count - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+        return z_score, expected
+
+
+def detect_anomalies(
+    level_counts: dict[datetime, dict[str, int]],
+    logs: list[dict] | None = None,
+    interval: timedelta = timedelta(seconds=1),
+    alpha: float = 0.1,
+    threshold: float = 4.0,
+    min_count: int = 3,
+    top: int = 10,
+    templates_per_window: int = 3,
+) -> list[dict[str, Any]]:
+    """
+    Find bursts in per-level log counts and describe them compactly.
+
+    Buckets are walked in time order (empty buckets count as zero) with one
+    LevelBurstDetector per level, so the cost is linear in the number of buckets.
+    Each detector starts from the level's average count per bucket over the whole
+    log, so the first buckets are not flagged just for being non-zero.
+    Consecutive anomalous buckets of the same level are merged into a window and
+    windows are ranked by their peak z-score.
+
+    Args:
+        level_counts (dict): Output of utils.get_log_level_counts (datetime buckets).
+        logs (list[dict] | None, optional): The logs, used to find the most common
+            message templates in each window. Defaults to None (no templates).
+        interval (timedelta, optional): Bucket width used for level_counts. Defaults to 1 second.
+        alpha (float, optional): EWMA smoothing factor. Defaults to 0.1.
+        threshold (float, optional): z-score above which a bucket is anomalous. Defaults to 4.0.
+        min_count (int, optional): Minimum bucket count to be anomalous. Defaults to 3.
+        top (int, optional): Maximum number of windows returned. Defaults to 10.
+        templates_per_window (int, optional): Templates reported per window. Defaults to 3.
+
+    Returns:
+        list[dict]: Windows as {"level", "start", "end", "count", "expected",
+        "z_score", "top_templates"}, most significant first.
+    """
+
+    if not level_counts:
+        return []
+
+    ordered = sorted(level_counts)
+    span = round((ordered[-1] - ordered[0]) / interval) + 1
+    detectors = {
+        level: LevelBurstDetector(
+            alpha, sum(counts.get(level, 0) for counts in level_counts.values()) / span
+        )
+        for level in LOG_LEVELS
+    }
+    open_windows: dict[str, dict[str, Any]] = {}
+    windows: list[dict[str, Any]] = []
+    previous: datetime | None = None
+
+    def close(level: str):
+        window = open_windows.pop(level, None)
+        if window is not None:
+            windows.append(window)
+
+    for bucket in ordered:
+        if previous is not None:
+            gap = round((bucket - previous) / interval) - 1
+            if gap > 0:
+                for level in LOG_LEVELS:
+                    close(level)
+                    for _ in range(min(gap, _MAX_GAP_STEPS)):
+                        detectors[level].score(0)
+        previous = bucket
+
+        counts = level_counts[bucket]
+        for level in LOG_LEVELS:
+            count = counts.get(level, 0)
+            z_score, expected = detectors[level].score(count)
+            if count >= min_count and z_score >= threshold:
+                window = open_windows.get(level)
+                if window is None:
+                    window = open_windows[level] = {
+                        "level": level,
+                        "start": bucket,
+                        "end": bucket + interval,
+                        "count": 0,
+                        "expected": 0.0,
+                        "z_score": 0.0,
+                    }
+                window["end"] = bucket + interval
+                window["count"] += count
+                window["expected"] += expected
+                window["z_score"] = max(window["z_score"], z_score)
+            else:
+                close(level)
+    for level in LOG_LEVELS:
+        close(level)
+
+    windows.sort(key=lambda window: window["z_score"], reverse=True)
+    windows = windows[:top]
+    if logs:
+        _attach_templates(windows, logs, templates_per_window)
+    for window in windows:
+        window.setdefault("top_templates", [])
+        window["start"] = _format(window["start"])
+        window["end"] = _format(window["end"])
+        window["expected"] = round(window["expected"], 2)
+        window["z_score"] = round(window["z_score"], 2)
+    return windows
+
+
+def _format(moment: datetime) -> str:
+    """Format a bucket boundary the same way log timestamps are written."""
+
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _attach_templates(windows: list[dict], logs: list[dict], limit: int):
+    """
+    Add the most common message templates of each window's level and time range.
+
+    Logs whose timestamp strings are already in order (the usual case) are
+    searched with bisect per window; otherwise a single scan over all logs is made.
+    """
+
+    for window in windows:
+        window["top_templates"] = []
+    if not windows:
+        return
+
+    counters = [Counter() for _ in windows]
+    is_sorted = all(
+        a["timestamp"] <= b["timestamp"] for a, b in zip(logs, islice(logs, 1, None))
+    )
+    if is_sorted:
+
+        def key(log):
+            return parse_timestamp(log["timestamp"])
+
+        for window, counter in zip(windows, counters):
+            lo = bisect_left(logs, window["start"], key=key)
+            hi = bisect_left(logs, window["end"], key=key)
+            for log in logs[lo:hi]:
+                if log["level"] == window["level"]:
+                    counter.update(log_template(m) for m in log["messages"])
+    else:
+        for log in logs:
+            moment = parse_timestamp(log["timestamp"])
+            for window, counter in zip(windows, counters):
+                if (
+                    log["level"] == window["level"]
+                    and window["start"] <= moment < window["end"]
+                ):
+                    counter.update(log_template(m) for m in log["messages"])
+
+    for window, counter in zip(windows, counters):
+        window["top_templates"] = [
+            {"template": template, "count": count}
+            for template, count in counter.most_common(limit)
+        ]
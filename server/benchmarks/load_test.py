@@ -0,0 +1,305 @@
+"""
+Drive concurrent chat, upload and catalog sessions against the server and report latencies.
+
+Against a running server (e.g. started with FAKE_MODEL=true ES_BACKEND=memory):
+
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 16
+
+Or start the server in-process with the fake model and the in-memory Elasticsearch:
+
+    python -m benchmarks.load_test --serve --concurrency 16 --duration 60
+
+Each worker repeatedly picks a session type by weight: POST /chat_stream (the full
+SSE stream, with time to first event), POST /table/{id} (upload) or GET /table
+(catalog). The report has p50/p95/p99 latency per session type, time to first event
+for chats and throughput, and can be written to JSON for capacity planning.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any
+import httpx
+from benchmarks.synthetic_logs import generate_logs
+
+SESSION_TYPES = ("chat", "upload", "list")
+
+CHAT_MESSAGES = [
+    "Can you generate a summary for my logs?",
+    "Can you look for potential issues in my logs?",
+    "Show only errors.",
+    "What went wrong here?",
+]
+
+# The client's default "Virtual Background Detection Issue" keywords.
+KNOWN_ISSUES = {
+    "Virtual Background Detection Issue": {
+        "description": "The virtual background feature fails to detect the user.",
+        "keywords": {
+            "wmlhost": ["wmlhost.exe", "failed to launch"],
+            "error": ["1260", "MediaProcessFailedToLaunchByPolicy"],
+        },
+        "conditions": "Software restriction policies block the media process.",
+        "resolution": "Allow wmlhost.exe to run in the group policy settings.",
+    }
+}
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """
+    Return the q-th percentile (0-100) of the values by the nearest-rank method.
+    """
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples: list[dict[str, Any]], elapsed: float) -> dict[str, Any]:
+    """
+    Aggregate session samples into per-type latency percentiles and throughput.
+
+    Args:
+        samples (list[dict]): One dict per session with 'type', 'ok', 'latency_ms' and,
+            for chats, 'ttfe_ms' (time to first event).
+        elapsed (float): Wall time of the run in seconds.
+
+    Returns:
+        dict: Report with 'elapsed_s', 'throughput_per_s' and one entry per session type.
+    """
+
+    report: dict[str, Any] = {
+        "elapsed_s": round(elapsed, 3),
+        "sessions": len(samples),
+        "throughput_per_s": round(len(samples) / elapsed, 3) if elapsed else None,
+    }
+    for session_type in SESSION_TYPES:
+        typed = [s for s in samples if s["type"] == session_type]
+        if not typed:
+            continue
+        latencies = [s["latency_ms"] for s in typed if s["ok"]]
+        entry: dict[str, Any] = {
+            "count": len(typed),
+            "errors": sum(1 for s in typed if not s["ok"]),
+            "throughput_per_s": round(len(typed) / elapsed, 3) if elapsed else None,
+        }
+        for q in (50, 95, 99):
+            entry[f"p{q}_ms"] = percentile(latencies, q)
+        ttfe = [s["ttfe_ms"] for s in typed if s["ok"] and "ttfe_ms" in s]
+        if ttfe:
+            for q in (50, 95, 99):
+                entry[f"ttfe_p{q}_ms"] = percentile(ttfe, q)
+        report[session_type] = entry
+    return report
+
+
+class LoadGenerator:
+    """
+    Run weighted sessions from concurrent workers against one server.
+
+    Attributes:
+        samples (list[dict]): Finished sessions (see summarize()).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        logs: list[dict[str, Any]],
+        weights: dict[str, float],
+        model: str = "fake",
+        log_ids: int = 4,
+        seed: int = 0,
+    ):
+        self.url = url.rstrip("/")
+        self.logs = logs
+        self.weights = weights
+        self.model = model
+        self.log_ids = [f"loadtest-{i}" for i in range(log_ids)]
+        self.rng = random.Random(seed)
+        self.samples: list[dict[str, Any]] = []
+
+    async def upload(self, client: httpx.AsyncClient, log_id: str) -> dict[str, Any]:
+        response = await client.post(
+            f"{self.url}/table/{log_id}",
+            json={"logs": self.logs, "title": log_id, "description": "load test"},
+        )
+        response.raise_for_status()
+        return {}
+
+    async def list_logs(self, client: httpx.AsyncClient) -> dict[str, Any]:
+        response = await client.get(f"{self.url}/table")
+        response.raise_for_status()
+        return {}
+
+    async def chat(self, client: httpx.AsyncClient, log_id: str) -> dict[str, Any]:
+        payload = {
+            "message": self.rng.choice(CHAT_MESSAGES),
+            "known_issues": KNOWN_ISSUES,
+            "model": self.model,
+            "logs": self.logs,
+            "log_id": log_id,
+        }
+        start = time.perf_counter()
+        result: dict[str, Any] = {"events": 0}
+        async with client.stream(
+            "POST", f"{self.url}/chat_stream", json=payload
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                if result["events"] == 0:
+                    result["ttfe_ms"] = (time.perf_counter() - start) * 1000
+                result["events"] += 1
+        return result
+
+    async def run_session(self, client: httpx.AsyncClient, session_type: str):
+        log_id = self.rng.choice(self.log_ids)
+        start = time.perf_counter()
+        sample: dict[str, Any] = {"type": session_type, "ok": True}
+        try:
+            if session_type == "chat":
+                sample.update(await self.chat(client, log_id))
+            elif session_type == "upload":
+                await self.upload(client, log_id)
+            else:
+                await self.list_logs(client)
+        except Exception as e:
+            sample.update(ok=False, error=str(e))
+        sample["latency_ms"] = (time.perf_counter() - start) * 1000
+        self.samples.append(sample)
+
+    async def worker(
+        self, client: httpx.AsyncClient, deadline: float, sessions: int | None
+    ):
+        types = list(self.weights)
+        weights = [self.weights[t] for t in types]
+        done = 0
+        while time.perf_counter() < deadline and (sessions is None or done < sessions):
+            session_type = self.rng.choices(types, weights)[0]
+            await self.run_session(client, session_type)
+            done += 1
+
+    async def run(
+        self,
+        concurrency: int,
+        duration: float,
+        sessions_per_worker: int | None = None,
+        timeout: float = 300,
+    ) -> dict[str, Any]:
+        """
+        Upload the test logs, then run the workers and return the report.
+
+        Args:
+            concurrency (int): Number of concurrent workers (simulated users).
+            duration (float): Maximum run time in seconds.
+            sessions_per_worker (int | None, optional): Stop each worker after this many
+                sessions. Defaults to None (run for the whole duration).
+            timeout (float, optional): Request timeout in seconds. Defaults to 300.
+
+        Returns:
+            dict: The output of summarize().
+        """
+
+        limits = httpx.Limits(max_connections=concurrency + 1)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            for log_id in self.log_ids:
+                await self.upload(client, log_id)
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(
+                *(
+                    self.worker(client, deadline, sessions_per_worker)
+                    for _ in range(concurrency)
+                )
+            )
+            return summarize(self.samples, time.perf_counter() - start)
+
+
+def serve_in_background(port: int, latency: float, tokens_per_second: float) -> str:
+    """
+    Start the API in a background thread with the fake model and in-memory Elasticsearch.
+
+    Returns:
+        str: The base URL of the server.
+    """
+
+    os.environ.setdefault("FAKE_MODEL", "true")
+    os.environ.setdefault("FAKE_MODEL_LATENCY", str(latency))
+    os.environ.setdefault("FAKE_MODEL_TOKENS_PER_SECOND", str(tokens_per_second))
+    os.environ.setdefault("ES_BACKEND", "memory")
+
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config("main:app", port=port, log_level="warning", access_log=False)
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.1)
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Start the server in-process (fake model, in-memory Elasticsearch).",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", default="fake")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--sessions-per-worker", type=int)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--log-ids", type=int, default=4)
+    parser.add_argument(
+        "--mix",
+        default="chat=8,upload=1,list=3",
+        help="Session weights, e.g. chat=8,upload=1,list=3.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report to this JSON file.")
+    args = parser.parse_args()
+
+    weights = {}
+    for part in args.mix.split(","):
+        name, weight = part.split("=")
+        if name not in SESSION_TYPES:
+            parser.error(f"unknown session type '{name}'")
+        weights[name] = float(weight)
+
+    url = args.url
+    if args.serve:
+        url = serve_in_background(args.port, args.latency, args.tokens_per_second)
+
+    generator = LoadGenerator(
+        url,
+        generate_logs(args.rows, seed=args.seed),
+        weights,
+        model=args.model,
+        log_ids=args.log_ids,
+        seed=args.seed,
+    )
+    report = asyncio.run(
+        generator.run(args.concurrency, args.duration, args.sessions_per_worker)
+    )
+    report["parameters"] = vars(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import matplotlib.pyplot as plt
+import csv
+import sys
+
+# Usage: python -m benchmarks.plot_results [results.csv] [output.png]
+path = sys.argv[1] if len(sys.argv) > 1 else "benchmarks/results/results.csv"
+
+with open(path, "r") as f:
+    reader = csv.DictReader(f)
+
+    sizes: dict[str, list[int]] = {}
+    times: dict[str, list[float]] = {}
+
+    for row in reader:
+        sizes.setdefault(row["benchmark"], []).append(int(row["rows"]))
+        times.setdefault(row["benchmark"], []).append(float(row["best_ms"]))
+
+# Now plot one line per benchmark
+plt.figure(figsize=(6, 4))
+
+markers = ["o", "s", "^", "D", "v", "x"]
+for i, name in enumerate(sizes):
+    plt.plot(sizes[name], times[name], label=name, marker=markers[i % len(markers)])
+
+plt.xscale("log")
+plt.yscale("log")
+
+plt.xlabel("Input Size n (rows)")
+plt.ylabel("Execution Time (ms)")
+plt.title("Server Log Processing Performance")
+plt.legend()
+plt.tight_layout()
+if len(sys.argv) > 2:
+    plt.savefig(sys.argv[2])
+else:
+    plt.show()
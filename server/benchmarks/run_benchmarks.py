@@ -0,0 +1,265 @@
+"""
+Benchmark the server-side log processing on synthetic logs of growing size.
+
+Run from the server directory:
+
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000
+    python -m benchmarks.plot_results benchmarks/results/results.csv
+
+Results are written to results.csv and results.json. Each benchmark has a maximum
+time per row in thresholds.json; the run exits with status 1 if the best time at
+any size exceeds it, so the suite can gate CI or a before/after comparison.
+10M rows need roughly 10 GB of memory for the log dicts alone.
+"""
+
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable
+from benchmarks.synthetic_logs import generate_logs
+from keyword_index import KeywordIndex
+from log_table import LogTable
+from raw_log_parser import format_logs, parse_text
+from utils import (
+    build_bulk_actions,
+    compute_stats,
+    extract_top_rows,
+    get_log_level_counts,
+    get_simple_stats,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+# Keywords of the default "Virtual Background Detection Issue" in the client, plus
+# a category matching error rows of the synthetic logs.
+KEYWORDS = {
+    "virtual_background": ["virtual background", "blurry video"],
+    "wmlhost": ["wmlhost.exe", "failed to launch"],
+    "error": ["1260", "MediaProcessFailedToLaunchByPolicy"],
+    "media": ["No Track!"],
+}
+
+CSV_FIELDS = ["benchmark", "rows", "repeat", "best_ms", "median_ms", "us_per_row"]
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> list[float]:
+    """
+    Run a function 'repeat' times and return the wall times in milliseconds.
+
+    Garbage collection is disabled while timing so that collections triggered by
+    earlier allocations don't land in a random run.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+    return timings
+
+
+def load_embedding_function() -> Callable[[list[str]], Any]:
+    """
+    Return main.compute_embeddings (importing main loads the embedding model).
+    """
+
+    from main import compute_embeddings
+
+    return compute_embeddings
+
+
+def benchmark_cases(
+    logs: list[dict], embed: Callable | None, embedding_max_rows: int
+) -> dict[str, tuple[Callable[[], Any], int]]:
+    """
+    Return the benchmarks for one log size as name -> (function, rows processed).
+    """
+
+    level_counts = get_log_level_counts(logs)
+    table = LogTable.from_logs(logs)
+    keyword_index = KeywordIndex(table)
+    raw_text = format_logs(logs)
+    cases: dict[str, tuple[Callable[[], Any], int]] = {
+        "get_log_level_counts": (lambda: get_log_level_counts(logs), len(logs)),
+        "compute_stats": (lambda: compute_stats(level_counts), len(logs)),
+        "extract_top_rows": (lambda: extract_top_rows(logs, KEYWORDS), len(logs)),
+        "get_simple_stats": (lambda: get_simple_stats(logs), len(logs)),
+        "build_bulk_actions": (lambda: build_bulk_actions(logs, "bench"), len(logs)),
+        "log_table_from_logs": (lambda: LogTable.from_logs(logs), len(logs)),
+        "get_log_level_counts_table": (
+            lambda: get_log_level_counts(table),
+            len(logs),
+        ),
+        "extract_top_rows_table": (
+            lambda: extract_top_rows(table, KEYWORDS),
+            len(logs),
+        ),
+        "get_simple_stats_table": (lambda: get_simple_stats(table), len(logs)),
+        "keyword_index_build": (lambda: KeywordIndex(table), len(logs)),
+        "extract_top_rows_index": (
+            lambda: extract_top_rows(keyword_index, KEYWORDS),
+            len(logs),
+        ),
+        "parse_raw_text": (lambda: parse_text(raw_text), len(logs)),
+    }
+    if embed is not None:
+        # compute_embeddings takes the 'messages' lists, like update_embeddings_for_logs.
+        texts = [log["messages"] for log in logs[:embedding_max_rows]]
+        cases["compute_embeddings"] = (lambda: embed(texts), len(texts))
+    return cases
+
+
+def run(
+    sizes: list[int],
+    repeat: int,
+    embeddings: bool = False,
+    embedding_max_rows: int = 10_000,
+    template_skew: float = 1.2,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """
+    Run every benchmark for every size.
+
+    Args:
+        sizes (list[int]): Numbers of synthetic rows.
+        repeat (int): Runs per benchmark and size (the best and median are kept).
+        embeddings (bool, optional): Also benchmark compute_embeddings. Defaults to False.
+        embedding_max_rows (int, optional): Rows embedded per size. Defaults to 10000.
+        template_skew (float, optional): Zipf exponent of the generator. Defaults to 1.2.
+        seed (int, optional): Generator seed. Defaults to 0.
+
+    Returns:
+        list[dict]: One result row per benchmark and size (see CSV_FIELDS).
+    """
+
+    embed = load_embedding_function() if embeddings else None
+    results = []
+    for size in sizes:
+        print(f"Generating {size} rows...")
+        logs = generate_logs(size, template_skew=template_skew, seed=seed)
+        for name, (fn, rows) in benchmark_cases(
+            logs, embed, embedding_max_rows
+        ).items():
+            timings = time_call(fn, repeat)
+            best = min(timings)
+            result = {
+                "benchmark": name,
+                "rows": rows,
+                "repeat": repeat,
+                "best_ms": round(best, 3),
+                "median_ms": round(statistics.median(timings), 3),
+                "us_per_row": round(best * 1000 / max(rows, 1), 4),
+            }
+            print(
+                f"  {name:<28} {rows:>10} rows  best {result['best_ms']:>10.2f} ms"
+                f"  ({result['us_per_row']:.3f} us/row)"
+            )
+            results.append(result)
+        del logs
+        gc.collect()
+    return results
+
+
+def check_thresholds(
+    results: list[dict[str, Any]], thresholds: dict[str, dict[str, float]]
+) -> list[str]:
+    """
+    Compare results with the per-benchmark 'max_us_per_row' thresholds.
+
+    Args:
+        results (list[dict]): Output of run().
+        thresholds (dict): Mapping of benchmark name to {"max_us_per_row": float}.
+
+    Returns:
+        list[str]: One message per regression (empty if everything is within limits).
+    """
+
+    regressions = []
+    for result in results:
+        limit = thresholds.get(result["benchmark"], {}).get("max_us_per_row")
+        if limit is not None and result["us_per_row"] > limit:
+            regressions.append(
+                f"{result['benchmark']} at {result['rows']} rows: "
+                f"{result['us_per_row']} us/row > {limit} us/row"
+            )
+    return regressions
+
+
+def write_results(results: list[dict[str, Any]], output_dir: str, args: dict):
+    """
+    Write results.csv and results.json (with the run parameters and platform).
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    with open(os.path.join(output_dir, "results.json"), "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "parameters": args,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--template-skew", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--embeddings",
+        action="store_true",
+        help="Also benchmark compute_embeddings (loads the embedding model).",
+    )
+    parser.add_argument("--embedding-max-rows", type=int, default=10_000)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument(
+        "--no-check", action="store_true", help="Don't fail on threshold regressions."
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.sizes,
+        args.repeat,
+        embeddings=args.embeddings,
+        embedding_max_rows=args.embedding_max_rows,
+        template_skew=args.template_skew,
+        seed=args.seed,
+    )
+    write_results(results, args.output_dir, vars(args))
+    print(f"Results written to {args.output_dir}")
+
+    if args.no_check or not os.path.exists(args.thresholds):
+        return
+    with open(args.thresholds) as f:
+        regressions = check_thresholds(results, json.load(f))
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Benchmark latency and relevance of the similar-log search configurations.
+
+Run from the server directory:
+
+    python -m benchmarks.search_quality --rows 5000
+    python -m benchmarks.search_quality --rows 5000 --embeddings  # real model
+
+Synthetic logs are indexed into the in-memory Elasticsearch, then each labeled query
+is run as plain k-NN, level-filtered k-NN, BM25 and hybrid (RRF) search. A hit is
+relevant when it was generated from the query's target template. Without
+--embeddings a hashed character-trigram embedder stands in for the model, so the
+numbers compare the retrieval plumbing rather than the model.
+"""
+
+import argparse
+import hashlib
+import json
+import statistics
+import time
+from typing import Any, Callable
+from elasticsearch.helpers import bulk
+from benchmarks.synthetic_logs import generate_logs
+from memory_elasticsearch import InMemoryElasticsearch
+from similarity_search import (
+    EMBEDDING_DIMS,
+    build_filters,
+    index_mapping,
+    lexical_query,
+    search,
+)
+from utils import build_bulk_actions
+
+INDEX = "search-quality"
+
+# Query -> (level of the target template, substring identifying its rows).
+LABELED_QUERIES = {
+    "wmlhost.exe failed to launch because of a policy": (
+        "Error",
+        "failed to launch wmlhost.exe",
+    ),
+    "virtual background blur is not supported on this cpu": (
+        "Error",
+        "virtual background not supported",
+    ),
+    "video track is missing": ("Error", "No Track!"),
+    "machine learning support is disabled": ("Warn", "CheckMlSupported"),
+    "reactor cannot find the socket handler": ("Warn", "cannot find fdNew"),
+    "heartbeat sent to the parent process": ("Debug", "Sending HeartBeat"),
+    "looking up the http proxy": ("Info", "GetProxyInfo"),
+}
+
+CONFIGURATIONS = {
+    "knn": {"filtered": False, "hybrid": False},
+    "knn_filtered": {"filtered": True, "hybrid": False},
+    "bm25": {"filtered": False, "hybrid": None},
+    "hybrid": {"filtered": False, "hybrid": True},
+    "hybrid_filtered": {"filtered": True, "hybrid": True},
+}
+
+
+def hashing_embedder(dims: int = EMBEDDING_DIMS) -> Callable[[list[str]], list]:
+    """
+    Return a model-free embedder: hashed counts of lowercase character trigrams.
+    """
+
+    def embed(texts: list[str]) -> list[list[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * dims
+            text = f" {text.lower()} "
+            for i in range(len(text) - 2):
+                digest = hashlib.blake2b(text[i : i + 3].encode(), digest_size=4)
+                vector[int.from_bytes(digest.digest(), "little") % dims] += 1.0
+            vectors.append(vector)
+        return vectors
+
+    return embed
+
+
+def build_index(
+    es: InMemoryElasticsearch, logs: list[dict], embed: Callable[[list[str]], list]
+):
+    """
+    Index the logs with embeddings of their first message, like the embedding jobs.
+    """
+
+    vectors = embed([log["messages"][0] for log in logs])
+    docs = [{**log, "embedding": vector} for log, vector in zip(logs, vectors)]
+    es.indices.create(index=INDEX, body=index_mapping("bench", "search quality"))
+    bulk(es, build_bulk_actions(docs, INDEX), raise_on_error=True)
+
+
+def evaluate(
+    es: InMemoryElasticsearch,
+    embed: Callable[[list[str]], list],
+    k: int,
+    num_candidates: int,
+) -> list[dict[str, Any]]:
+    """
+    Run every labeled query with every configuration.
+
+    Returns:
+        list[dict]: Per configuration: mean precision@k, mean reciprocal rank of the
+        first relevant hit and median/max latency in milliseconds.
+    """
+
+    query_vectors = dict(zip(LABELED_QUERIES, embed(list(LABELED_QUERIES))))
+    results = []
+    for name, config in CONFIGURATIONS.items():
+        precisions, reciprocal_ranks, latencies = [], [], []
+        for query, (level, marker) in LABELED_QUERIES.items():
+            filters = build_filters([level]) if config["filtered"] else []
+            start = time.perf_counter()
+            if config["hybrid"] is None:
+                response = es.search(
+                    index=INDEX, query=lexical_query(query, filters), size=k
+                )
+                hits = response["hits"]["hits"]
+            else:
+                hits = search(
+                    es,
+                    INDEX,
+                    query,
+                    query_vectors[query],
+                    k,
+                    num_candidates,
+                    filters=filters,
+                    hybrid=config["hybrid"],
+                )
+            latencies.append((time.perf_counter() - start) * 1000)
+            relevant = [marker in hit["_source"]["messages"][0] for hit in hits]
+            precisions.append(sum(relevant) / k)
+            first = next((i for i, hit in enumerate(relevant) if hit), None)
+            reciprocal_ranks.append(0.0 if first is None else 1 / (first + 1))
+        results.append(
+            {
+                "configuration": name,
+                "precision_at_k": round(statistics.mean(precisions), 3),
+                "mrr": round(statistics.mean(reciprocal_ranks), 3),
+                "median_ms": round(statistics.median(latencies), 2),
+                "max_ms": round(max(latencies), 2),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--embeddings",
+        action="store_true",
+        help="Embed with the server's model (imports main).",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        from main import encode_texts as embed
+    else:
+        embed = hashing_embedder()
+
+    es = InMemoryElasticsearch()
+    build_index(es, generate_logs(args.rows, seed=args.seed), embed)
+    results = evaluate(es, embed, args.k, args.num_candidates)
+
+    width = max(map(len, CONFIGURATIONS))
+    print(f"{args.rows} rows, k={args.k}, num_candidates={args.num_candidates}")
+    for result in results:
+        print(
+            f"  {result['configuration']:<{width}}  P@k {result['precision_at_k']:.3f}"
+            f"  MRR {result['mrr']:.3f}  median {result['median_ms']:.1f} ms"
+            f"  max {result['max_ms']:.1f} ms"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"parameters": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
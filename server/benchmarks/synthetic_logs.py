@@ -0,0 +1,169 @@
+import argparse
+import bisect
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+# Level mix of test-logs/issue1.json (7343 rows).
+DEFAULT_LEVEL_MIX = {"Info": 0.807, "Debug": 0.109, "Warn": 0.078, "Error": 0.006}
+
+# Message templates modeled on test-logs/issue1.json, most frequent first within
+# each level. "{int}", "{hex}" and "{ip}" are filled with random values.
+TEMPLATES: dict[str, list[str]] = {
+    "Info": [
+        "[]WME:0 ::[wmeclient.dll] wmeMediastores::WmeConfigHelper::SetCallId, callId={int} [this={hex}]",
+        "[]WME:0 ::[mediasession.dll] WMEFunc wme::CMediaConnection::Stop,line=5511 [cid={int}] [this={hex}] Enter...",
+        "[]WME:0 ::[tp.dll] CCmTransportUdp, netstats: {int}/{int},cnt={int}/{int}, total_cnt={int}/{int}, SendFailed:0 pfx: [this={hex}]",
+        "[]WME:0 ::[MediaSession] CScheduler::StopTimer [cid={int}] [this={hex}]",
+        "[]WME:0 ::[util.dll] RegisterThread, thread={hex} tid={int} name=t-tick type=-1 eventQueue={hex} timerQueue={hex}",
+        "[]WME:0 ::[util.dll] WMEFunc ACmThread::Create,line=92 [this={hex}] Leave, cost={int}ms",
+        "[]WME:0 ::[tp.dll] CCmHttpProxyManager::GetProxyInfo, i = {int}, status=1 [this={hex}]",
+        "[]WME:0 ::[AudioEngine]  [Callid=0]CWBXDeviceEnumerator::GetNumOfMicrophones() [cid=0] [this={hex}]",
+        "[]spark-media-external.cpp:159 MediaMain::mediaMain:: ****** Spark native media process has started, version: 44.9.1.{int} ******",
+    ],
+    "Debug": [
+        "[]MediaApplication.cpp:137 MediaApplication::setupHeartBeatBasedParentProcessMonitoring::<lambda_1>::operator ()::[ipc-heart-beat] Sending HeartBeat id={int}",
+        "[]RootLogger.cpp:498 ::Adding blocklisted string of length: {int}",
+        "[]endpoint.h:62 ipc::endpoint<struct ipc::packet<struct FrameHolder<struct ipc::Frame,33177600,230400,4>,0>,2,struct ipc::dispatcher>::send size={int}",
+    ],
+    "Warn": [
+        "[]WME:0 ::[tp.dll] CCmReactorBase::RegisterHandler, cannot find fdNew={hex} [this={hex}]",
+        "[]WME:0 ::[MediaSession] CTraceContext::StartDetect, m_sTransType=udp, m_aUri.m_sHostName={ip}, m_aUri.m_nPort=9000 [cid={int}] [this={hex}]",
+        "[]WME:0 ::[MediaSession] CMediaPerformanceStaticControl::CheckMlSupported, ml supported=0 [cid={int}]",
+    ],
+    "Error": [
+        "[]WME:0 ::[mediasession.dll] CMediaTrackMgr::GetTrack No Track! vid={int} [this={hex}]",
+        "[]WseMLHostAgent::start failed to launch wmlhost.exe, error=1260 MediaProcessFailedToLaunchByPolicy",
+        "[]ConnectionBase::initializeVideoBlurEffect virtual background not supported, cpu={int}MHz",
+    ],
+}
+
+THREAD_IDS = ["[0x720]", "[0xe1c]", "[0xa28]", "[0xb78]", "[0x13ec]", "[0x1cd0]"]
+
+DEFAULT_START = datetime(2024, 9, 30, 17, 32, 28, 734000, tzinfo=timezone.utc)
+
+
+def zipf_weights(n: int, skew: float) -> list[float]:
+    """
+    Return cumulative Zipf weights for n items (item k has weight 1 / (k + 1)^skew).
+
+    A skew of 0 gives a uniform distribution.
+    """
+
+    cumulative = []
+    total = 0.0
+    for k in range(n):
+        total += 1 / (k + 1) ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def _pick(rng: random.Random, cumulative: list[float]) -> int:
+    return bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    message = template
+    while "{int}" in message:
+        message = message.replace("{int}", str(rng.getrandbits(31)), 1)
+    while "{hex}" in message:
+        message = message.replace("{hex}", f"0x{rng.getrandbits(32):08x}", 1)
+    if "{ip}" in message:
+        ip = ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+        message = message.replace("{ip}", ip)
+    return message
+
+
+def generate_logs(
+    rows: int,
+    level_mix: dict[str, float] | None = None,
+    template_skew: float = 1.2,
+    rows_per_second: float = 70,
+    seed: int = 0,
+    start: datetime = DEFAULT_START,
+) -> list[dict[str, Any]]:
+    """
+    Generate synthetic logs in the upload format of test-logs/issue1.json.
+
+    Timestamps increase at a steady rate from 'start'. Levels are drawn from
+    'level_mix' and, within a level, templates and thread IDs follow a Zipf
+    distribution with exponent 'template_skew', so a few templates dominate the
+    way they do in real logs. The output is deterministic for a given seed.
+
+    Args:
+        rows (int): Number of log entries.
+        level_mix (dict[str, float] | None, optional): Relative weight of each level.
+            Defaults to the mix of test-logs/issue1.json.
+        template_skew (float, optional): Zipf exponent of the template and thread
+            distributions (0 is uniform). Defaults to 1.2.
+        rows_per_second (float, optional): Average log rate. Defaults to 70 (issue1.json).
+        seed (int, optional): Random seed. Defaults to 0.
+        start (datetime, optional): Timestamp of the first entry.
+
+    Returns:
+        list[dict]: Log entries with 'timestamp', 'level', 'thread ID' and 'messages'.
+    """
+
+    rng = random.Random(seed)
+    mix = level_mix or DEFAULT_LEVEL_MIX
+    levels = [level for level in mix if level in TEMPLATES]
+    level_cumulative = []
+    total = 0.0
+    for level in levels:
+        total += mix[level]
+        level_cumulative.append(total)
+    template_cumulative = {
+        level: zipf_weights(len(TEMPLATES[level]), template_skew) for level in levels
+    }
+    thread_cumulative = zipf_weights(len(THREAD_IDS), template_skew)
+
+    base = start.replace(microsecond=0)
+    start_ms = start.microsecond // 1000
+    logs = []
+    prefix, second = "", -1
+    for i in range(rows):
+        offset_ms = start_ms + int(i * 1000 / rows_per_second)
+        if offset_ms // 1000 != second:
+            # Formatting a datetime per row dominates generation, so only do it per second.
+            second = offset_ms // 1000
+            prefix = (base + timedelta(seconds=second)).strftime("%Y-%m-%dT%H:%M:%S")
+
+        level = levels[_pick(rng, level_cumulative)]
+        templates = TEMPLATES[level]
+        template = templates[_pick(rng, template_cumulative[level])]
+        logs.append(
+            {
+                "timestamp": f"{prefix}.{offset_ms % 1000:03d}Z",
+                "level": level,
+                "thread ID": THREAD_IDS[_pick(rng, thread_cumulative)],
+                "messages": [_fill(template, rng)],
+            }
+        )
+    return logs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write synthetic logs in the upload format to a JSON file."
+    )
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--template-skew", type=float, default=1.2)
+    parser.add_argument("--rows-per-second", type=float, default=70)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logs = generate_logs(
+        args.rows,
+        template_skew=args.template_skew,
+        rows_per_second=args.rows_per_second,
+        seed=args.seed,
+    )
+    with open(args.output, "w") as f:
+        json.dump(logs, f, indent=2)
+    print(f"Wrote {len(logs)} logs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Measure the size and CPU cost of the wire formats of the table endpoints.
+
+Run from the server directory:
+
+    python -m benchmarks.wire_formats --rows 100000
+
+For every serializer (stdlib json, orjson, MessagePack) and content coding (none,
+gzip, zstd) that is installed, the synthetic rows are encoded, compressed,
+decompressed and decoded, and the bytes on the wire and best times are reported.
+"""
+
+import argparse
+import gzip
+import json
+import os
+from typing import Any, Callable
+import codec
+from benchmarks.run_benchmarks import time_call
+from benchmarks.synthetic_logs import generate_logs
+from log_table import LogTable
+
+FIELDS = [
+    "format",
+    "encoding",
+    "bytes",
+    "ratio",
+    "encode_ms",
+    "compress_ms",
+    "decompress_ms",
+    "decode_ms",
+]
+
+# name -> (encode, decode) and name -> (compress, decompress).
+Serializers = dict[str, tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]
+Compressors = dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]
+
+
+def serializers() -> Serializers:
+    """
+    Return the installed serializers as name -> (encode, decode).
+    """
+
+    formats = {
+        "json": (
+            lambda value: json.dumps(value).encode(),
+            lambda data: json.loads(data),
+        )
+    }
+    if codec.orjson is not None:
+        formats["orjson"] = (codec.orjson.dumps, codec.orjson.loads)
+    if codec.msgpack is not None:
+        formats["msgpack"] = (
+            lambda value: codec.msgpack.packb(value, use_bin_type=True),
+            lambda data: codec.msgpack.unpackb(data, raw=False),
+        )
+    return formats
+
+
+def compressors() -> Compressors:
+    """
+    Return the installed content codings as name -> (compress, decompress).
+    """
+
+    codings = {
+        "identity": (lambda data: data, lambda data: data),
+        "gzip": (lambda data: codec.compress(data, "gzip"), gzip.decompress),
+    }
+    if codec.zstandard is not None:
+        codings["zstd"] = (
+            lambda data: codec.compress(data, "zstd"),
+            lambda data: codec.decompress(data, "zstd"),
+        )
+    return codings
+
+
+def measure(rows: list[dict[str, Any]], repeat: int) -> list[dict[str, Any]]:
+    """
+    Measure every installed format and content coding on the given rows.
+
+    Args:
+        rows (list[dict]): Rows as returned by GET /table/{id}.
+        repeat (int): Runs per measurement (the best is kept).
+
+    Returns:
+        list[dict]: One result per format and coding (see FIELDS).
+    """
+
+    results = []
+    baseline = None
+    for name, (encode, decode) in serializers().items():
+        encode_ms = min(time_call(lambda: encode(rows), repeat))
+        body = encode(rows)
+        decode_ms = min(time_call(lambda: decode(body), repeat))
+        baseline = baseline or len(body)
+        for coding, (pack, unpack) in compressors().items():
+            compressed = pack(body)
+            results.append(
+                {
+                    "format": name,
+                    "encoding": coding,
+                    "bytes": len(compressed),
+                    "ratio": round(len(compressed) / baseline, 4),
+                    "encode_ms": round(encode_ms, 3),
+                    "compress_ms": round(min(time_call(lambda: pack(body), repeat)), 3),
+                    "decompress_ms": round(
+                        min(time_call(lambda: unpack(compressed), repeat)), 3
+                    ),
+                    "decode_ms": round(decode_ms, 3),
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    table = LogTable.from_logs(generate_logs(args.rows, seed=args.seed))
+    rows = table.to_dicts()
+    results = measure(rows, args.repeat)
+
+    print(f"{args.rows} rows; ratio is relative to uncompressed stdlib JSON")
+    print("  ".join(f"{field:>13}" for field in FIELDS))
+    for result in results:
+        print("  ".join(f"{result[field]!s:>13}" for field in FIELDS))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Kinds of state a session keeps. Everything but the embeddings (which depend only
+# on texts) is derived from the logs and dropped when the logs change.
+SESSION_KINDS = ("stats", "matches", "verdicts", "similar", "embeddings")
+LOG_KINDS = ("stats", "matches", "verdicts", "similar")
+
+
+def _size(value: Any) -> int:
+    """Approximate size of a value in bytes: the length of its JSON form."""
+
+    return len(json.dumps(value, default=str))
+
+
+class ChatSession:
+    """
+    Work done for one conversation about one log, reused by later chat turns.
+
+    State is stored per kind (see SESSION_KINDS) and key, e.g. the match results of
+    an issue version or the verdict on an issue for a query. The session remembers
+    the fingerprint of its logs; when a turn comes with different logs, the state
+    derived from them is dropped and recomputed.
+
+    Attributes:
+        fingerprint (str): Fingerprint of the logs (see known_issues.log_fingerprint).
+        last_used (float): Time of the last turn, as returned by time.monotonic().
+        nbytes (int): Approximate size of the stored state.
+    """
+
+    def __init__(self, fingerprint: str):
+        """
+        Initialize an empty session.
+
+        Args:
+            fingerprint (str): Fingerprint of the logs.
+        """
+
+        self.fingerprint = fingerprint
+        self.last_used = time.monotonic()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._state: dict[str, dict[Hashable, tuple[Any, int]]] = {
+            kind: {} for kind in SESSION_KINDS
+        }
+
+    def get(self, kind: str, key: Hashable, default: Any = None) -> Any:
+        """Return a stored value, or 'default'."""
+
+        with self._lock:
+            entry = self._state[kind].get(key)
+        return default if entry is None else entry[0]
+
+    def put(self, kind: str, key: Hashable, value: Any):
+        """Store a value (JSON-serializable, for the size estimate)."""
+
+        size = _size(value)
+        with self._lock:
+            previous = self._state[kind].get(key)
+            self._state[kind][key] = (value, size)
+            self.nbytes += size - (previous[1] if previous else 0)
+
+    def reset(self, fingerprint: str):
+        """Drop the state derived from the logs and switch to new logs."""
+
+        with self._lock:
+            for kind in LOG_KINDS:
+                self.nbytes -= sum(size for _, size in self._state[kind].values())
+                self._state[kind].clear()
+            self.fingerprint = fingerprint
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of stored values per kind."""
+
+        with self._lock:
+            return {kind: len(entries) for kind, entries in self._state.items()}
+
+
+class SessionStore:
+    """
+    Chat sessions keyed by (session id, log), with a TTL and memory limits.
+
+    Sessions unused for 'ttl_seconds' expire. Beyond 'max_sessions' sessions or
+    'max_bytes' of state, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 1800,
+        max_sessions: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            ttl_seconds (float, optional): Idle time after which a session expires.
+                Defaults to 1800.
+            max_sessions (int, optional): Maximum number of sessions. Defaults to 256.
+            max_bytes (int, optional): Approximate maximum size of all sessions.
+                Defaults to 64 MiB.
+        """
+
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[tuple[str, str], ChatSession] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str, log_key: str, fingerprint: str) -> ChatSession:
+        """
+        Return the session of a conversation about a log, creating it if needed.
+
+        Args:
+            session_id (str): Conversation id chosen by the client.
+            log_key (str): The log id, or the fingerprint of logs that aren't stored.
+            fingerprint (str): Fingerprint of the logs of this turn. If it differs
+                from the session's, the state derived from the old logs is dropped.
+
+        Returns:
+            ChatSession: The session.
+        """
+
+        key = (session_id, log_key)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = ChatSession(fingerprint)
+            self._sessions.move_to_end(key)
+        if session.fingerprint != fingerprint:
+            session.reset(fingerprint)
+        session.last_used = now
+        return session
+
+    def trim(self):
+        """Expire idle sessions and evict the least recently used over the limits."""
+
+        with self._lock:
+            self._expire(time.monotonic())
+            total = sum(session.nbytes for session in self._sessions.values())
+            while self._sessions and (
+                len(self._sessions) > self.max_sessions or total > self.max_bytes
+            ):
+                _, session = self._sessions.popitem(last=False)
+                total -= session.nbytes
+
+    def drop(self, session_id: str) -> int:
+        """
+        Drop every session of a conversation.
+
+        Returns:
+            int: Number of sessions dropped.
+        """
+
+        with self._lock:
+            keys = [key for key in self._sessions if key[0] == session_id]
+            for key in keys:
+                del self._sessions[key]
+        return len(keys)
+
+    def _expire(self, now: float):
+        # Sessions are in least recently used order, so the idle ones come first.
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_seconds:
+                break
+            del self._sessions[key]
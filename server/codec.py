@@ -0,0 +1,209 @@
+import gzip
+import json
+import zlib
+from typing import Any, Callable
+
+# Optional accelerators. Everything works without them; they are used when installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Bodies smaller than this are sent uncompressed; the framing would cost more than it saves.
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as UTF-8 JSON, with orjson when it is installed.
+
+    Falls back to the standard library for values orjson rejects (e.g. non-string
+    dict keys or integers over 64 bits).
+    """
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Decode JSON, with orjson when it is installed.
+    """
+
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def supported_encodings() -> list[str]:
+    """
+    Return the content codings this server can produce and accept, preferred first.
+    """
+
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def supported_media_types() -> list[str]:
+    """
+    Return the media types the table endpoints can produce and accept.
+    """
+
+    return [JSON_MEDIA_TYPE] + (list(MSGPACK_MEDIA_TYPES) if msgpack else [])
+
+
+def _parse_header(header: str | None) -> dict[str, float]:
+    """
+    Parse an Accept or Accept-Encoding header into {value: quality}.
+    """
+
+    values: dict[str, float] = {}
+    for part in (header or "").split(","):
+        value, *params = [item.strip() for item in part.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        values[value.lower()] = quality
+    return values
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Pick the response content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str | None): The request's Accept-Encoding header.
+
+    Returns:
+        str | None: "zstd" or "gzip", or None to send the body uncompressed.
+    """
+
+    accepted = _parse_header(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def negotiate_media_type(accept: str | None) -> str:
+    """
+    Pick the response media type from an Accept header (JSON unless MessagePack is
+    installed and preferred).
+    """
+
+    accepted = _parse_header(accept)
+    for media_type in MSGPACK_MEDIA_TYPES:
+        if msgpack is not None and accepted.get(media_type, 0.0) > accepted.get(
+            JSON_MEDIA_TYPE, 0.0
+        ):
+            return media_type
+    return JSON_MEDIA_TYPE
+
+
+def compress(data: bytes, encoding: str | None) -> bytes:
+    """
+    Compress a body with a content coding returned by negotiate_encoding.
+    """
+
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return data
+
+
+def decompress(data: bytes, encoding: str | None) -> bytes:
+    """
+    Decompress a request body according to its Content-Encoding header.
+
+    Raises:
+        ValueError: If the coding is not supported or the body is corrupt.
+    """
+
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return data
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            return gzip.decompress(data)
+        if encoding == "zstd" and zstandard is not None:
+            # Streaming decompression also handles frames without a content size.
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    except Exception as e:
+        raise ValueError(f"Could not decompress the {encoding} body: {e}")
+    raise ValueError(f"Unsupported Content-Encoding '{encoding}'.")
+
+
+def decompressor(encoding: str | None) -> Callable[[bytes], bytes]:
+    """
+    Return a function that decompresses a body chunk by chunk, for bodies too large
+    to hold twice in memory.
+
+    Raises:
+        ValueError: If the coding is not supported.
+    """
+
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return bytes
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16).decompress
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress
+    raise ValueError(f"Unsupported Content-Encoding '{encoding}'.")
+
+
+def encode_body(value: Any, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """
+    Encode a value as JSON or MessagePack.
+    """
+
+    if media_type in MSGPACK_MEDIA_TYPES and msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True)
+    return dumps(value)
+
+
+def decode_body(data: bytes, content_type: str | None) -> Any:
+    """
+    Decode a request body as JSON or, if its Content-Type says so, MessagePack.
+
+    Raises:
+        ValueError: If the body can't be decoded.
+    """
+
+    media_type = (content_type or JSON_MEDIA_TYPE).split(";")[0].strip().lower()
+    if media_type in MSGPACK_MEDIA_TYPES:
+        if msgpack is None:
+            raise ValueError("MessagePack bodies require the 'msgpack' package.")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack body: {e}")
+    try:
+        return loads(data)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON body: {e}")
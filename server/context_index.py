@@ -0,0 +1,186 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterable
+from keyword_index import KeywordIndex
+from log_table import LogTable
+from raw_log_parser import format_logs
+
+
+class ContextIndex:
+    """
+    Index of a LogTable for pulling the rows around a hit.
+
+    Rows are addressed by position, so the ±N rows around a hit are a plain range.
+    For time windows the index keeps the timestamps in sorted order with the row of
+    each one; a ±T window is then two bisections plus the rows in between, i.e.
+    O(log n + window). Logs are almost always already in time order, in which case
+    the table's own timestamp column is used as is and nothing is copied. Rows whose
+    timestamp could not be parsed are left out of time windows.
+
+    Attributes:
+        table (LogTable): The indexed table.
+    """
+
+    __slots__ = ("table", "_timestamps", "_rows")
+
+    def __init__(self, table: LogTable):
+        """
+        Build the index (one pass over the timestamps; a sort if they are out of order).
+
+        Args:
+            table (LogTable): The table to index.
+        """
+
+        self.table = table
+        timestamps = table.timestamps
+        in_order = not table.unparsed_timestamps and all(
+            timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1)
+        )
+        if in_order:
+            self._timestamps = timestamps
+            self._rows = None
+        else:
+            unparsed = table.unparsed_timestamps
+            rows = sorted(
+                (row for row in range(len(table)) if row not in unparsed),
+                key=timestamps.__getitem__,
+            )
+            self._rows = array("Q", rows)
+            self._timestamps = array("q", (timestamps[row] for row in rows))
+
+    def rows_around(self, row: int, before: int = 2, after: int = 2) -> range:
+        """
+        Return the rows from 'before' rows ahead of a row to 'after' rows past it.
+        """
+
+        return range(max(0, row - before), min(len(self.table), row + after + 1))
+
+    def rows_within(self, row: int, seconds: float) -> list[int]:
+        """
+        Return the rows logged within 'seconds' of a row (in row order).
+
+        A row without a parsed timestamp only returns itself.
+        """
+
+        if row in self.table.unparsed_timestamps:
+            return [row]
+        center = self.table.timestamps[row]
+        delta = int(seconds * 1_000_000)
+        lo = bisect_left(self._timestamps, center - delta)
+        hi = bisect_right(self._timestamps, center + delta)
+        if self._rows is None:
+            return list(range(lo, hi))
+        return sorted(self._rows[lo:hi])
+
+    def windows(
+        self,
+        hits: Iterable[int],
+        before: int = 2,
+        after: int = 2,
+        seconds: float | None = None,
+        max_rows: int = 50,
+    ) -> list[dict[str, Any]]:
+        """
+        Return compact context windows around hits, merging windows that overlap.
+
+        Each window spans the ±before/after rows of its hits or, if 'seconds' is
+        given, the rows within that many seconds of them. Rows are rendered as raw
+        log lines (see raw_log_parser.format_logs), which is far smaller in a prompt
+        than JSON entries, and the hit lines are listed separately.
+
+        Args:
+            hits (Iterable[int]): Rows of the matched lines.
+            before (int, optional): Rows of context before each hit. Defaults to 2.
+            after (int, optional): Rows of context after each hit. Defaults to 2.
+            seconds (float | None, optional): Use a ±seconds time window instead of
+                row counts. Defaults to None.
+            max_rows (int, optional): Rows kept per window, nearest to the hits first.
+                Defaults to 50.
+
+        Returns:
+            list[dict]: Windows as {"rows": [first, last], "hits": [rows],
+            "lines": [str]}, in row order.
+        """
+
+        spans = []
+        for hit in sorted(set(hits)):
+            if seconds is None:
+                rows = list(self.rows_around(hit, before, after))
+            else:
+                rows = self.rows_within(hit, seconds)
+            spans.append((hit, rows))
+
+        # Time windows of out-of-order logs are not contiguous row ranges, so
+        # windows are merged as intervals (by first row) and their rows unioned.
+        spans.sort(key=lambda span: span[1][0])
+        merged: list[tuple[set[int], set[int], int]] = []
+        for hit, rows in spans:
+            if merged and rows[0] <= merged[-1][2] + 1:
+                last_rows, last_hits, last = merged[-1]
+                last_rows.update(rows)
+                last_hits.add(hit)
+                merged[-1] = (last_rows, last_hits, max(last, rows[-1]))
+            else:
+                merged.append((set(rows), {hit}, rows[-1]))
+
+        windows = []
+        for row_set, window_hits, _ in merged:
+            rows = sorted(row_set)
+            if len(rows) > max_rows:
+                nearest = sorted(
+                    rows, key=lambda row: min(abs(row - hit) for hit in window_hits)
+                )
+                rows = sorted(nearest[:max_rows])
+            lines = format_logs(self.table.row_dict(row) for row in rows)
+            windows.append(
+                {
+                    "rows": [rows[0], rows[-1]],
+                    "hits": sorted(window_hits),
+                    "lines": lines.splitlines(),
+                }
+            )
+        return windows
+
+
+def keyword_context(
+    index: ContextIndex,
+    keywords: dict[str, list[str]],
+    top_n: int = 5,
+    before: int = 2,
+    after: int = 2,
+    seconds: float | None = None,
+    keyword_index: KeywordIndex | None = None,
+) -> tuple[dict[str, list[dict[str, Any]]], dict[str, list[dict[str, Any]]]]:
+    """
+    Find the rows extract_top_rows picks per category along with their context.
+
+    The keyword scan runs once; the windows then only cost a lookup per hit.
+
+    Args:
+        index (ContextIndex): Index of the logs.
+        keywords (dict): Mapping of category to list of keywords.
+        top_n (int, optional): Hits per keyword, as in extract_top_rows. Defaults to 5.
+        before (int, optional): Rows of context before each hit. Defaults to 2.
+        after (int, optional): Rows of context after each hit. Defaults to 2.
+        seconds (float | None, optional): Use a ±seconds time window instead of
+            row counts. Defaults to None.
+        keyword_index (KeywordIndex | None, optional): Keyword index of the same
+            table to find the hits with. Defaults to None (scan the table).
+
+    Returns:
+        tuple[dict, dict]: Mappings of each category to its matching log entries (as
+        extract_top_rows returns them) and to their windows (see ContextIndex.windows).
+    """
+
+    table = index.table
+    finder = keyword_index if keyword_index is not None else table
+    extracted, context = {}, {}
+    for category, kw_list in keywords.items():
+        hits = [
+            row
+            for kw in kw_list
+            for row in finder.find_rows(kw, levels=("Error", "Warn"), limit=top_n)
+        ]
+        extracted[category] = [table.row_dict(row) for row in hits]
+        context[category] = index.windows(hits, before, after, seconds)
+    return extracted, context
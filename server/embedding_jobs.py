@@ -0,0 +1,347 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers run first: interactive uploads jump ahead of bulk backfills.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKFILL = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_id TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_by_log ON jobs (log_id, id);
+"""
+
+# Columns added after the first release, for databases created before them.
+_ADDED_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled."""
+
+
+class EmbeddingJobQueue:
+    """
+    Persistent priority queue of embedding jobs, one per log upload.
+
+    Jobs live in a SQLite file, so queued work survives restarts. A dispatcher
+    thread runs the highest priority, oldest job through 'handler', which does the
+    heavy work on its own worker processes and reports progress with a callback. The
+    callback raises JobCancelled once the job is cancelled (or taken over), so
+    cancellation takes effect at the next batch.
+
+    Several processes (e.g. server workers) may share the database. A job is claimed
+    with a conditional update, so only one dispatcher runs it, and the claim is a
+    lease: the owner renews 'heartbeat_at' while the job runs, and a running job
+    whose lease expired (its owner crashed) can be claimed again by any dispatcher.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+        owner (str): Identifies this queue's claims: host, process id and a nonce.
+        lease_seconds (float): Time without a heartbeat after which a running job
+            is considered abandoned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        handler: Callable[[dict[str, Any], Callable[[int, int], None]], None],
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+    ):
+        """
+        Initialize the queue (call start() to begin running jobs).
+
+        Args:
+            path (str): Path of the SQLite database (created if missing).
+            handler (Callable): Called as handler(job, progress) for each job, where
+                progress(done, total) records progress and raises JobCancelled.
+            poll_interval (float, optional): Seconds between checks for new jobs when
+                idle. Defaults to 1.
+            lease_seconds (float, optional): Lease of a running job; it is renewed
+                every third of it. Defaults to 60.
+        """
+
+        self.path = path
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+            columns = {
+                row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")
+            }
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def submit(self, log_id: str, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """
+        Queue an embedding job for a log, cancelling any active job for it.
+
+        Args:
+            log_id (str): Log (index) id.
+            priority (int, optional): Job priority, lower first. Defaults to
+                PRIORITY_INTERACTIVE.
+
+        Returns:
+            dict: The new job.
+        """
+
+        with self._lock, self._db:
+            self._cancel(log_id)
+            cursor = self._db.execute(
+                "INSERT INTO jobs (log_id, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (log_id, priority, QUEUED, time.time()),
+            )
+        self._wakeup.set()
+        return self.get(cursor.lastrowid)
+
+    def _cancel(self, log_id: str) -> int:
+        cursor = self._db.execute(
+            "UPDATE jobs SET status = ?, finished_at = ? "
+            "WHERE log_id = ? AND status IN (?, ?)",
+            (CANCELLED, time.time(), log_id, *ACTIVE_STATUSES),
+        )
+        return cursor.rowcount
+
+    def cancel(self, log_id: str) -> int:
+        """
+        Cancel the queued or running jobs of a log.
+
+        Returns:
+            int: Number of jobs cancelled.
+        """
+
+        with self._lock, self._db:
+            return self._cancel(log_id)
+
+    def get(self, job_id: int) -> dict[str, Any] | None:
+        """Return a job by id, or None."""
+
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def latest(self, log_id: str) -> dict[str, Any] | None:
+        """Return the most recent job of a log, or None."""
+
+        rows = self._query(
+            "SELECT * FROM jobs WHERE log_id = ? ORDER BY id DESC LIMIT 1", (log_id,)
+        )
+        return rows[0] if rows else None
+
+    def jobs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        """
+        Return jobs, most recent first.
+
+        Args:
+            status (str | None, optional): Only jobs with this status. Defaults to None.
+            limit (int, optional): Maximum number of jobs. Defaults to 100.
+        """
+
+        if status is None:
+            return self._query("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return self._query(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?",
+            (status, limit),
+        )
+
+    def _claim_next(self) -> dict[str, Any] | None:
+        # Claimable: queued jobs and running jobs whose lease expired. The update only
+        # applies if the job is still claimable, so when dispatchers in several
+        # processes race for a job exactly one of them gets it.
+        while True:
+            now = time.time()
+            expired = now - self.lease_seconds
+            with self._lock, self._db:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? "
+                    "OR (status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)) "
+                    "ORDER BY priority, id LIMIT 1",
+                    (QUEUED, RUNNING, expired),
+                ).fetchone()
+                if row is None:
+                    return None
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, started_at = ?, "
+                    "heartbeat_at = ? WHERE id = ? AND (status = ? OR (status = ? "
+                    "AND (heartbeat_at IS NULL OR heartbeat_at < ?)))",
+                    (
+                        RUNNING,
+                        self.owner,
+                        now,
+                        now,
+                        row["id"],
+                        QUEUED,
+                        RUNNING,
+                        expired,
+                    ),
+                )
+            if cursor.rowcount == 1:
+                return self.get(row["id"])
+
+    def _renew(self, job_id: int) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (time.time(), job_id, RUNNING, self.owner),
+            )
+        return cursor.rowcount == 1
+
+    def _heartbeat(self, job_id: int, finished: threading.Event):
+        while not finished.wait(self.lease_seconds / 3):
+            if not self._renew(job_id):
+                return
+
+    def _progress(self, job_id: int) -> Callable[[int, int], None]:
+        def progress(done: int, total: int):
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE jobs SET done = ?, total = ?, heartbeat_at = ? "
+                    "WHERE id = ? AND status = ? AND owner = ?",
+                    (done, total, time.time(), job_id, RUNNING, self.owner),
+                )
+                status, owner = self._db.execute(
+                    "SELECT status, owner FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            if status != RUNNING:
+                raise JobCancelled(f"Embedding job {job_id} was {status}.")
+            if owner != self.owner:
+                raise JobCancelled(f"Embedding job {job_id} was taken over by {owner}.")
+
+        return progress
+
+    def _finish(self, job_id: int, status: str, error: str | None = None):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (status, error, time.time(), job_id, RUNNING, self.owner),
+            )
+
+    def run_next(self) -> bool:
+        """
+        Run the next queued job, if any, in the calling thread.
+
+        Returns:
+            bool: Whether a job was run.
+        """
+
+        job = self._claim_next()
+        if job is None:
+            return False
+        logger.info("Running embedding job %s for log '%s'", job["id"], job["log_id"])
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job["id"], finished),
+            name=f"embedding-job-{job['id']}-heartbeat",
+            daemon=True,
+        )
+        heartbeat.start()
+        try:
+            self.handler(job, self._progress(job["id"]))
+        except JobCancelled as e:
+            logger.info("Embedding job %s stopped: %s", job["id"], e)
+        except Exception as e:
+            logger.exception("Embedding job %s failed", job["id"])
+            self._finish(job["id"], FAILED, str(e))
+        else:
+            self._finish(job["id"], DONE)
+        finally:
+            finished.set()
+            heartbeat.join()
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if not self.run_next():
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start(self):
+        """Start the dispatcher thread."""
+
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="embedding-jobs", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Stop the dispatcher thread after the current job."""
+
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# -------------------------------------
+# Embedding worker processes
+# -------------------------------------
+_worker_model = None
+
+
+def init_embedding_worker(model_name: str, device: str = "cpu"):
+    """
+    Load the embedding model once in a worker process (ProcessPoolExecutor initializer).
+    """
+
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+
+    _worker_model = SentenceTransformer(model_name, device=device)
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    Embed texts with the worker's model (runs inside a worker process).
+    """
+
+    embeddings = _worker_model.encode(texts, batch_size=64, show_progress_bar=False)
+    return embeddings.tolist()
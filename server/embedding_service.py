@@ -0,0 +1,331 @@
+"""
+Embedding sidecar: one process hosts the embedding model for every server worker.
+
+Start it once per machine, then point the workers at it:
+
+    python embedding_service.py --address /tmp/log-viewer-embeddings.sock
+    EMBEDDING_SERVICE=/tmp/log-viewer-embeddings.sock uvicorn main:app --workers 4
+
+Workers started with EMBEDDING_SERVICE don't import torch or load the model; they
+send texts over a local socket (a Unix socket path, or host:port) and the sidecar
+batches concurrent requests from all workers into single encode() calls.
+
+Connections are authenticated with a shared key before anything is unpickled. A
+Unix socket is only accessible to its owner and falls back to a built-in key; a
+TCP address requires EMBEDDING_SERVICE_AUTHKEY to be set on both sides.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+from array import array
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Key of Unix sockets when EMBEDDING_SERVICE_AUTHKEY isn't set. It is public, so
+# it is never accepted for TCP addresses.
+UNIX_SOCKET_AUTHKEY = b"log-viewer"
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT = 0.005
+
+
+def parse_address(address: str) -> str | tuple[str, int]:
+    """
+    Turn 'host:port' into a TCP address; anything else is a Unix socket path.
+    """
+
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def resolve_authkey(
+    address: str | tuple[str, int], authkey: bytes | None = None
+) -> bytes:
+    """
+    Return the key authenticating connections to an address: 'authkey', else
+    EMBEDDING_SERVICE_AUTHKEY, else (Unix sockets only) UNIX_SOCKET_AUTHKEY.
+
+    Raises:
+        ValueError: If the address is TCP and no key is configured.
+    """
+
+    if authkey is None and os.getenv("EMBEDDING_SERVICE_AUTHKEY"):
+        authkey = os.environ["EMBEDDING_SERVICE_AUTHKEY"].encode()
+    if authkey is None:
+        if not isinstance(address, str):
+            raise ValueError(
+                "A TCP embedding service address requires EMBEDDING_SERVICE_AUTHKEY."
+            )
+        authkey = UNIX_SOCKET_AUTHKEY
+    return authkey
+
+
+def _pack(rows: list[list[float]]) -> tuple[int, bytes]:
+    dim = len(rows[0]) if rows else 0
+    packed = array("f")
+    for row in rows:
+        packed.extend(row)
+    return dim, packed.tobytes()
+
+
+def _unpack(dim: int, data: bytes) -> list[list[float]]:
+    values = array("f")
+    values.frombytes(data)
+    return [values[i : i + dim].tolist() for i in range(0, len(values), dim)]
+
+
+class EmbeddingServer:
+    """
+    Serve an encode function to local clients, batching concurrent requests.
+
+    Each connection is handled by its own thread, which queues the texts it receives.
+    A single batching thread takes everything queued within 'max_wait' seconds (up to
+    'max_batch' texts), encodes it in one call and hands each caller its rows.
+    Vectors are sent back as packed float32, which is what the model produces.
+
+    Attributes:
+        address (str | tuple[str, int]): The address being listened on.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], list[list[float]]],
+        address: str,
+        authkey: bytes | None = None,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        """
+        Initialize the server and start listening.
+
+        Args:
+            encode (Callable): Encodes a list of texts into one vector per text.
+            address (str): Unix socket path or 'host:port'.
+            authkey (bytes | None, optional): Shared secret clients must present.
+                Defaults to the key of resolve_authkey().
+            max_batch (int, optional): Maximum texts per encode() call. Defaults to 256.
+            max_wait (float, optional): Seconds to wait for more requests before
+                encoding a batch. Defaults to 0.005.
+        """
+
+        self.encode = encode
+        self.address = parse_address(address)
+        authkey = resolve_authkey(self.address, authkey)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._requests: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            self._remove_stale_socket(authkey)
+        self._listener = Listener(self.address, authkey=authkey)
+        self.address = self._listener.address
+        if isinstance(self.address, str):
+            os.chmod(self.address, 0o600)
+        self._closed = threading.Event()
+
+    def _remove_stale_socket(self, authkey: bytes):
+        try:
+            Client(self.address, authkey=authkey).close()
+        except (OSError, EOFError):
+            os.unlink(self.address)
+            return
+        raise RuntimeError(f"An embedding service is already running at {self.address}")
+
+    def _batch_loop(self):
+        while not self._closed.is_set():
+            try:
+                batch = [self._requests.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            size = len(batch[0][0])
+            while size < self.max_batch:
+                try:
+                    item = self._requests.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                rows = self.encode(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future in batch:
+                future.set_result(rows[start : start + len(item_texts)])
+                start += len(item_texts)
+
+    def _handle(self, conn: Connection):
+        with conn:
+            while True:
+                try:
+                    command, texts = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if command != "encode":
+                    conn.send(("error", f"Unknown command '{command}'"))
+                    continue
+                future: Future = Future()
+                self._requests.put((list(texts), future))
+                try:
+                    conn.send(("ok", *_pack(future.result())))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    conn.send(("error", str(e)))
+
+    def serve_forever(self):
+        """Accept connections until close() is called."""
+
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        logger.info("Embedding service listening on %s", self.address)
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed.is_set():
+                    return
+                logger.exception("Failed to accept an embedding client")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        """Stop accepting connections."""
+
+        self._closed.set()
+        self._listener.close()
+
+
+class EmbeddingClient:
+    """
+    Thread-safe client of an EmbeddingServer.
+
+    Each thread keeps its own connection, so concurrent requests from one worker
+    reach the server together and can share a batch. A broken connection is
+    reopened once per call (e.g. after the sidecar restarts).
+    """
+
+    def __init__(self, address: str, authkey: bytes | None = None, timeout: float = 60):
+        """
+        Initialize the client (connections are opened on first use).
+
+        Args:
+            address (str): Unix socket path or 'host:port' of the server.
+            authkey (bytes | None, optional): Shared secret of the server. Defaults
+                to the key of resolve_authkey().
+            timeout (float, optional): Seconds to wait for a response. Defaults to 60.
+        """
+
+        self.address = parse_address(address)
+        self.authkey = resolve_authkey(self.address, authkey)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        """
+        Encode texts on the server.
+
+        Args:
+            texts (list[str]): Texts to embed.
+
+        Returns:
+            list[list[float]]: One vector per text.
+
+        Raises:
+            RuntimeError: If the server failed to encode the texts.
+            TimeoutError: If the server didn't answer within the timeout.
+        """
+
+        if not texts:
+            return []
+        # Only a broken connection is retried. A timeout isn't (TimeoutError is an
+        # OSError, so it is raised outside the loop): the server may still be
+        # encoding the batch and a resend would double its load.
+        response: tuple[Any, ...] | None = None
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(("encode", list(texts)))
+                if conn.poll(self.timeout):
+                    response = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._drop_connection()
+                if attempt:
+                    raise
+        if response is None:
+            self._drop_connection()
+            raise TimeoutError("The embedding service did not respond.")
+        if response[0] != "ok":
+            raise RuntimeError(f"Embedding service error: {response[1]}")
+        return _unpack(response[1], response[2])
+
+    def close(self):
+        """Close this thread's connection."""
+
+        self._drop_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--address",
+        default=os.getenv("EMBEDDING_SERVICE", "/tmp/log-viewer-embeddings.sock"),
+        help="Unix socket path or host:port to listen on.",
+    )
+    parser.add_argument(
+        "--model", default="sentence-transformers/msmarco-MiniLM-L12-cos-v5"
+    )
+    parser.add_argument("--device", help="Torch device (default: best available).")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    device = args.device or (
+        "cuda"
+        if torch.cuda.is_available()
+        else "mps" if torch.backends.mps.is_available() else "cpu"
+    )
+    model = SentenceTransformer(args.model, device=device)
+    server = EmbeddingServer(
+        lambda texts: model.encode(
+            texts, batch_size=64, show_progress_bar=False
+        ).tolist(),
+        args.address,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
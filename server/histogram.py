@@ -0,0 +1,207 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+LOG_LEVELS = ("Debug", "Info", "Warn", "Error")
+
+# Bucket widths in seconds: 1s -> 10s -> 1m -> 10m -> 1h. Each width must be a
+# multiple of the previous one so coarser levels can be rolled up from finer ones.
+DEFAULT_RESOLUTIONS = (1, 10, 60, 600, 3600)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parse a log timestamp (ISO 8601, optionally ending in 'Z') into an aware datetime.
+    """
+
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def to_epoch_us(timestamp: str) -> int:
+    """
+    Convert a log timestamp to epoch microseconds, reading it as UTC if it has no offset.
+    """
+
+    moment = parse_timestamp(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def format_timestamp(epoch_seconds: int) -> str:
+    """
+    Format epoch seconds as an ISO 8601 UTC timestamp ending in 'Z'.
+    """
+
+    iso = datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).isoformat()
+    return iso.replace("+00:00", "Z")
+
+
+class LevelPyramid:
+    """
+    Multi-resolution histogram of log level counts.
+
+    Buckets are aligned to the Unix epoch, so a bucket at one resolution is always
+    fully contained in a bucket of every coarser resolution. Each resolution keeps
+    its non-empty buckets as sorted parallel lists, so a range query costs
+    O(log n + buckets returned).
+
+    Attributes:
+        resolutions (tuple[int, ...]): Bucket widths in seconds, finest first.
+        starts (dict[int, list[int]]): Sorted bucket start times (epoch seconds) per resolution.
+        counts (dict[int, list[list[int]]]): Per-bucket counts in LOG_LEVELS order per resolution.
+    """
+
+    def __init__(
+        self,
+        resolutions: tuple[int, ...],
+        starts: dict[int, list[int]],
+        counts: dict[int, list[list[int]]],
+    ):
+        self.resolutions = resolutions
+        self.starts = starts
+        self.counts = counts
+
+    @classmethod
+    def from_logs(
+        cls, logs: list[dict], resolutions: tuple[int, ...] = DEFAULT_RESOLUTIONS
+    ) -> "LevelPyramid":
+        """
+        Build the pyramid in a single pass over the logs.
+
+        Only the finest resolution is computed from the logs; every coarser level is
+        rolled up from the level below it, which costs O(buckets) rather than O(logs).
+
+        Args:
+            logs (list[dict]): List of log entries with 'timestamp' and 'level' fields.
+            resolutions (tuple[int, ...], optional): Bucket widths in seconds, finest first.
+
+        Returns:
+            LevelPyramid: The built pyramid.
+        """
+
+        for finer, coarser in zip(resolutions, resolutions[1:]):
+            if coarser % finer != 0:
+                raise ValueError(
+                    f"Resolution {coarser}s is not a multiple of {finer}s."
+                )
+
+        level_index = {level: i for i, level in enumerate(LOG_LEVELS)}
+        finest = resolutions[0]
+        buckets: dict[int, list[int]] = {}
+        for log in logs:
+            epoch = to_epoch_us(log["timestamp"]) // 1_000_000
+            bucket = epoch - epoch % finest
+            row = buckets.get(bucket)
+            if row is None:
+                row = buckets[bucket] = [0] * len(LOG_LEVELS)
+            row[level_index[log["level"]]] += 1
+
+        starts: dict[int, list[int]] = {}
+        counts: dict[int, list[list[int]]] = {}
+        for resolution in resolutions:
+            if resolution != finest:
+                rolled: dict[int, list[int]] = {}
+                for bucket, row in buckets.items():
+                    start = bucket - bucket % resolution
+                    target = rolled.get(start)
+                    if target is None:
+                        rolled[start] = list(row)
+                    else:
+                        for i, count in enumerate(row):
+                            target[i] += count
+                buckets = rolled
+            ordered = sorted(buckets)
+            starts[resolution] = ordered
+            counts[resolution] = [buckets[start] for start in ordered]
+        return cls(tuple(resolutions), starts, counts)
+
+    def _range(self, resolution: int, start: int | None, end: int | None):
+        """Return the slice bounds of buckets overlapping [start, end)."""
+
+        starts = self.starts[resolution]
+        lo = 0 if start is None else bisect_left(starts, start - start % resolution)
+        hi = len(starts) if end is None else bisect_left(starts, end)
+        return lo, max(lo, hi)
+
+    def pick_resolution(
+        self,
+        start: int | None = None,
+        end: int | None = None,
+        max_buckets: int = 500,
+    ) -> int:
+        """
+        Pick the finest resolution whose buckets in the range fit the bucket budget.
+
+        Args:
+            start (int | None, optional): Range start in epoch seconds. Defaults to the first bucket.
+            end (int | None, optional): Exclusive range end in epoch seconds. Defaults to the last bucket.
+            max_buckets (int, optional): Maximum number of buckets wanted. Defaults to 500.
+
+        Returns:
+            int: The chosen resolution in seconds (the coarsest one if none fits).
+        """
+
+        for resolution in self.resolutions:
+            lo, hi = self._range(resolution, start, end)
+            if hi - lo <= max_buckets:
+                return resolution
+        return self.resolutions[-1]
+
+    def query(
+        self,
+        start: int | None = None,
+        end: int | None = None,
+        max_buckets: int = 500,
+        resolution: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Return the level counts for a time range at a resolution that fits the budget.
+
+        Args:
+            start (int | None, optional): Range start in epoch seconds.
+            end (int | None, optional): Exclusive range end in epoch seconds.
+            max_buckets (int, optional): Bucket budget used to pick the resolution. Defaults to 500.
+            resolution (int | None, optional): Force a specific resolution instead of picking one.
+
+        Returns:
+            dict: {"resolution": seconds, "buckets": [{"bucket": iso timestamp, "Debug": n, ...}]}.
+            Empty buckets are omitted.
+        """
+
+        if resolution is None:
+            resolution = self.pick_resolution(start, end, max_buckets)
+        elif resolution not in self.starts:
+            raise ValueError(
+                f"Unknown resolution {resolution}s, expected one of {self.resolutions}."
+            )
+
+        lo, hi = self._range(resolution, start, end)
+        starts = self.starts[resolution]
+        counts = self.counts[resolution]
+        buckets = []
+        for i in range(lo, hi):
+            bucket: dict[str, Any] = {"bucket": format_timestamp(starts[i])}
+            bucket.update(zip(LOG_LEVELS, counts[i]))
+            buckets.append(bucket)
+        return {"resolution": resolution, "buckets": buckets}
+
+    def level_counts(self, resolution: int) -> dict[datetime, dict[str, int]]:
+        """
+        Return one resolution in the same shape as utils.get_log_level_counts.
+
+        The result can be passed straight to utils.compute_stats.
+
+        Args:
+            resolution (int): Resolution in seconds.
+
+        Returns:
+            dict: Mapping of bucket start datetimes to dictionaries with log level counts.
+        """
+
+        return {
+            datetime.fromtimestamp(start, tz=timezone.utc): dict(zip(LOG_LEVELS, row))
+            for start, row in zip(self.starts[resolution], self.counts[resolution])
+        }
@@ -0,0 +1,99 @@
+import math
+from typing import Any, Mapping
+from known_issues import CompiledIssue
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+def score_issue(
+    issue: CompiledIssue,
+    extracted: Mapping[str, list[dict[str, Any]]],
+    query_vector: list[float] | None = None,
+    keyword_weight: float = 0.5,
+) -> dict[str, Any]:
+    """
+    Score how likely an issue is to be relevant, without calling a model.
+
+    The keyword part is the share of the issue's keyword categories with at least one
+    hit in the logs. The semantic part is the cosine similarity between the issue's
+    embedding and the query (0 when either is missing). The score is their weighted
+    sum.
+
+    Args:
+        issue (CompiledIssue): The issue.
+        extracted (Mapping): Rows per keyword category, as returned by issue.match.
+        query_vector (list[float] | None, optional): Embedding of the query.
+        keyword_weight (float, optional): Weight of the keyword part, between 0 and 1.
+            Defaults to 0.5.
+
+    Returns:
+        dict: The issue name, score, keyword hits, categories hit and similarity.
+    """
+
+    categories = [category for category, kws in issue.keywords.items() if kws]
+    categories_hit = sum(1 for category in categories if extracted.get(category))
+    coverage = categories_hit / len(categories) if categories else 0.0
+    similarity = (
+        _cosine(query_vector, issue.embedding)
+        if query_vector is not None and issue.embedding is not None
+        else 0.0
+    )
+    return {
+        "issue": issue.name,
+        "score": round(
+            keyword_weight * coverage + (1 - keyword_weight) * max(similarity, 0.0), 4
+        ),
+        "keyword_hits": sum(len(rows) for rows in extracted.values()),
+        "categories_hit": categories_hit,
+        "similarity": round(similarity, 4),
+    }
+
+
+def rank_issues(
+    issues: Mapping[str, CompiledIssue],
+    extracted: Mapping[str, Mapping[str, list[dict[str, Any]]]],
+    query_vector: list[float] | None = None,
+    top_k: int = 5,
+    min_score: float = 0.0,
+    keyword_weight: float = 0.5,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Pick the issues worth an LLM evaluation.
+
+    Issues are scored with score_issue and ordered by score (then keyword hits). The
+    ones scoring at least 'min_score' are kept, at most 'top_k' of them, so the number
+    of model calls doesn't grow with the size of the issue catalog.
+
+    Args:
+        issues (Mapping[str, CompiledIssue]): Issues by name.
+        extracted (Mapping): Issue name -> rows per keyword category.
+        query_vector (list[float] | None, optional): Embedding of the query.
+        top_k (int, optional): Maximum number of issues kept; 0 for no limit.
+            Defaults to 5.
+        min_score (float, optional): Minimum score of a kept issue. Defaults to 0.
+        keyword_weight (float, optional): See score_issue. Defaults to 0.5.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The kept and the skipped issue scores, best
+        first. Skipped ones have a "reason": "below_threshold" or "top_k".
+    """
+
+    scores = sorted(
+        (
+            score_issue(issue, extracted.get(name, {}), query_vector, keyword_weight)
+            for name, issue in issues.items()
+        ),
+        key=lambda s: (-s["score"], -s["keyword_hits"], s["issue"]),
+    )
+    kept, skipped = [], []
+    for score in scores:
+        if score["score"] < min_score:
+            skipped.append({**score, "reason": "below_threshold"})
+        elif top_k and len(kept) >= top_k:
+            skipped.append({**score, "reason": "top_k"})
+        else:
+            kept.append(score)
+    return kept, skipped
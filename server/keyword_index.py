@@ -0,0 +1,428 @@
+import functools
+import operator
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, Iterable, Iterator
+from log_table import LogTable
+
+# Index terms: runs of ASCII word bytes. Anything else separates terms.
+TOKEN = re.compile(rb"\w+")
+
+# Posting encodings: row deltas in the narrowest array that fits, or a bitmap.
+_DELTA_TYPECODES = ("B", "H", "I", "Q")
+_ITEM_SIZES = [array(code).itemsize for code in _DELTA_TYPECODES]
+_BITMAP = len(_DELTA_TYPECODES)
+
+# A term matching more than this share of the rows isn't worth driving a query:
+# the linear scan in LogTable.find_rows is as fast.
+MAX_DRIVER_SHARE = 0.25
+
+# A partial term matching more distinct terms than this (e.g. '0x' in a log full
+# of addresses) isn't selective either, and expanding it would cost more than a scan.
+MAX_TERM_EXPANSION = 256
+
+# With a result limit and no level filter, a scan stops at the first hits; it's
+# the faster choice once a keyword's term is in this many times more rows than
+# the limit.
+EARLY_STOP_DENSITY = 16
+
+
+def _bitmap(rows: Iterable[int], row_count: int) -> bytearray:
+    bits = bytearray((row_count + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return bits
+
+
+def _bitmap_rows(bits: bytes) -> Iterator[int]:
+    for i, byte in enumerate(bits):
+        while byte:
+            low = byte & -byte
+            yield (i << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+class KeywordIndex:
+    """
+    Inverted index of the messages of a LogTable for keyword queries.
+
+    Each term (run of ASCII word characters) maps to the sorted rows containing it.
+    Posting lists are stored back to back in one buffer, each either as row deltas in
+    the narrowest array type that holds them or, when that would be larger, as a
+    bitmap over the rows. Levels get bitmaps too. The vocabulary is kept as one
+    newline-separated sorted blob, so a term costs a few bytes instead of a dict entry
+    and prefix, suffix and substring lookups over it are plain bytes.find calls.
+
+    A keyword is a plain substring, as in 'kw in msg', so its terms are looked up by
+    position: terms in the middle of the keyword must be whole terms of the row, the
+    first must end a term of the row, the last must start one, and a keyword that
+    is a single term may sit anywhere inside one. The most selective term gives the
+    candidate rows, cheap bitmap terms and levels narrow them down, and every
+    candidate is then verified against its messages. Results are therefore exactly
+    those of LogTable.find_rows; keywords without a selective term fall back to it.
+
+    Attributes:
+        table (LogTable): The indexed table.
+        build_seconds (float): Time taken to build the index.
+    """
+
+    __slots__ = (
+        "table",
+        "build_seconds",
+        "_vocabulary",
+        "_term_starts",
+        "_postings",
+        "_posting_starts",
+        "_encodings",
+        "_counts",
+        "_level_bitmaps",
+        "_level_counts",
+    )
+
+    def __init__(self, table: LogTable):
+        """
+        Build the index (one tokenizer pass over the message buffer).
+
+        Args:
+            table (LogTable): The table to index.
+        """
+
+        start = time.perf_counter()
+        self.table = table
+        row_count = len(table)
+        buffer, offsets, row_starts = (
+            table.buffer,
+            table.message_offsets,
+            table.row_starts,
+        )
+        findall = TOKEN.findall
+        rows_by_term: dict[bytes, list[int]] = {}
+        for row in range(row_count):
+            # A row's messages are contiguous; terms merged across two messages only
+            # ever make the candidates broader, which verification takes care of.
+            span = buffer[offsets[row_starts[row]] : offsets[row_starts[row + 1]]]
+            for term in set(findall(span)):
+                rows = rows_by_term.get(term)
+                if rows is None:
+                    rows_by_term[term] = [row]
+                else:
+                    rows.append(row)
+
+        terms = sorted(rows_by_term)
+        self._vocabulary = b"\n" + b"\n".join(terms) + b"\n"
+        self._term_starts = array(
+            "Q", accumulate((len(t) + 1 for t in terms), initial=0)
+        )
+        self._postings = bytearray()
+        self._posting_starts = array("Q", [0])
+        self._encodings = array("B")
+        self._counts = array("Q")
+        bitmap_bytes = (row_count + 7) // 8
+        for term in terms:
+            rows = rows_by_term.pop(term)
+            deltas = [rows[0], *map(operator.sub, rows[1:], rows)]
+            largest = max(deltas)
+            encoding = 0
+            while largest >= 1 << 8 * _ITEM_SIZES[encoding]:
+                encoding += 1
+            if len(rows) * _ITEM_SIZES[encoding] > bitmap_bytes:
+                self._postings += _bitmap(rows, row_count)
+                encoding = _BITMAP
+            else:
+                self._postings += array(_DELTA_TYPECODES[encoding], deltas).tobytes()
+            self._encodings.append(encoding)
+            self._counts.append(len(rows))
+            self._posting_starts.append(len(self._postings))
+
+        rows_by_level: dict[int, list[int]] = {}
+        for row, code in enumerate(table.levels):
+            rows_by_level.setdefault(code, []).append(row)
+        self._level_bitmaps = {}
+        self._level_counts = {}
+        for code, rows in rows_by_level.items():
+            name = table.level_names[code]
+            self._level_bitmaps[name] = bytes(_bitmap(rows, row_count))
+            self._level_counts[name] = len(rows)
+        self.build_seconds = time.perf_counter() - start
+
+    def __len__(self) -> int:
+        """Return the number of distinct terms."""
+
+        return len(self._counts)
+
+    def _term(self, term_id: int) -> bytes:
+        """Return a term of the vocabulary."""
+
+        return self._vocabulary[
+            self._term_starts[term_id] + 1 : self._term_starts[term_id + 1]
+        ]
+
+    def _matching_terms(
+        self, term: bytes, kind: str, max_rows: float
+    ) -> list[int] | None:
+        """
+        Return the terms equal to ('exact'), starting with ('prefix'), ending with
+        ('suffix') or containing ('inner') a term, or None once they hold more than
+        'max_rows' rows between them or number more than MAX_TERM_EXPANSION.
+
+        Exact and prefix matches are bisected in the sorted vocabulary; the others
+        search the vocabulary blob.
+        """
+
+        counts = self._counts
+        rows = 0
+
+        if kind in ("exact", "prefix"):
+            first = bisect_left(range(len(self)), term, key=self._term)
+            last = first
+            while last < len(self) and (
+                self._term(last) == term
+                if kind == "exact"
+                else self._term(last).startswith(term)
+            ):
+                rows += counts[last]
+                if rows > max_rows or last - first >= MAX_TERM_EXPANSION:
+                    return None
+                last += 1
+            return list(range(first, last))
+
+        vocabulary, term_starts = self._vocabulary, self._term_starts
+        needle = term + b"\n" if kind == "suffix" else term
+        found = []
+        position = vocabulary.find(needle)
+        while position != -1:
+            term_id = bisect_right(term_starts, position - 1) - 1
+            found.append(term_id)
+            rows += counts[term_id]
+            if rows > max_rows or len(found) > MAX_TERM_EXPANSION:
+                return None
+            # Continue with the next term.
+            position = vocabulary.find(needle, term_starts[term_id + 1])
+        return found
+
+    def _posting(self, term_id: int) -> bytes | list[int]:
+        """Return a term's bitmap or its decoded rows."""
+
+        encoding = self._encodings[term_id]
+        data = self._postings[
+            self._posting_starts[term_id] : self._posting_starts[term_id + 1]
+        ]
+        if encoding == _BITMAP:
+            return bytes(data)
+        return list(accumulate(array(_DELTA_TYPECODES[encoding], data)))
+
+    @staticmethod
+    def _keyword_terms(needle: bytes) -> list[tuple[bytes, str]]:
+        """
+        Split a keyword into its terms and how each may match a term of a row (see
+        the class docstring), the cheapest lookups first.
+        """
+
+        terms = []
+        for match in TOKEN.finditer(needle):
+            # A side of a term is open when the keyword ends there, so the row's term
+            # may go on; otherwise the keyword's next byte ends the row's term too.
+            open_left = match.start() == 0
+            open_right = match.end() == len(needle)
+            if open_left and open_right:
+                kind = "inner"
+            elif open_left:
+                kind = "suffix"
+            elif open_right:
+                kind = "prefix"
+            else:
+                kind = "exact"
+            terms.append((match.group(), kind))
+        order = ("exact", "prefix", "suffix", "inner")
+        return sorted(terms, key=lambda term: order.index(term[1]))
+
+    def _candidates(
+        self, needles: list[bytes], levels: list[str] | None, limit: int | None
+    ) -> list[int] | None:
+        """
+        Return candidate rows (sorted) for rows containing every needle, or None if
+        a scan would be faster.
+        """
+
+        row_count = len(self.table)
+        bitmap_bytes = (row_count + 7) // 8
+        max_rows = MAX_DRIVER_SHARE * row_count
+        driver: list[int] | None = None
+        driver_count = max_rows + 1
+        # Dense terms and levels are intersected into one bitmap filter.
+        bitmap_filter = None
+
+        def narrow(bits: int):
+            nonlocal bitmap_filter
+            bitmap_filter = bits if bitmap_filter is None else bitmap_filter & bits
+
+        if levels is not None:
+            narrow(
+                functools.reduce(
+                    operator.or_,
+                    (
+                        int.from_bytes(self._level_bitmaps[name], "little")
+                        for name in levels
+                    ),
+                )
+            )
+        for needle in needles:
+            for term, kind in self._keyword_terms(needle):
+                if kind in ("suffix", "inner") and driver is not None:
+                    # Scanning the vocabulary wouldn't narrow things much further.
+                    continue
+                term_ids = self._matching_terms(term, kind, max_rows)
+                if term_ids is None:
+                    continue
+                if not term_ids:
+                    return []
+                encodings = [self._encodings[term_id] for term_id in term_ids]
+                count = sum(self._counts[term_id] for term_id in term_ids)
+                if all(encoding == _BITMAP for encoding in encodings):
+                    narrow(
+                        functools.reduce(
+                            operator.or_,
+                            (
+                                int.from_bytes(self._posting(term_id), "little")
+                                for term_id in term_ids
+                            ),
+                        )
+                    )
+                elif _BITMAP not in encodings and count < driver_count:
+                    driver, driver_count = term_ids, count
+
+        if (
+            limit is not None
+            and levels is None
+            and driver_count >= limit * EARLY_STOP_DENSITY
+        ):
+            return None
+        if driver is not None:
+            rows = sorted({row for term_id in driver for row in self._posting(term_id)})
+        elif levels is not None and (
+            sum(self._level_counts[name] for name in levels) <= max_rows
+        ):
+            return list(_bitmap_rows(bitmap_filter.to_bytes(bitmap_bytes, "little")))
+        else:
+            return None
+        if bitmap_filter is not None:
+            bits = bitmap_filter.to_bytes(bitmap_bytes, "little")
+            rows = [row for row in rows if bits[row >> 3] >> (row & 7) & 1]
+        return rows
+
+    def find_all(
+        self,
+        keywords: Iterable[str],
+        levels: Iterable[str] | None = None,
+        limit: int | None = None,
+    ) -> list[int]:
+        """
+        Return the rows, in order, with messages containing every keyword.
+
+        Each keyword has to be found within a single message, but different keywords
+        may be in different messages of a row.
+
+        Args:
+            keywords (Iterable[str]): Plain substrings to look for.
+            levels (Iterable[str] | None, optional): Only return rows with these levels.
+            limit (int | None, optional): Stop after this many rows.
+
+        Returns:
+            list[int]: Matching row indices.
+        """
+
+        keywords = list(keywords)
+        if not keywords:
+            return self.table.find_rows("", levels=levels, limit=limit)
+        needles = [kw.encode("utf-8", "surrogatepass") for kw in keywords]
+        allowed = None
+        if levels is not None:
+            allowed = [name for name in levels if name in self._level_bitmaps]
+            if not allowed:
+                return []
+        candidates = self._candidates(needles, allowed, limit)
+        if candidates is None:
+            # Nothing selective: scan for the longest keyword, verify the rest.
+            longest = max(range(len(keywords)), key=lambda i: len(needles[i]))
+            candidates = self.table.find_rows(
+                keywords[longest],
+                levels=allowed,
+                limit=limit if len(keywords) == 1 else None,
+            )
+            needles = needles[:longest] + needles[longest + 1 :]
+
+        table = self.table
+        offsets, row_starts, buffer = (
+            table.message_offsets,
+            table.row_starts,
+            table.buffer,
+        )
+        rows = []
+        for row in candidates:
+            if limit is not None and len(rows) >= limit:
+                break
+            first, end = row_starts[row], row_starts[row + 1]
+            for needle in needles:
+                for message in range(first, end):
+                    if (
+                        buffer.find(needle, offsets[message], offsets[message + 1])
+                        != -1
+                    ):
+                        break
+                else:
+                    break
+            else:
+                rows.append(row)
+        return rows
+
+    def find_rows(
+        self,
+        keyword: str,
+        levels: Iterable[str] | None = None,
+        limit: int | None = None,
+    ) -> list[int]:
+        """
+        Return the rows, in order, with a message containing a keyword (the index
+        counterpart of LogTable.find_rows, with the same results).
+        """
+
+        if not keyword:
+            return self.table.find_rows(keyword, levels=levels, limit=limit)
+        return self.find_all([keyword], levels=levels, limit=limit)
+
+    def nbytes(self) -> int:
+        """
+        Return the approximate memory footprint of the index in bytes.
+        """
+
+        columns = (
+            self._vocabulary,
+            self._term_starts,
+            self._postings,
+            self._posting_starts,
+            self._encodings,
+            self._counts,
+        )
+        size = sum(sys.getsizeof(column) for column in columns)
+        size += sum(sys.getsizeof(bits) for bits in self._level_bitmaps.values())
+        return size
+
+    def report(self) -> dict[str, Any]:
+        """
+        Return the size and build time of the index next to the size of the table.
+
+        Returns:
+            dict: 'rows', 'terms', 'index_bytes', 'table_bytes' and 'build_ms'.
+        """
+
+        return {
+            "rows": len(self.table),
+            "terms": len(self),
+            "index_bytes": self.nbytes(),
+            "table_bytes": self.table.nbytes(),
+            "build_ms": round(self.build_seconds * 1000, 1),
+        }
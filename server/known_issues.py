@@ -0,0 +1,343 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Callable, Mapping
+from context_index import ContextIndex, keyword_context
+from keyword_index import KeywordIndex
+from log_table import LogTable
+
+logger = logging.getLogger(__name__)
+
+# Fields of a known issue, as the client's issue editor produces them.
+ISSUE_FIELDS = ("description", "context", "keywords", "conditions", "resolution")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    name TEXT PRIMARY KEY,
+    details TEXT NOT NULL,
+    version TEXT NOT NULL,
+    embedding BLOB,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def issue_version(details: Mapping[str, Any]) -> str:
+    """
+    Return the version hash of an issue: a digest of its canonical JSON, so equal
+    details always get the same version, wherever they come from.
+    """
+
+    canonical = json.dumps(details, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+def log_fingerprint(table: LogTable) -> str:
+    """
+    Return a digest of a table's columns, identifying the same logs across requests.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for column in (
+        table.timestamps,
+        table.levels,
+        table.row_starts,
+        table.message_offsets,
+        table.buffer,
+    ):
+        digest.update(memoryview(column).cast("B"))
+    return digest.hexdigest()
+
+
+class CompiledIssue:
+    """
+    A known issue normalized once for matching.
+
+    Keywords are stripped, empty ones dropped and duplicates removed, so a matcher
+    scans each distinct keyword once. The version identifies the details, so match
+    results can be cached per (log, version).
+
+    Attributes:
+        name (str): Issue name.
+        details (dict): The issue fields (see ISSUE_FIELDS).
+        version (str): Version hash of the details.
+        keywords (dict[str, tuple[str, ...]]): Normalized keywords per category.
+        embedding (list[float] | None): Embedding of the description and context.
+    """
+
+    __slots__ = ("name", "details", "version", "keywords", "embedding")
+
+    def __init__(
+        self,
+        name: str,
+        details: Mapping[str, Any],
+        embedding: list[float] | None = None,
+    ):
+        """
+        Compile an issue.
+
+        Args:
+            name (str): Issue name.
+            details (Mapping): Issue fields; missing ones default to empty.
+            embedding (list[float] | None, optional): Precomputed embedding.
+
+        Raises:
+            ValueError: If the keywords aren't a mapping of category to list of strings.
+        """
+
+        keywords = details.get("keywords") or {}
+        if not isinstance(keywords, Mapping) or not all(
+            isinstance(kws, list) and all(isinstance(kw, str) for kw in kws)
+            for kws in keywords.values()
+        ):
+            raise ValueError(f"Keywords of '{name}' must map categories to strings.")
+        self.name = name
+        self.details = {
+            "description": details.get("description") or "",
+            "context": details.get("context") or "",
+            "keywords": {category: list(kws) for category, kws in keywords.items()},
+            "conditions": details.get("conditions"),
+            "resolution": details.get("resolution"),
+        }
+        self.version = issue_version(self.details)
+        self.keywords = {
+            category: tuple(dict.fromkeys(kw.strip() for kw in kws if kw.strip()))
+            for category, kws in keywords.items()
+        }
+        self.embedding = embedding
+
+    @property
+    def text(self) -> str:
+        """The text that is embedded: description and context."""
+
+        return f"{self.details['description']}\n{self.details['context']}".strip()
+
+    def match(
+        self,
+        index: ContextIndex,
+        top_n: int = 5,
+        before: int = 2,
+        after: int = 2,
+        seconds: float | None = None,
+        keyword_index: KeywordIndex | None = None,
+    ) -> tuple[dict[str, list[dict[str, Any]]], dict[str, list[dict[str, Any]]]]:
+        """
+        Find the issue's keyword hits and their context (see keyword_context).
+        """
+
+        return keyword_context(
+            index,
+            self.keywords,
+            top_n=top_n,
+            before=before,
+            after=after,
+            seconds=seconds,
+            keyword_index=keyword_index,
+        )
+
+
+class KnownIssueRegistry:
+    """
+    Server-side store of known issues, persisted in SQLite.
+
+    Issues are kept compiled in memory. Each has a version hash of its details and
+    the registry has a version hash over all of them, so clients can reference
+    issues by version and notice when theirs are stale. The description and context
+    of each issue are embedded once, when it is stored or first needed.
+
+    Several processes (server workers) may share the database. Before each read the
+    registry checks SQLite's data_version, which changes when another connection
+    commits, and then reloads the issues whose version changed.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+    """
+
+    def __init__(
+        self, path: str, embed: Callable[[list[str]], list[list[float]]] | None = None
+    ):
+        """
+        Initialize the registry and load the stored issues.
+
+        Args:
+            path (str): Path of the SQLite database (created if missing).
+            embed (Callable | None, optional): Embeds a list of texts. Defaults to
+                None (no embeddings).
+        """
+
+        self.path = path
+        self.embed = embed
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+        self._issues: dict[str, CompiledIssue] = {}
+        self._data_version: int | None = None
+        self._sync()
+
+    def _sync(self):
+        """Reload the issues changed by other connections since the last check."""
+
+        with self._lock:
+            (data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+            if data_version == self._data_version:
+                return
+            stored = dict(self._db.execute("SELECT name, version FROM issues"))
+            changed = [
+                name
+                for name, version in stored.items()
+                if name not in self._issues
+                or self._issues[name].version != version
+                or self._issues[name].embedding is None
+            ]
+            rows = self._db.execute(
+                "SELECT name, details, embedding FROM issues WHERE name IN "
+                f"({', '.join('?' * len(changed))})",
+                changed,
+            ).fetchall()
+            for name in [name for name in self._issues if name not in stored]:
+                del self._issues[name]
+            for name, details, blob in rows:
+                embedding = array("f", blob).tolist() if blob else None
+                self._issues[name] = CompiledIssue(name, json.loads(details), embedding)
+            self._data_version = data_version
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._issues)
+
+    @property
+    def version(self) -> str:
+        """Version hash of the whole registry."""
+
+        self._sync()
+        with self._lock:
+            versions = {name: issue.version for name, issue in self._issues.items()}
+        return issue_version(versions)
+
+    def issues(self) -> dict[str, CompiledIssue]:
+        """Return the compiled issues by name."""
+
+        self._sync()
+        with self._lock:
+            return dict(self._issues)
+
+    def get(self, name: str) -> CompiledIssue | None:
+        """Return an issue by name, or None."""
+
+        self._sync()
+        with self._lock:
+            return self._issues.get(name)
+
+    def put(self, name: str, details: Mapping[str, Any]) -> CompiledIssue:
+        """
+        Create or replace an issue, embedding it if its text changed.
+
+        Args:
+            name (str): Issue name.
+            details (Mapping): Issue fields.
+
+        Returns:
+            CompiledIssue: The stored issue.
+
+        Raises:
+            ValueError: If the details are invalid.
+        """
+
+        issue = CompiledIssue(name, details)
+        previous = self.get(name)
+        if previous is not None and previous.text == issue.text:
+            issue.embedding = previous.embedding
+        if issue.embedding is None:
+            self._embed(issue)
+        blob = array("f", issue.embedding).tobytes() if issue.embedding else None
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO issues "
+                "(name, details, version, embedding, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (name, json.dumps(issue.details), issue.version, blob, time.time()),
+            )
+            self._issues[name] = issue
+        return issue
+
+    def delete(self, name: str) -> bool:
+        """
+        Delete an issue.
+
+        Returns:
+            bool: Whether the issue existed.
+        """
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM issues WHERE name = ?", (name,))
+            return self._issues.pop(name, None) is not None
+
+    def resolve(self, refs: Mapping[str, str | None]) -> dict[str, CompiledIssue]:
+        """
+        Look up issues referenced by name and (optionally) version.
+
+        Args:
+            refs (Mapping[str, str | None]): Issue name -> expected version, or None
+                for the current one.
+
+        Returns:
+            dict[str, CompiledIssue]: The issues by name.
+
+        Raises:
+            KeyError: If an issue doesn't exist.
+            ValueError: If an issue's version isn't the expected one.
+        """
+
+        issues = {}
+        for name, version in refs.items():
+            issue = self.get(name)
+            if issue is None:
+                raise KeyError(f"Unknown known issue '{name}'.")
+            if version is not None and version != issue.version:
+                raise ValueError(
+                    f"Known issue '{name}' is at version {issue.version}, not {version}."
+                )
+            issues[name] = issue
+        return issues
+
+    def embedding(self, issue: CompiledIssue) -> list[float] | None:
+        """
+        Return an issue's embedding, computing it if missing (and storing it if the
+        issue is in the registry).
+        """
+
+        if issue.embedding is None:
+            self._embed(issue)
+            if issue.embedding is not None and self.get(issue.name) is issue:
+                with self._lock, self._db:
+                    self._db.execute(
+                        "UPDATE issues SET embedding = ? WHERE name = ? AND version = ?",
+                        (
+                            array("f", issue.embedding).tobytes(),
+                            issue.name,
+                            issue.version,
+                        ),
+                    )
+        return issue.embedding
+
+    def _embed(self, issue: CompiledIssue):
+        if self.embed is None or not issue.text:
+            return
+        try:
+            issue.embedding = list(self.embed([issue.text])[0])
+        except Exception:
+            # Matching doesn't need the embedding; it is retried on the next update.
+            logger.exception("Failed to embed known issue '%s'", issue.name)
+
+    def close(self):
+        """Close the database."""
+
+        with self._lock:
+            self._db.close()
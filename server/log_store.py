@@ -0,0 +1,238 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Iterable
+from log_table import LogTable
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Column file name -> (LogTable attribute, array typecode; None for the raw buffer).
+COLUMN_FILES = {
+    "timestamps.bin": ("timestamps", "q"),
+    "levels.bin": ("levels", "B"),
+    "threads.bin": ("threads", "I"),
+    "message_offsets.bin": ("message_offsets", "Q"),
+    "row_starts.bin": ("row_starts", "Q"),
+    "messages.bin": ("buffer", None),
+}
+
+
+class LogStore:
+    """
+    On-disk columnar copy of every uploaded log, read through memory maps.
+
+    Each log id gets a directory with one file per LogTable column (raw machine
+    integers in native byte order) and a meta.json with the interned level/thread
+    names, per-row exceptions and the row count. Opening a log maps the column files
+    and wraps them in a read-only LogTable, so opening costs a few system calls no
+    matter how large the log is, and pages are only read from disk when a row, a
+    filter or a statistic touches them. Elasticsearch then only needs to serve
+    searches; it is no longer read to get the logs back.
+
+    Directories are written next to the target and renamed into place, so readers
+    never see a partially written log. Recently opened tables are cached with the
+    generation of their directory (see generation()), so a log rewritten or deleted
+    by another process is reopened instead of served from the cache.
+
+    Attributes:
+        root (str): Directory holding one subdirectory per log id.
+    """
+
+    def __init__(self, root: str, cache_size: int = 16):
+        """
+        Initialize the store.
+
+        Args:
+            root (str): Directory for the logs (created if missing).
+            cache_size (int, optional): Number of opened tables to keep. Defaults to 16.
+        """
+
+        self.root = root
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, tuple[str, LogTable]] = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, log_id: str) -> str:
+        if not log_id or os.sep in log_id or log_id in (".", "..") or "/" in log_id:
+            raise ValueError(f"Invalid log id '{log_id}'.")
+        return os.path.join(self.root, log_id)
+
+    def exists(self, log_id: str) -> bool:
+        """Whether a log is stored."""
+
+        return os.path.exists(os.path.join(self._path(log_id), "meta.json"))
+
+    def generation(self, log_id: str) -> str | None:
+        """
+        Return a token that changes whenever a log is written again.
+
+        Every write renames a new directory into place, so the inode and modification
+        time of its meta.json identify the stored copy.
+
+        Args:
+            log_id (str): Log (index) id.
+
+        Returns:
+            str | None: The generation, or None if the log is not stored.
+        """
+
+        try:
+            stat = os.stat(os.path.join(self._path(log_id), "meta.json"))
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_ino}-{stat.st_mtime_ns}"
+
+    def modified(self, log_id: str) -> float | None:
+        """Return when a log was last written (a Unix time), or None if not stored."""
+
+        try:
+            return os.path.getmtime(os.path.join(self._path(log_id), "meta.json"))
+        except FileNotFoundError:
+            return None
+
+    def write(self, log_id: str, logs: Iterable[dict[str, Any]] | LogTable) -> LogTable:
+        """
+        Write a log, replacing any stored copy.
+
+        Args:
+            log_id (str): Log (index) id.
+            logs (Iterable[dict] | LogTable): The log entries.
+
+        Returns:
+            LogTable: The in-memory table that was written.
+        """
+
+        table = LogTable.from_logs(logs)
+        target = self._path(log_id)
+        staging = f"{target}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(staging)
+        try:
+            for name, (attribute, _) in COLUMN_FILES.items():
+                with open(os.path.join(staging, name), "wb") as f:
+                    f.write(getattr(table, attribute))
+            meta = {
+                "version": FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "rows": len(table),
+                "level_names": table.level_names,
+                "thread_names": table.thread_names,
+                "raw_timestamps": table.raw_timestamps,
+                "unparsed_timestamps": sorted(table.unparsed_timestamps),
+                "extras": table.extras,
+            }
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            with self._lock:
+                self._cache.pop(log_id, None)
+                retired = None
+                if os.path.exists(target):
+                    retired = f"{target}.old-{uuid.uuid4().hex}"
+                    os.rename(target, retired)
+                os.rename(staging, target)
+            if retired is not None:
+                # Open maps of the old files stay valid until they are dropped.
+                shutil.rmtree(retired, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return table
+
+    def open(self, log_id: str) -> LogTable | None:
+        """
+        Open a stored log as a read-only, memory-mapped LogTable.
+
+        Args:
+            log_id (str): Log (index) id.
+
+        Returns:
+            LogTable | None: The table, or None if the log is not stored.
+        """
+
+        generation = self.generation(log_id)
+        with self._lock:
+            cached = self._cache.get(log_id)
+            if cached is not None and cached[0] == generation:
+                self._cache.move_to_end(log_id)
+                return cached[1]
+            # Rewritten or deleted since it was opened (possibly by another process).
+            self._cache.pop(log_id, None)
+        if generation is None:
+            return None
+
+        path = self._path(log_id)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if (
+            meta.get("version") != FORMAT_VERSION
+            or meta.get("byteorder") != sys.byteorder
+        ):
+            logger.warning(
+                "Ignoring stored log '%s' written in an incompatible format.", log_id
+            )
+            return None
+
+        columns: dict[str, Any] = {}
+        for name, (attribute, typecode) in COLUMN_FILES.items():
+            columns[attribute] = _map_column(os.path.join(path, name), typecode)
+        table = LogTable.from_columns(
+            level_names=meta["level_names"],
+            thread_names=meta["thread_names"],
+            raw_timestamps={int(k): v for k, v in meta["raw_timestamps"].items()},
+            unparsed_timestamps=set(meta["unparsed_timestamps"]),
+            extras={int(k): v for k, v in meta["extras"].items()},
+            **columns,
+        )
+        if len(table) != meta["rows"]:
+            logger.warning(
+                "Ignoring stored log '%s': expected %s rows.", log_id, meta["rows"]
+            )
+            return None
+
+        with self._lock:
+            self._cache[log_id] = (generation, table)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return table
+
+    def delete(self, log_id: str):
+        """Remove a stored log (no-op if it is not stored)."""
+
+        path = self._path(log_id)
+        with self._lock:
+            self._cache.pop(log_id, None)
+            if not os.path.exists(path):
+                return
+            retired = f"{path}.old-{uuid.uuid4().hex}"
+            os.rename(path, retired)
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def _map_column(path: str, typecode: str | None) -> Any:
+    """
+    Map a column file read-only and return a zero-copy view of it.
+
+    The raw message buffer is returned as the mmap itself (it supports find() and
+    slicing); integer columns as memoryviews cast to their item type. Empty files
+    can't be mapped and become empty (read-only) buffers.
+    """
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b"" if typecode is None else memoryview(b"").cast(typecode)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if typecode is None:
+        return mapped
+    return memoryview(mapped).cast(typecode)
@@ -0,0 +1,540 @@
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator
+from histogram import EPOCH, LOG_LEVELS, to_epoch_us
+
+# Keys stored in columns. Any other key of a log entry is kept per row in 'extras'.
+COLUMN_KEYS = ("timestamp", "level", "thread ID", "messages")
+
+
+def _is_canonical(timestamp: str) -> bool:
+    """Whether a timestamp has the 'YYYY-MM-DDTHH:MM:SS.mmmZ' form format_timestamp_us produces."""
+
+    return (
+        len(timestamp) == 24
+        and timestamp[10] == "T"
+        and timestamp[19] == "."
+        and timestamp[23] == "Z"
+    )
+
+
+def format_timestamp_us(epoch_us: int) -> str:
+    """
+    Format epoch microseconds as an ISO 8601 UTC timestamp with milliseconds, ending in 'Z'.
+    """
+
+    moment = EPOCH + timedelta(microseconds=epoch_us)
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def deep_getsizeof(value: Any, seen: set[int] | None = None) -> int:
+    """
+    Return the size in bytes of a value and everything it references (dicts, lists,
+    tuples and strings), counting shared objects once.
+    """
+
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(
+            deep_getsizeof(k, seen) + deep_getsizeof(v, seen) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(deep_getsizeof(item, seen) for item in value)
+    return size
+
+
+class LogRow(Mapping):
+    """
+    Read-only, dict-compatible view of one row of a LogTable.
+
+    Values are decoded from the columns on access, so a view costs two slots no
+    matter how long the row's messages are. Use dict(row) or LogTable.row_dict()
+    for a real dict (e.g. before json.dumps).
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "LogTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        table, row = self._table, self._row
+        if key == "timestamp":
+            return table.timestamp_str(row)
+        if key == "level":
+            return table.level_names[table.levels[row]]
+        if key == "thread ID":
+            thread = table.thread_names[table.threads[row]]
+            if thread is None:
+                raise KeyError(key)
+            return thread
+        if key == "messages":
+            return table.messages(row)
+        extras = table.extras.get(row)
+        if extras is None or key not in extras:
+            raise KeyError(key)
+        return extras[key]
+
+    def __iter__(self) -> Iterator[str]:
+        table, row = self._table, self._row
+        for key in COLUMN_KEYS:
+            if key != "thread ID" or table.thread_names[table.threads[row]] is not None:
+                yield key
+        yield from table.extras.get(row, ())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"LogRow({dict(self)!r})"
+
+
+class LogTable(Sequence):
+    """
+    Columnar, array-backed storage for log entries.
+
+    A list of log dicts costs a dict, four keys, a message list and several strings
+    per row. A LogTable stores the same data in a few flat columns:
+
+    - timestamps: epoch microseconds (array of int64)
+    - levels: codes into 'level_names' (array of uint8)
+    - threads: codes into the interned 'thread_names' (array of uint32; None marks a
+      row without a 'thread ID')
+    - messages: all messages UTF-8 encoded back to back in one shared buffer, with
+      'message_offsets' (byte offset of each message, plus the end) and 'row_starts'
+      (index of each row's first message, plus the end)
+
+    Timestamps that don't have the canonical 'YYYY-MM-DDTHH:MM:SS.mmmZ' form are also
+    kept verbatim in 'raw_timestamps', so rows read back exactly as they were added.
+    Rows are exposed as dict-compatible LogRow views; slicing returns a new LogTable.
+    """
+
+    __slots__ = (
+        "timestamps",
+        "levels",
+        "level_names",
+        "threads",
+        "thread_names",
+        "buffer",
+        "message_offsets",
+        "row_starts",
+        "raw_timestamps",
+        "unparsed_timestamps",
+        "extras",
+        "_level_codes",
+        "_thread_codes",
+        "_second_cache",
+    )
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.levels = array("B")
+        self.level_names: list[str] = list(LOG_LEVELS)
+        self.threads = array("I")
+        self.thread_names: list[str | None] = [None]
+        self.buffer = bytearray()
+        self.message_offsets = array("Q", [0])
+        self.row_starts = array("Q", [0])
+        self.raw_timestamps: dict[int, str] = {}
+        # Rows whose timestamp could not be parsed (their timestamps entry is 0).
+        self.unparsed_timestamps: set[int] = set()
+        self.extras: dict[int, dict[str, Any]] = {}
+        self._level_codes = {name: i for i, name in enumerate(self.level_names)}
+        self._thread_codes: dict[str | None, int] = {None: 0}
+        self._second_cache: dict[str, int] = {}
+
+    @classmethod
+    def from_logs(cls, logs: Iterable[Mapping[str, Any]]) -> "LogTable":
+        """
+        Build a table from log entries (returned unchanged if already a LogTable).
+
+        Args:
+            logs (Iterable[Mapping]): Log entries with 'timestamp', 'level' and
+                'messages' and optionally 'thread ID' and other keys.
+
+        Returns:
+            LogTable: The table.
+        """
+
+        if isinstance(logs, LogTable):
+            return logs
+        table = cls()
+        for log in logs:
+            table.append(log)
+        return table
+
+    @classmethod
+    def from_columns(
+        cls,
+        timestamps: Sequence[int],
+        levels: Sequence[int],
+        level_names: list[str],
+        threads: Sequence[int],
+        thread_names: list[str | None],
+        buffer: Any,
+        message_offsets: Sequence[int],
+        row_starts: Sequence[int],
+        raw_timestamps: dict[int, str] | None = None,
+        unparsed_timestamps: set[int] | None = None,
+        extras: dict[int, dict[str, Any]] | None = None,
+    ) -> "LogTable":
+        """
+        Build a table around existing columns without copying them.
+
+        The columns can be arrays or any buffer with the same item layout (e.g.
+        memoryviews of memory-mapped files). Tables whose columns are not arrays are
+        read-only. See the class docstring for the meaning of each column.
+
+        Returns:
+            LogTable: The table.
+        """
+
+        table = cls.__new__(cls)
+        table.timestamps = timestamps
+        table.levels = levels
+        table.level_names = list(level_names)
+        table.threads = threads
+        table.thread_names = list(thread_names)
+        table.buffer = buffer
+        table.message_offsets = message_offsets
+        table.row_starts = row_starts
+        table.raw_timestamps = raw_timestamps or {}
+        table.unparsed_timestamps = unparsed_timestamps or set()
+        table.extras = extras or {}
+        table._level_codes = {name: i for i, name in enumerate(table.level_names)}
+        table._thread_codes = {name: i for i, name in enumerate(table.thread_names)}
+        table._second_cache = {}
+        return table
+
+    def _parse_us(self, timestamp: str) -> int:
+        if _is_canonical(timestamp):
+            # Parse each distinct second once; most neighbouring rows share it.
+            seconds = self._second_cache.get(timestamp[:19])
+            if seconds is None:
+                moment = datetime.fromisoformat(timestamp[:19] + "+00:00")
+                seconds = (moment - EPOCH) // timedelta(seconds=1)
+                if len(self._second_cache) > 4096:
+                    self._second_cache.clear()
+                self._second_cache[timestamp[:19]] = seconds
+            return seconds * 1_000_000 + int(timestamp[20:23]) * 1000
+        return to_epoch_us(timestamp)
+
+    def append(self, log: Mapping[str, Any]):
+        """
+        Add a log entry at the end of the table.
+
+        Raises:
+            KeyError: If the entry has no 'timestamp', 'level' or 'messages'.
+            TypeError: If 'messages' is not a list of strings.
+        """
+
+        if not isinstance(self.timestamps, array):
+            raise TypeError("Memory-mapped tables are read-only.")
+        row = len(self.timestamps)
+        timestamp = log["timestamp"]
+        level = log["level"]
+        messages = log["messages"]
+        if not isinstance(messages, list) or not all(
+            isinstance(m, str) for m in messages
+        ):
+            raise TypeError(f"Row {row}: 'messages' must be a list of strings.")
+
+        try:
+            epoch_us = self._parse_us(timestamp)
+            if not _is_canonical(timestamp):
+                self.raw_timestamps[row] = timestamp
+        except (TypeError, ValueError, AttributeError):
+            epoch_us = 0
+            self.raw_timestamps[row] = timestamp
+            self.unparsed_timestamps.add(row)
+        self.timestamps.append(epoch_us)
+
+        code = self._level_codes.get(level)
+        if code is None:
+            code = len(self.level_names)
+            self.level_names.append(level)
+            self._level_codes[level] = code
+        self.levels.append(code)
+
+        thread = log.get("thread ID")
+        code = self._thread_codes.get(thread)
+        if code is None:
+            code = len(self.thread_names)
+            self.thread_names.append(thread)
+            self._thread_codes[thread] = code
+        self.threads.append(code)
+
+        for message in messages:
+            self.buffer += message.encode("utf-8", "surrogatepass")
+            self.message_offsets.append(len(self.buffer))
+        self.row_starts.append(len(self.message_offsets) - 1)
+
+        extras = {k: v for k, v in log.items() if k not in COLUMN_KEYS}
+        if extras:
+            self.extras[row] = extras
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._slice(start, max(start, stop))
+            return self.take(range(start, stop, step))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("LogTable index out of range")
+        return LogRow(self, index)
+
+    def __iter__(self) -> Iterator[LogRow]:
+        for row in range(len(self)):
+            yield LogRow(self, row)
+
+    def __reduce__(self):
+        # __slots__ classes need explicit pickling (shards go to worker processes).
+        return (_rebuild_table, (self._state(),))
+
+    def _state(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def _slice(self, start: int, stop: int) -> "LogTable":
+        """Copy a contiguous range of rows column by column."""
+
+        table = LogTable()
+        # bytes() copies, so slices of memory-mapped columns become plain arrays.
+        table.timestamps = array("q", bytes(self.timestamps[start:stop]))
+        table.levels = array("B", bytes(self.levels[start:stop]))
+        table.threads = array("I", bytes(self.threads[start:stop]))
+        table.level_names = list(self.level_names)
+        table.thread_names = list(self.thread_names)
+        table._level_codes = dict(self._level_codes)
+        table._thread_codes = dict(self._thread_codes)
+
+        first_message, end_message = self.row_starts[start], self.row_starts[stop]
+        first_byte = self.message_offsets[first_message]
+        end_byte = self.message_offsets[end_message]
+        table.buffer = bytearray(self.buffer[first_byte:end_byte])
+        table.message_offsets = array(
+            "Q",
+            (
+                o - first_byte
+                for o in self.message_offsets[first_message : end_message + 1]
+            ),
+        )
+        table.row_starts = array(
+            "Q", (r - first_message for r in self.row_starts[start : stop + 1])
+        )
+
+        def shift(rows: Iterable[int]) -> Iterator[int]:
+            return (row for row in rows if start <= row < stop)
+
+        table.raw_timestamps = {
+            row - start: self.raw_timestamps[row] for row in shift(self.raw_timestamps)
+        }
+        table.unparsed_timestamps = {
+            row - start for row in shift(self.unparsed_timestamps)
+        }
+        table.extras = {row - start: self.extras[row] for row in shift(self.extras)}
+        return table
+
+    def take(self, rows: Iterable[int]) -> "LogTable":
+        """
+        Return a new table with the given rows, in the given order.
+        """
+
+        table = LogTable()
+        for row in rows:
+            table.append(LogRow(self, row))
+        return table
+
+    def timestamp_str(self, row: int) -> str:
+        """Return the timestamp of a row as it was added."""
+
+        raw = self.raw_timestamps.get(row)
+        return raw if raw is not None else format_timestamp_us(self.timestamps[row])
+
+    def messages(self, row: int) -> list[str]:
+        """Return the messages of a row."""
+
+        offsets, buffer = self.message_offsets, self.buffer
+        return [
+            buffer[offsets[i] : offsets[i + 1]].decode("utf-8", "surrogatepass")
+            for i in range(self.row_starts[row], self.row_starts[row + 1])
+        ]
+
+    def iter_messages(self) -> Iterator[list[str]]:
+        """Yield the messages of every row, in order, without building row views."""
+
+        for row in range(len(self)):
+            yield self.messages(row)
+
+    def row_dict(self, row: int) -> dict[str, Any]:
+        """Return a row as a plain dict."""
+
+        return dict(LogRow(self, row))
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """Return every row as a plain dict."""
+
+        return [self.row_dict(row) for row in range(len(self))]
+
+    def filter_rows(
+        self,
+        levels: Iterable[str] | None = None,
+        start_us: int | None = None,
+        end_us: int | None = None,
+    ) -> list[int]:
+        """
+        Return the rows, in order, matching a level set and a time range.
+
+        Only the level and timestamp columns are read. Rows with unparsed timestamps
+        never match a time range.
+
+        Args:
+            levels (Iterable[str] | None, optional): Levels to keep. Defaults to all.
+            start_us (int | None, optional): Inclusive start, in epoch microseconds.
+            end_us (int | None, optional): Exclusive end, in epoch microseconds.
+
+        Returns:
+            list[int]: Matching row indices.
+        """
+
+        allowed = None
+        if levels is not None:
+            allowed = {self._level_codes[n] for n in levels if n in self._level_codes}
+        timed = start_us is not None or end_us is not None
+        low = -(2**63) if start_us is None else start_us
+        high = 2**63 if end_us is None else end_us
+        rows = []
+        for row, (epoch_us, code) in enumerate(zip(self.timestamps, self.levels)):
+            if allowed is not None and code not in allowed:
+                continue
+            if timed and not (low <= epoch_us < high):
+                continue
+            rows.append(row)
+        if timed and self.unparsed_timestamps:
+            rows = [row for row in rows if row not in self.unparsed_timestamps]
+        return rows
+
+    def level_counts(self) -> dict[str, int]:
+        """Return the number of rows per level name (only levels that occur)."""
+
+        codes = self.levels.tobytes()
+        counts = {}
+        for code, name in enumerate(self.level_names):
+            count = codes.count(bytes((code,)))
+            if count:
+                counts[name] = count
+        return counts
+
+    def find_rows(
+        self,
+        keyword: str,
+        levels: Iterable[str] | None = None,
+        limit: int | None = None,
+    ) -> list[int]:
+        """
+        Return the rows, in order, with a message containing a keyword.
+
+        Searches the shared message buffer directly instead of decoding every message.
+        UTF-8 is self-synchronizing, so a byte match is always a match of whole characters.
+
+        Args:
+            keyword (str): Plain substring to look for.
+            levels (Iterable[str] | None, optional): Only return rows with these levels.
+            limit (int | None, optional): Stop after this many rows.
+
+        Returns:
+            list[int]: Matching row indices.
+        """
+
+        needle = keyword.encode("utf-8", "surrogatepass")
+        allowed = None
+        if levels is not None:
+            allowed = {
+                self._level_codes[name] for name in levels if name in self._level_codes
+            }
+            if not allowed:
+                return []
+        rows: list[int] = []
+        if not needle:
+            # An empty keyword matches every row that has at least one message.
+            for row in range(len(self)):
+                if limit is not None and len(rows) >= limit:
+                    break
+                has_messages = self.row_starts[row + 1] > self.row_starts[row]
+                if has_messages and (allowed is None or self.levels[row] in allowed):
+                    rows.append(row)
+            return rows
+
+        offsets, buffer = self.message_offsets, self.buffer
+        position = buffer.find(needle)
+        while position != -1 and (limit is None or len(rows) < limit):
+            message = bisect_right(offsets, position) - 1
+            end = offsets[message + 1]
+            if position + len(needle) > end:
+                # The match spans two messages: continue inside the next message.
+                position = buffer.find(needle, end)
+                continue
+            row = bisect_right(self.row_starts, message) - 1
+            if allowed is None or self.levels[row] in allowed:
+                rows.append(row)
+            # Continue after the current row.
+            position = buffer.find(needle, offsets[self.row_starts[row + 1]])
+        return rows
+
+    def nbytes(self) -> int:
+        """
+        Return the approximate memory footprint of the table in bytes.
+        """
+
+        arrays = (
+            self.timestamps,
+            self.levels,
+            self.threads,
+            self.message_offsets,
+            self.row_starts,
+        )
+        size = sum(sys.getsizeof(column) for column in arrays)
+        size += sys.getsizeof(self.buffer)
+        size += deep_getsizeof(self.level_names) + deep_getsizeof(self.thread_names)
+        size += deep_getsizeof(self.raw_timestamps) + deep_getsizeof(self.extras)
+        return size
+
+    def memory_report(self, logs: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+        """
+        Compare the footprint of the table with the list-of-dicts form of the same logs.
+
+        Args:
+            logs (list[dict] | None, optional): The dict form. Defaults to materializing
+                it from the table (for measurement only; this is slow on large tables).
+
+        Returns:
+            dict: 'rows', 'table_bytes', 'dict_bytes' and 'ratio' (dict / table).
+        """
+
+        dict_bytes = deep_getsizeof(logs if logs is not None else self.to_dicts())
+        table_bytes = self.nbytes()
+        return {
+            "rows": len(self),
+            "table_bytes": table_bytes,
+            "dict_bytes": dict_bytes,
+            "ratio": round(dict_bytes / table_bytes, 2) if table_bytes else None,
+        }
+
+
+def _rebuild_table(state: dict[str, Any]) -> LogTable:
+    table = LogTable.__new__(LogTable)
+    for name, value in state.items():
+        setattr(table, name, value)
+    return table
@@ -1,23 +1,83 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+import multiprocessing
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Any
+from typing import Any, Callable
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from model_client.model_client import ModelClient
 from model_client.openai_model import OpenAIModelClient
-from sentence_transformers import SentenceTransformer
+from model_client.fake_model import FakeModelClient
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import bulk
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from agent import ChatAgent
-from utils import extract_top_rows
-import torch
+from router import IntentRouter
+from codec import (
+    MIN_COMPRESS_BYTES,
+    compress,
+    decode_body,
+    decompress,
+    decompressor,
+    encode_body,
+    negotiate_encoding,
+    negotiate_media_type,
+)
+from metrics import (
+    REGISTRY,
+    current_trace,
+    monitor_event_loop_lag,
+    span,
+    start_trace,
+)
+from offload import cpu_executor, run_blocking
+from utils import build_bulk_actions, stats_interval, to_json_safe
+from parallel_stats import compute_log_stats_sharded
+import similarity_search
+from similarity_search import CandidateCache, build_filters, index_mapping
+from raw_log_parser import parse_log_file
+from histogram import LevelPyramid, to_epoch_us
+from log_table import LogTable
+from log_store import LogStore
+from context_index import ContextIndex
+from keyword_index import KeywordIndex
+from known_issues import CompiledIssue, KnownIssueRegistry, log_fingerprint
+from chat_sessions import ChatSession, SessionStore
+from issue_ranking import rank_issues
+from memory_elasticsearch import InMemoryElasticsearch
+from embedding_service import EmbeddingClient
+from embedding_jobs import (
+    ACTIVE_STATUSES,
+    PRIORITY_BACKFILL,
+    PRIORITY_INTERACTIVE,
+    EmbeddingJobQueue,
+    JobCancelled,
+    embed_texts,
+    init_embedding_worker,
+)
+
 # from model_client.offline_model import OfflineModelClient # Uncomment for offline model (disabled by default)
 
 # Load environment variables
 load_dotenv()
 
+# LOG_LEVEL=DEBUG also dumps prompts and issue contexts, which is slow on big logs.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+# Embedding worker processes are spawned, and spawning re-runs this file as
+# __mp_main__ when the server was started with `python main.py`. The workers load
+# their own model (see embedding_jobs.init_embedding_worker), so they skip the
+# server's model, embedding executor and job queue.
+SPAWNED_WORKER = __name__ == "__mp_main__"
+
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
@@ -26,17 +86,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 
-# Determine the device to use for models
-device = (
-    "cuda"
-    if torch.cuda.is_available()
-    else "mps"
-    if torch.backends.mps.is_available()
-    else "cpu"
-)
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Trace every request: stages timed with span() are reported in the Server-Timing
+    header, and the request duration is recorded per route.
+    """
+
+    trace = start_trace()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = trace.server_timing()
+    route = request.scope.get("route")
+    REGISTRY.observe(
+        "log_viewer_http_request_seconds",
+        trace.elapsed_ms() / 1000,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+    )
+    return response
+
 
 # Initialize models and client
 models: dict[str, ModelClient] = {
@@ -48,21 +120,127 @@ models: dict[str, ModelClient] = {
     # ),
 }
 
-emb_model = SentenceTransformer(
-    "sentence-transformers/msmarco-MiniLM-L12-cos-v5",
-    device=device,
+# Canned-response model for load tests and local development (FAKE_MODEL=true).
+if os.getenv("FAKE_MODEL", "false").lower() == "true":
+    models["fake"] = FakeModelClient(
+        latency=float(os.getenv("FAKE_MODEL_LATENCY", 0.5)),
+        tokens_per_second=float(os.getenv("FAKE_MODEL_TOKENS_PER_SECOND", 50)),
+        jitter=float(os.getenv("FAKE_MODEL_JITTER", 0.1)),
+    )
+
+# Embedding model. With EMBEDDING_SERVICE (a Unix socket path or host:port) all
+# workers share the model hosted by embedding_service.py instead of each loading
+# torch and a copy of the weights.
+EMBEDDING_MODEL = "sentence-transformers/msmarco-MiniLM-L12-cos-v5"
+EMBEDDING_SERVICE = os.getenv("EMBEDDING_SERVICE")
+if EMBEDDING_SERVICE:
+    device = None
+    emb_model = EmbeddingClient(EMBEDDING_SERVICE)
+elif SPAWNED_WORKER:
+    device = None
+    emb_model = None
+else:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Determine the device to use for models
+    device = (
+        "cuda"
+        if torch.cuda.is_available()
+        else "mps" if torch.backends.mps.is_available() else "cpu"
+    )
+    emb_model = SentenceTransformer(EMBEDDING_MODEL, device=device)
+
+
+def encode_texts(texts: list[str]) -> list[list[float]]:
+    """
+    Embed texts with the local model or, if configured, the embedding service.
+    """
+
+    if EMBEDDING_SERVICE:
+        return emb_model.encode(texts)
+    return emb_model.encode(texts, batch_size=64, show_progress_bar=False).tolist()
+
+
+# Local router answering confident yes/no routing decisions without an LLM call.
+# It embeds its examples on first use, so starting a worker doesn't depend on the
+# embedding service being up; until it is, decisions go to the LLM.
+intent_router = (
+    IntentRouter(
+        encode_texts,
+        threshold=float(os.getenv("ROUTER_THRESHOLD", 0.8)),
+        margin=float(os.getenv("ROUTER_MARGIN", 0.1)),
+    )
+    if os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+    else None
+)
+
+# Optional process pool for computing log statistics over shards of large logs and
+# parsing large raw log files in chunks.
+# Disabled by default: on platforms without fork (Windows, macOS default) every
+# worker re-imports this module, models included.
+STATS_WORKERS = int(os.getenv("STATS_WORKERS", 0))
+stats_executor = (
+    ProcessPoolExecutor(
+        max_workers=STATS_WORKERS,
+        mp_context=(
+            multiprocessing.get_context("fork")
+            if "fork" in multiprocessing.get_all_start_methods()
+            else None
+        ),
+    )
+    if STATS_WORKERS > 1
+    else None
+)
+
+# Surrounding lines given to the model with each keyword hit of a known issue: the
+# ISSUE_CONTEXT_ROWS rows on either side, or all rows within ISSUE_CONTEXT_SECONDS
+# of the hit when that is set.
+ISSUE_CONTEXT_ROWS = int(os.getenv("ISSUE_CONTEXT_ROWS", 2))
+ISSUE_CONTEXT_SECONDS = (
+    float(os.getenv("ISSUE_CONTEXT_SECONDS"))
+    if os.getenv("ISSUE_CONTEXT_SECONDS")
+    else None
 )
 
 
 # Request and response models
+class SimilarSearch(BaseModel):
+    """Options of the similar-log search used when evaluating known issues."""
+
+    k: int = 5
+    num_candidates: int | None = None
+    levels: list[str] | None = None
+    start: str | None = None
+    end: str | None = None
+    hybrid: bool = os.getenv("SEARCH_HYBRID", "false").lower() == "true"
+    # Also search every other stored log for similar incidents.
+    across_logs: bool = os.getenv("SEARCH_ACROSS_LOGS", "false").lower() == "true"
+
+
+class KnownIssue(BaseModel):
+    """A known issue, as stored in the known-issue registry."""
+
+    description: str = ""
+    context: str = ""
+    keywords: dict[str, list[str]] = {}
+    conditions: str | None = None
+    resolution: str | None = None
+
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
 
     message: str
     known_issues: dict[str, Any] | None = None
+    # Registry issues to evaluate: name -> expected version (None for the current).
+    known_issue_refs: dict[str, str | None] | None = None
     model: str = "gpt-4o"
     logs: list[dict[str, Any]] | None = None
     log_id: str | None = None
+    search: SimilarSearch = SimilarSearch()
+    # Conversation id: turns with the same id (and log) reuse each other's work.
+    session_id: str | None = None
 
 
 class Action(BaseModel):
@@ -85,8 +263,10 @@ async def chat_stream(request: ChatRequest):
     """
     Stream chat responses as Server-Sent Events (SSE).
 
-    Validates the request, creates a ChatAgent, and yields a series of SSE events
-    corresponding to summary decision, summary generation, issue evaluation, and filter creation.
+    Validates the request, creates a ChatAgent, plans the summary/issue/filter decisions in a
+    single step, runs the summary and issue evaluations concurrently, and yields a series of
+    SSE events corresponding to summary decision, summary generation, issue ranking, issue
+    evaluation, and filter creation.
     """
 
     if not request.message:
@@ -95,114 +275,275 @@ async def chat_stream(request: ChatRequest):
     if not request.model:
         raise HTTPException(status_code=400, detail="Model is required")
 
-    chat_agent = ChatAgent(models[request.model], base_prompt)
+    # Blocking and CPU-bound stages run on the CPU executor (see offload.py) so one
+    # large log doesn't stall every other client's stream.
     if request.logs:
-        logs = request.logs
+        # Keep the logs in columnar form for the rest of the request and release the
+        # parsed dicts, which take several times more memory.
+        try:
+            logs = await run_blocking(LogTable.from_logs, request.logs)
+        except (KeyError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid logs: {e}")
+        request.logs = None
     else:
         raise HTTPException(status_code=400, detail="Logs are required")
 
+    # Follow-up turns of a conversation reuse the stats, issue matches, verdicts,
+    # search results and embeddings of earlier turns on the same logs.
+    session = None
+    fingerprint = None
+    if request.session_id:
+        fingerprint = await run_blocking(log_fingerprint, logs)
+        session = chat_sessions.get(
+            request.session_id, request.log_id or fingerprint, fingerprint
+        )
+
+    stored_stats = session.get("stats", "stats") if session is not None else None
+    if stored_stats is None and request.log_id:
+        stored_stats = await run_blocking(load_log_stats, request.log_id)
+    chat_agent = ChatAgent(
+        models[request.model], base_prompt, stored_stats, intent_router
+    )
+
+    known_issues = resolve_known_issues(request)
+    trace = current_trace()
+
     async def event_generator():
         """Generate SSE events for each step of the chat processing."""
 
-        # Step 1: Decide on summary generation.
-        print(f"Message: {request.message}")
-        generate_summary, explanation = await chat_agent.decide_summary(
-            request.message, logs
+        # Step 1: Plan the summary, issue and filter decisions in one go.
+        logger.info("Message: %s", request.message)
+        with span("plan"):
+            decisions = await chat_agent.plan(request.message, logs)
+        generate_summary, explanation = decisions["summary"]
+        logger.info(
+            "Generate Summary: %s, Explanation: %s", generate_summary, explanation
         )
-        print(f"Generate Summary: {generate_summary}, Explanation: {explanation}")
         action = Action(
             type="summary_decision",
-            body={"generate_summary": generate_summary, "explanation": explanation},
+            body={
+                "generate_summary": generate_summary,
+                "explanation": explanation,
+                "route": chat_agent.routes["summary"],
+            },
         )
         # SSE requires events to be prefixed with "data: " and double newline-delimited.
         yield f"data: {action.model_dump_json()}\n\n"
 
-        # Step 2: If summary is needed, generate it.
-        if generate_summary:
-            summary_text, stats = await chat_agent.generate_summary(
-                request.message, logs
-            )
-            action = Action(
-                type="generate_summary",
-                body={"summary": summary_text, "stats": stats},
-            )
-            yield f"data: {action.model_dump_json()}\n\n"
-            print(f"Summary: {summary_text}")
-
-        # Step 3: Decide on known issue evaluation.
-        evaluate_issues, explanation = await chat_agent.evaluate_decision(
-            request.message
-        )
+        evaluate_issues, explanation = decisions["issues"]
         action = Action(
             type="issue_decision",
-            body={"evaluate_issues": evaluate_issues, "explanation": explanation},
+            body={
+                "evaluate_issues": evaluate_issues,
+                "explanation": explanation,
+                "route": chat_agent.routes["issues"],
+            },
         )
         yield f"data: {action.model_dump_json()}\n\n"
-        print(f"Evaluate Issues: {evaluate_issues}, Explanation: {explanation}")
+        logger.info(
+            "Evaluate Issues: %s, Explanation: %s", evaluate_issues, explanation
+        )
 
-        # Step 4: Evaluate each known issue.
+        # Step 2: Fan out the summary and the known issue evaluations concurrently.
         detected_issues = {}  # to be used for generating a filter group
+        # Similar logs and incidents depend on the query and the search settings.
+        search_key = (request.message, request.search.model_dump_json())
+
+        async def summarize() -> Action | None:
+            with span("generate_summary"):
+                summary_text, stats = await chat_agent.generate_summary(
+                    request.message, logs
+                )
+            logger.debug("Summary: %s", summary_text)
+            return Action(
+                type="generate_summary",
+                body={"summary": summary_text, "stats": stats},
+            )
+
+        async def evaluate(
+            issue: str,
+            details: dict[str, Any],
+            similar_logs: list[dict[str, Any]],
+            similar_incidents: list[dict[str, Any]],
+        ) -> Action | None:
+            # A verdict depends on the model and on the similar logs and incidents
+            # it was shown, as well as on the issue and the query.
+            verdict_key = (known_issues[issue].version, request.model, *search_key)
+            issue_text = (
+                session.get("verdicts", verdict_key) if session is not None else None
+            )
+            if issue_text is None:
+                with span("evaluate_issue", issue=issue):
+                    issue_text = (
+                        await chat_agent.evaluate_issue(
+                            issue,
+                            details,
+                            request.message,
+                            similar_logs,
+                            similar_incidents,
+                        )
+                    ).strip()
+                if session is not None:
+                    session.put("verdicts", verdict_key, issue_text)
+            if issue_text and issue_text != "" and issue_text != '""':
+                detected_issues[issue] = details
+                return Action(
+                    type="flag_issue",
+                    body={"issue": issue, "summary": issue_text},
+                )
+            return None
+
+        tasks = []
+        if generate_summary:
+            tasks.append(asyncio.create_task(summarize()))
+
         if evaluate_issues:
-            known_issues = request.known_issues if request.known_issues else {}
             issue_context: dict[str, Any] = {}
-            for issue, details in known_issues.items():
-                extracted_logs = extract_top_rows(logs, details["keywords"])
+            matches = {}
+            if known_issues:
+                matches = await run_blocking(
+                    match_known_issues,
+                    logs,
+                    known_issues,
+                    fingerprint,
+                    session,
+                    request.log_id,
+                )
+            selected = known_issues
+            if ISSUE_RANKING and known_issues:
+                # Evaluate only the most relevant issues and report the rest, so the
+                # number of model calls doesn't depend on the size of the catalog.
+                kept, skipped = await run_blocking(
+                    rank_known_issues, request.message, known_issues, matches, session
+                )
+                selected = {
+                    score["issue"]: known_issues[score["issue"]] for score in kept
+                }
+                action = Action(
+                    type="issue_ranking",
+                    body={"evaluated": kept, "skipped": skipped},
+                )
+                yield f"data: {action.model_dump_json()}\n\n"
+                logger.info(
+                    "Evaluating %d of %d known issues", len(kept), len(known_issues)
+                )
+            for issue, compiled in selected.items():
+                extracted_logs, surrounding_logs = matches[issue]
                 issue_context[issue] = {
-                    "description": details["description"],
-                    "context": details["context"],
-                    "keywords": details["keywords"],
-                    "conditions": details["conditions"],
-                    "resolution": details["resolution"],
+                    **compiled.details,
                     "logs": extracted_logs,
+                    "surrounding_logs": surrounding_logs,
                 }
-            print("Issue Context:", issue_context)
+            logger.debug("Issue Context: %s", issue_context)
 
             similar_logs = []
             if request.log_id:
-                similar_logs = search_similar(request.message, request.log_id, k=5)
+                similar_logs = (
+                    session.get("similar", ("logs", *search_key))
+                    if session is not None
+                    else None
+                )
+                if similar_logs is None:
+                    with span("search_similar"):
+                        similar_logs = await run_blocking(
+                            search_similar,
+                            request.message,
+                            request.log_id,
+                            **request.search.model_dump(exclude={"across_logs"}),
+                        )
+                    if session is not None:
+                        session.put("similar", ("logs", *search_key), similar_logs)
+
+            similar_incidents = []
+            if request.search.across_logs:
+                similar_incidents = (
+                    session.get("similar", ("incidents", *search_key))
+                    if session is not None
+                    else None
+                )
+                if similar_incidents is None:
+                    with span("search_similar_incidents"):
+                        similar_incidents = await run_blocking(
+                            search_similar_incidents,
+                            request.message,
+                            exclude=request.log_id,
+                            **request.search.model_dump(exclude={"across_logs"}),
+                        )
+                    if session is not None:
+                        session.put(
+                            "similar", ("incidents", *search_key), similar_incidents
+                        )
 
             for issue, details in issue_context.items():
-                issue_text = (
-                    await chat_agent.evaluate_issue(
-                        issue, details, request.message, similar_logs
-                    )
-                ).strip()
-                if issue_text and issue_text != "" and issue_text != '""':
-                    action = Action(
-                        type="flag_issue",
-                        body={"issue": issue, "summary": issue_text},
+                tasks.append(
+                    asyncio.create_task(
+                        evaluate(issue, details, similar_logs, similar_incidents)
                     )
-                    detected_issues[issue] = details
-                    yield f"data: {action.model_dump_json()}\n\n"
+                )
 
-        # Step 5: Decide if a filter should be added.
-        should_add_filter, filter_explanation = await chat_agent.decide_filter(
-            request.message, detected_issues
-        )
+        try:
+            for next_action in asyncio.as_completed(tasks):
+                action = await next_action
+                if action is not None:
+                    yield f"data: {action.model_dump_json()}\n\n"
+        finally:
+            # Stop outstanding model calls if the client went away.
+            for task in tasks:
+                task.cancel()
+
+        if session is not None:
+            stats = {
+                "level_stats": chat_agent.stats,
+                "anomalies": chat_agent.anomalies,
+                "simple_stats": chat_agent.simple_stats,
+            }
+            if any(value is not None for value in stats.values()):
+                session.put("stats", "stats", stats)
+            chat_sessions.trim()
+
+        # Step 3: Decide if a filter should be added. The plan only saw the query, so
+        # ask again with the detected issues when it said no.
+        should_add_filter, filter_explanation = decisions["filter"]
+        if not should_add_filter and detected_issues:
+            should_add_filter, filter_explanation = await chat_agent.decide_filter(
+                request.message, detected_issues
+            )
         action = Action(
             type="filter_decision",
             body={
                 "should_add_filter": should_add_filter,
                 "explanation": filter_explanation,
+                "route": chat_agent.routes["filter"],
             },
         )
         yield f"data: {action.model_dump_json()}\n\n"
-        print(
-            f"Filter Decision: {should_add_filter}, Explanation: {filter_explanation}"
+        logger.info(
+            "Filter Decision: %s, Explanation: %s",
+            should_add_filter,
+            filter_explanation,
         )
 
-        # Step 6: If filter is needed, generate a filter group.
+        # Step 4: If filter is needed, generate a filter group.
         if should_add_filter:
-            filter_group = await chat_agent.generate_filter_group(
-                request.message, detected_issues
-            )
-            print("Filter Group:", filter_group)
+            with span("generate_filter_group"):
+                filter_group = await chat_agent.generate_filter_group(
+                    request.message, detected_issues
+                )
+            logger.debug("Filter Group: %s", filter_group)
             action = Action(
                 type="add_filter",
                 body={"filter_group": filter_group},
             )
             yield f"data: {action.model_dump_json()}\n\n"
 
+        # Report per-stage timings, then indicate that streaming is complete.
+        if trace is not None:
+            action = Action(
+                type="timing",
+                body={"total_ms": trace.elapsed_ms(), "spans": trace.spans},
+            )
+            yield f"data: {action.model_dump_json()}\n\n"
+
         # Yield a final event to indicate that streaming is complete.
         yield "data: [DONE]\n\n"
 
@@ -213,14 +554,27 @@ async def chat_stream(request: ChatRequest):
 # -------------------------------------
 # Elasticsearch Similarity Search Setup
 # -------------------------------------
+# ES_BACKEND=memory keeps every index in this process instead (load tests, no ES node).
+memory_es = (
+    InMemoryElasticsearch()
+    if os.getenv("ES_BACKEND", "elasticsearch").lower() == "memory"
+    else None
+)
+
+
 def get_es_client() -> Elasticsearch:
     """
     Create and return an Elasticsearch client using environment variables.
 
+    Returns the in-process stand-in instead when ES_BACKEND=memory.
+
     Raises:
         Exception: If the client cannot ping Elasticsearch.
     """
 
+    if memory_es is not None:
+        return memory_es  # type: ignore[return-value]
+
     host = os.getenv("ES_HOST", "localhost")
     port = int(os.getenv("ES_PORT", 9200))
     scheme = os.getenv("ES_SCHEME", "http")
@@ -245,26 +599,107 @@ def create_similarity_index(
         description (str): Description metadata.
     """
 
-    mapping = {
-        "mappings": {
-            "_meta": {"title": title, "description": description},
-            "properties": {
-                "message": {"type": "text"},
-                "embedding": {
-                    "type": "dense_vector",
-                    "dims": 384,
-                    "index": True,
-                    "similarity": "cosine",
-                },
-            },
-        }
-    }
     if not es.indices.exists(index=index_name):
-        es.indices.create(index=index_name, body=mapping)
+        es.indices.create(index=index_name, body=index_mapping(title, description))
     else:
         print(f"Index '{index_name}' already exists.")
 
 
+def update_index_meta(es: Elasticsearch, index_name: str, **fields: Any):
+    """
+    Merge fields into the '_meta' object of an index mapping.
+
+    Elasticsearch replaces '_meta' wholesale on update, so the current value is
+    read first and the given fields are merged on top of it.
+
+    Args:
+        es (Elasticsearch): The Elasticsearch client.
+        index_name (str): The index name.
+        **fields: Metadata fields to set.
+    """
+
+    mapping = es.indices.get_mapping(index=index_name)
+    meta = dict(mapping[index_name]["mappings"].get("_meta", {}))
+    meta.update(fields)
+    es.indices.put_mapping(index=index_name, meta=meta)
+
+
+def store_log_stats(
+    es: Elasticsearch,
+    index_name: str,
+    logs: list[dict],
+    pyramid: LevelPyramid | None = None,
+):
+    """
+    Compute the chat statistics for a log once and store them in the index '_meta'.
+
+    Args:
+        es (Elasticsearch): The Elasticsearch client.
+        index_name (str): The index name.
+        logs (list[dict]): The logs that were uploaded to the index.
+        pyramid (LevelPyramid | None, optional): Level pyramid of the logs, used to
+            pick the bucket interval (see utils.stats_interval). Defaults to None.
+    """
+
+    stats = compute_log_stats_sharded(
+        logs, executor=stats_executor, interval=stats_interval(logs, pyramid=pyramid)
+    )
+    update_index_meta(es, index_name, stats=to_json_safe(stats))
+
+
+def load_log_stats(index_name: str) -> dict[str, Any] | None:
+    """
+    Load the statistics materialized at ingest for a log.
+
+    Args:
+        index_name (str): The index name.
+
+    Returns:
+        dict | None: The stored statistics, or None if they are unavailable
+        (e.g. the log was uploaded before statistics were stored).
+    """
+
+    try:
+        es = get_es_client()
+        with span("es_query", op="load_log_stats"):
+            mapping = es.indices.get_mapping(
+                index=index_name, filter_path=[f"{index_name}.mappings._meta.stats"]
+            )
+        return mapping.get(index_name, {}).get("mappings", {})["_meta"]["stats"]
+    except Exception as e:
+        logger.warning("Could not load stored stats for '%s': %s", index_name, e)
+        return None
+
+
+# Columnar on-disk copy of every log, written at ingest. Reads of whole logs go
+# here; Elasticsearch only serves searches.
+log_store = LogStore(os.getenv("LOG_STORE_DIR", "data/log_store"))
+
+
+def load_log_table(idx: str) -> LogTable:
+    """
+    Open a log from the log store, backfilling the store from Elasticsearch for logs
+    uploaded before it existed.
+
+    Args:
+        idx (str): The index name.
+
+    Returns:
+        LogTable: The log (memory-mapped when it comes from the store).
+    """
+
+    with span("log_store", op="open"):
+        table = log_store.open(idx)
+    if table is not None:
+        return table
+    logs = retrieve_logs_from_elasticsearch(idx)
+    for log in logs:
+        log.pop("embedding", None)
+    with span("log_store", op="write", rows=len(logs)):
+        log_store.write(idx, logs)
+    return log_store.open(idx) or LogTable.from_logs(logs)
+
+
 def retrieve_logs_from_elasticsearch(index: str) -> list[dict]:
     """
     Retrieve all logs from Elasticsearch for a given index, omitting the 'embedding' field.
@@ -279,24 +714,25 @@ def retrieve_logs_from_elasticsearch(index: str) -> list[dict]:
     if not es.ping():
         raise Exception("Could not connect to Elasticsearch")
 
-    resp = es.search(
-        index=index,
-        body={"query": {"match_all": {}}},
-        scroll="2m",
-        size=1000,
-    )
-    scroll_id = resp.get("_scroll_id")
-    hits = resp["hits"]["hits"]
-    logs = [hit["_source"] for hit in hits]
-
-    while hits:
-        resp = es.scroll(scroll_id=scroll_id, scroll="2m")
+    with span("es_query", op="retrieve_logs"):
+        resp = es.search(
+            index=index,
+            body={"query": {"match_all": {}}},
+            scroll="2m",
+            size=1000,
+        )
         scroll_id = resp.get("_scroll_id")
         hits = resp["hits"]["hits"]
-        if hits:
-            logs.extend(hit["_source"] for hit in hits)
+        logs = [hit["_source"] for hit in hits]
 
-    es.clear_scroll(scroll_id=scroll_id)
+        while hits:
+            resp = es.scroll(scroll_id=scroll_id, scroll="2m")
+            scroll_id = resp.get("_scroll_id")
+            hits = resp["hits"]["hits"]
+            if hits:
+                logs.extend(hit["_source"] for hit in hits)
+
+        es.clear_scroll(scroll_id=scroll_id)
 
     return logs
 
@@ -305,6 +741,9 @@ def push_to_elastic_search(logs: list[dict], idx: str, title: str, description:
     """
     Upload logs to Elasticsearch after creating/clearing the target index.
 
+    The chat statistics for the logs are computed here once and stored in the
+    index metadata.
+
     Args:
         logs (list[dict]): The logs to upload.
         idx (str): The index name.
@@ -328,9 +767,19 @@ def push_to_elastic_search(logs: list[dict], idx: str, title: str, description:
             body={"query": {"match_all": {}}},
             wait_for_completion=True,
         )
+        update_index_meta(
+            es, idx, title=title, description=description, embeddings_ready=False
+        )
 
-    actions = [{"_index": idx, "_id": i, "_source": log} for i, log in enumerate(logs)]
-    bulk(es, actions, raise_on_error=True)
+    actions = build_bulk_actions(logs, idx)
+    with span("es_bulk", rows=len(actions)):
+        bulk(es, actions, raise_on_error=True)
+    with span("log_store", op="write", rows=len(logs)):
+        log_store.write(idx, logs)
+    with span("ingest_stats", rows=len(logs)):
+        pyramid = LevelPyramid.from_logs(logs)
+        store_log_stats(es, idx, logs, pyramid)
+        cache_level_pyramid(idx, pyramid, log_store.generation(idx))
 
     # Force a refresh so the newly indexed documents become searchable immediately.
     es.indices.refresh(index=idx)
@@ -338,77 +787,190 @@ def push_to_elastic_search(logs: list[dict], idx: str, title: str, description:
     return {"message": "Logs successfully uploaded.", "total_logs": len(logs)}
 
 
-def update_embeddings_for_logs(idx: str):
+def update_embeddings_for_logs(
+    idx: str, progress: Callable[[int, int], None] | None = None
+):
     """
     Update the embeddings for logs stored in a given Elasticsearch index.
 
-    Retrieves logs, computes embeddings for the 'messages' field, and updates each log document.
+    Reads the logs from the log store and embeds the 'messages' field in batches of
+    EMBEDDING_BATCH_ROWS rows, adding each batch's embeddings to its documents before
+    the next one starts.
+
+    Before each write the job must still be active and the log must be the one it
+    read: if it was cancelled, re-uploaded or deleted (possibly by another worker),
+    JobCancelled is raised and nothing more is written. Writes are partial updates of
+    existing documents, so they never recreate a deleted index's documents or replace
+    the rows of a newer upload.
+
+    Args:
+        idx (str): The Elasticsearch index ID.
+        progress (Callable[[int, int], None] | None, optional): Called with (rows done,
+            total rows) before and after each write; raising from it stops the update
+            (see embedding_jobs.JobCancelled). Defaults to None.
+
+    Raises:
+        JobCancelled: If the job was cancelled or the log changed or was deleted.
     """
 
     es = get_es_client()
     if not es.ping():
         raise Exception("Could not connect to Elasticsearch")
 
-    logs = retrieve_logs_from_elasticsearch(idx)
-
-    # Collect texts from the "messages" field that need embeddings.
-    texts_to_embed = [log["messages"] for log in logs]
-    if texts_to_embed:
-        computed_embeddings = compute_embeddings(texts_to_embed)
-        print(f"Computed {len(computed_embeddings)} embeddings.")
-        if len(computed_embeddings) != len(texts_to_embed):
+    table = load_log_table(idx)
+    generation = log_store.generation(idx)
+    total = len(table)
+
+    def ensure_current(done: int):
+        if progress is not None:
+            progress(done, total)
+        if log_store.generation(idx) != generation or not es.indices.exists(index=idx):
+            raise JobCancelled(f"Log '{idx}' was re-uploaded or deleted.")
+
+    ensure_current(0)
+    for start in range(0, total, EMBEDDING_BATCH_ROWS):
+        batch = table[start : start + EMBEDDING_BATCH_ROWS]
+        computed_embeddings = embed_messages(list(batch.iter_messages()))
+        if len(computed_embeddings) != len(batch):
             raise Exception(
                 "Mismatch: Number of computed embeddings does not equal the number of texts."
             )
 
-        for i, log in enumerate(logs):
-            log["embedding"] = computed_embeddings[i]
-
+        ensure_current(start)
         actions = [
-            {"_index": idx, "_id": i, "_source": log} for i, log in enumerate(logs)
+            {
+                "_op_type": "update",
+                "_index": idx,
+                "_id": start + i,
+                "doc": {"embedding": embedding},
+            }
+            for i, embedding in enumerate(computed_embeddings)
         ]
-        bulk(es, actions, raise_on_error=False)
-        print("Embeddings updated for all logs.")
-    else:
-        print("No logs found that need embeddings.")
+        with span("es_bulk", rows=len(actions)):
+            bulk(es, actions, raise_on_error=False)
+        if progress is not None:
+            progress(start + len(batch), total)
+    ensure_current(total)
+    logger.info("Embeddings updated for %d logs of %s.", total, idx)
 
+    update_index_meta(es, idx, embeddings_ready=True)
+    invalidate_log_catalog()
+    candidate_cache.invalidate(idx)
 
-@app.get("/table/{id}")
-def get_from_elasticsearch(id: str):
+
+def encoded_response(request: Request, value: Any) -> Response:
     """
-    Retrieve logs from an Elasticsearch index by ID and remove the 'embedding' field.
+    Encode a response body in the format and content coding the client accepts.
+
+    JSON is encoded with orjson when it is installed, MessagePack is used when the
+    client prefers it in 'Accept', and bodies over MIN_COMPRESS_BYTES are compressed
+    with zstd or gzip according to 'Accept-Encoding'.
+
+    Args:
+        request (Request): The request whose headers are negotiated.
+        value (Any): The JSON-compatible response value.
+
+    Returns:
+        Response: The encoded response.
+    """
+
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    with span("encode", media_type=media_type):
+        body = encode_body(value, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+        with span("compress", encoding=encoding, bytes=len(body)):
+            body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+async def decoded_body(request: Request) -> Any:
     """
+    Read a request body, decompressing it according to 'Content-Encoding' and decoding
+    it as JSON or MessagePack according to 'Content-Type'.
 
+    Raises:
+        HTTPException: 400 if the body can't be decompressed or decoded.
+    """
+
+    body = await request.body()
     try:
-        logs = retrieve_logs_from_elasticsearch(str(id))
-        # Remove the "embedding" field from each log
-        for log in logs:
-            log.pop("embedding", None)
+        with span("decode", bytes=len(body)):
+            data = decompress(body, request.headers.get("content-encoding"))
+            return decode_body(data, request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return logs
+
+@app.get("/table/{id}")
+def get_from_elasticsearch(
+    id: str,
+    request: Request,
+    offset: int = 0,
+    limit: int | None = None,
+    levels: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    keyword: list[str] | None = Query(None),
+):
+    """
+    Retrieve the logs of a log ID from the log store.
+
+    Without parameters every row is returned. Rows can be filtered by level (comma
+    separated), by time range ('start' inclusive, 'end' exclusive, ISO 8601) and by
+    keywords ('keyword' may be repeated; rows must contain all of them, looked up in
+    the log's keyword index), and the result paged with 'offset' and 'limit'. Only
+    the pages holding the selected rows are read from disk. The body is negotiated
+    with encoded_response().
+    """
+
+    try:
+        table = load_log_table(str(id))
+        level_list = levels.split(",") if levels is not None else None
+        if start is not None or end is not None:
+            rows = table.filter_rows(
+                levels=level_list,
+                start_us=to_epoch_us(start) if start is not None else None,
+                end_us=to_epoch_us(end) if end is not None else None,
+            )
+            if keyword:
+                matches = set(get_keyword_index(str(id)).find_all(keyword))
+                rows = [row for row in rows if row in matches]
+        elif keyword:
+            rows = get_keyword_index(str(id)).find_all(keyword, levels=level_list)
+        elif levels is not None:
+            rows = table.filter_rows(levels=level_list)
+        else:
+            rows = range(len(table))
+        rows = rows[offset : None if limit is None else offset + limit]
+        return encoded_response(request, [table.row_dict(row) for row in rows])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/table/{id}")
-async def upload_file(id: str, request: Request, background_tasks: BackgroundTasks):
+async def upload_file(id: str, request: Request):
     """
-    Upload logs to Elasticsearch for a given index and schedule background embedding updates.
+    Upload logs to Elasticsearch for a given index and queue an embedding job.
 
-    Expects a JSON payload with a 'logs' list and optional 'title' and 'description'.
+    Expects a JSON (or MessagePack) payload with a 'logs' list and optional 'title'
+    and 'description'. The body may be gzip or zstd compressed ('Content-Encoding').
 
     Args:
         id (str): The Elasticsearch index ID.
         request (Request): The FastAPI request object.
-        background_tasks (BackgroundTasks): Background task manager for updating embeddings.
 
     Returns:
         dict: A response message indicating upload status.
     """
 
+    data = await decoded_body(request)
     try:
-        data = await request.json()
-        const_logs = data.get("logs")
+        const_logs = data.get("logs") if isinstance(data, dict) else None
         if not const_logs or not isinstance(const_logs, list):
             raise HTTPException(
                 status_code=400, detail="Expected 'logs' to be a JSON array"
@@ -417,17 +979,101 @@ async def upload_file(id: str, request: Request, background_tasks: BackgroundTas
         title = data.get("title", str(id))
         description = data.get("description", "")
 
-        # Push logs without waiting for embedding computation.
-        response = push_to_elastic_search(const_logs, id, title, description)
-        # update_embeddings_for_logs(id)
+        # Ingest blocks (bulk write, stats, pyramid, log store): run it off the loop.
+        return await run_blocking(ingest_logs, id, const_logs, title, description)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error processing upload for '%s'", id)
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        # Schedule background embedding computation and update.
-        background_tasks.add_task(update_embeddings_for_logs, id)
+@app.post("/table/{id}/raw")
+async def upload_raw_file(
+    id: str,
+    request: Request,
+    title: str | None = None,
+    description: str = "",
+):
+    """
+    Upload a raw Webex/Spark text log, parse it on the server and ingest it.
 
+    The body is the log file itself (optionally gzip or zstd compressed, see
+    'Content-Encoding'). It is streamed to a temporary file, parsed into
+    {timestamp, level, thread ID, messages} entries in record-aligned chunks (on the
+    process pool for large files) and ingested like POST /table/{id}.
+
+    Args:
+        id (str): The Elasticsearch index ID.
+        request (Request): The FastAPI request object.
+        title (str | None, optional): Log title. Defaults to the ID.
+        description (str, optional): Log description. Defaults to "".
+
+    Returns:
+        dict: The upload response plus the number of lines skipped before the first
+        record.
+    """
+
+    try:
+        decode = decompressor(request.headers.get("content-encoding"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as f:
+        path = f.name
+    try:
+        with open(path, "wb") as f:
+            try:
+                async for chunk in request.stream():
+                    f.write(decode(chunk))
+            except Exception as e:
+                raise HTTPException(
+                    status_code=400, detail=f"Could not decompress the body: {e}"
+                )
+        # Parsing and ingest block (process pool results, bulk writes, stats), so
+        # they run off the event loop.
+        with span("parse_raw", bytes=os.path.getsize(path)):
+            logs, skipped_lines = await run_blocking(
+                parse_log_file, path, executor=stats_executor
+            )
+        if not logs:
+            raise HTTPException(status_code=400, detail="No log records found")
+
+        response = await run_blocking(
+            ingest_logs, id, logs, title or str(id), description
+        )
+        response["skipped_lines"] = skipped_lines
         return response
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
+        logger.exception("Error processing raw upload for '%s'", id)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.remove(path)
+
+
+def ingest_logs(id: str, logs: list[dict], title: str, description: str) -> dict:
+    """
+    Push parsed logs to Elasticsearch and the log store and queue their embeddings.
+    """
+
+    # Stop the embedding job of a previous upload before its rows are replaced.
+    embedding_jobs.cancel(id)
+    # Push logs without waiting for embedding computation.
+    response = push_to_elastic_search(logs, id, title, description)
+
+    invalidate_log_catalog()
+    candidate_cache.invalidate(id)
+
+    # Re-uploads are interactive: they run ahead of queued backfills.
+    job = embedding_jobs.submit(id, priority=PRIORITY_INTERACTIVE)
+    response["embedding_job"] = job["id"]
+
+    drop_keyword_index(id)
+    cpu_executor.submit(get_keyword_index, id)
+
+    return response
 
 
 @app.delete("/table/{id}")
@@ -439,7 +1085,13 @@ async def delete_file(id: str):
     es = get_es_client()
     try:
         if es.indices.exists(index=id):
+            embedding_jobs.cancel(id)
             es.indices.delete(index=id)
+            log_store.delete(id)
+            invalidate_log_catalog()
+            candidate_cache.invalidate(id)
+            drop_level_pyramid(id)
+            drop_keyword_index(id)
             return {"status": "success", "message": "log table deleted successfully"}
         else:
             return {"status": "error", "message": f"log file with id: {id} not found"}
@@ -447,36 +1099,663 @@ async def delete_file(id: str):
         return {"status": "error", "message": str(e)}
 
 
-@app.get("/table")
-def list_log_indices():
+# -------------------------------------
+# Embedding Jobs
+# -------------------------------------
+# Embeddings are computed by a persistent job queue instead of the request
+# process: a dispatcher thread runs one job at a time and sends each batch to
+# EMBEDDING_WORKERS worker processes that load their own copy of the model
+# (0, or EMBEDDING_SERVICE set, embeds in the dispatcher thread with the server's
+# model or the embedding service).
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
+EMBEDDING_BATCH_ROWS = int(os.getenv("EMBEDDING_BATCH_ROWS", 1024))
+embedding_executor = (
+    ProcessPoolExecutor(
+        max_workers=EMBEDDING_WORKERS,
+        # Spawned, not forked: forking a process that has loaded torch can deadlock.
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_embedding_worker,
+        initargs=(EMBEDDING_MODEL, device),
+    )
+    if EMBEDDING_WORKERS > 0 and not EMBEDDING_SERVICE and not SPAWNED_WORKER
+    else None
+)
+
+
+def embed_messages(messages: list[list[str]]) -> list[list[float]]:
+    """
+    Embed the first message of each entry on the embedding workers (or in-process).
+    """
+
+    if embedding_executor is None:
+        return compute_embeddings(messages)
+    texts = [message[0] for message in messages]
+    with span("embedding", texts=len(texts)):
+        return embedding_executor.submit(embed_texts, texts).result()
+
+
+embedding_jobs = (
+    EmbeddingJobQueue(
+        os.getenv("EMBEDDING_JOBS_DB", "data/embedding_jobs.sqlite3"),
+        lambda job, progress: update_embeddings_for_logs(job["log_id"], progress),
+        lease_seconds=float(os.getenv("EMBEDDING_JOB_LEASE_SECONDS", 60)),
+    )
+    if not SPAWNED_WORKER
+    else None
+)
+
+
+@app.on_event("startup")
+def start_embedding_jobs():
+    embedding_jobs.start()
+
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    # Kept on the app so the task isn't garbage collected.
+    app.state.event_loop_monitor = asyncio.create_task(
+        monitor_event_loop_lag(float(os.getenv("EVENT_LOOP_LAG_INTERVAL", 0.5)))
+    )
+
+
+@app.on_event("shutdown")
+def stop_embedding_jobs():
+    embedding_jobs.stop(timeout=5)
+    if embedding_executor is not None:
+        embedding_executor.shutdown(wait=False, cancel_futures=True)
+
+
+@app.get("/table/{id}/embeddings")
+def get_embedding_job(id: str):
+    """
+    Return the status and progress ('done' of 'total' rows) of a log's latest
+    embedding job.
+    """
+
+    job = embedding_jobs.latest(id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No embedding job for '{id}'")
+    return job
+
+
+@app.get("/embedding_jobs")
+def list_embedding_jobs(status: str | None = None, limit: int = 100):
+    """
+    List embedding jobs, most recent first, optionally filtered by status.
+    """
+
+    return embedding_jobs.jobs(status=status, limit=limit)
+
+
+@app.post("/embedding_jobs/backfill")
+def backfill_embeddings():
     """
-    List all log indices in Elasticsearch with their metadata.
+    Queue embedding jobs, behind interactive uploads, for every log whose
+    embeddings are not ready and that has no queued or running job.
     """
 
     try:
         es = get_es_client()
-        if not es.ping():
-            raise Exception("Could not connect to Elasticsearch")
-
-        # Get all indices (aliases) as a dict.
-        all_indices = es.indices.get_alias(index="*")
-        log_files = []
-        for index in all_indices.keys():
-            if index.startswith("."):
+        queued = []
+        for entry in fetch_log_catalog(es):
+            job = embedding_jobs.latest(entry["id"])
+            if entry["embeddings_ready"] or (
+                job is not None and job["status"] in ACTIVE_STATUSES
+            ):
                 continue
-            mapping = es.indices.get_mapping(index=index)
-            meta = mapping[index]["mappings"].get("_meta", {})
-            title = meta.get("title", "TITLE")
-            description = meta.get("description", "DESCRIPTION")
-            log_files.append({"id": index, "title": title, "description": description})
-        return log_files
+            queued.append(
+                embedding_jobs.submit(entry["id"], priority=PRIORITY_BACKFILL)
+            )
+        return queued
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------------------------------------
+# Level Histogram Pyramid
+# -------------------------------------
+# Pyramids are built at ingest and kept in a small LRU cache. Logs that are not
+# cached (e.g. after a restart) are rebuilt from the log store on first use. Each
+# entry remembers the log store generation it was built from, so logs rewritten by
+# another worker are rebuilt.
+PYRAMID_CACHE_SIZE = int(os.getenv("PYRAMID_CACHE_SIZE", 32))
+_pyramid_lock = threading.Lock()
+_pyramid_cache: OrderedDict[str, tuple[str | None, LevelPyramid]] = OrderedDict()
+
+
+def cache_level_pyramid(idx: str, pyramid: LevelPyramid, generation: str | None):
+    """
+    Store a level pyramid for a log, evicting the least recently used one if full.
+    """
+
+    with _pyramid_lock:
+        _pyramid_cache[idx] = (generation, pyramid)
+        _pyramid_cache.move_to_end(idx)
+        while len(_pyramid_cache) > PYRAMID_CACHE_SIZE:
+            _pyramid_cache.popitem(last=False)
+
+
+def drop_level_pyramid(idx: str):
+    """
+    Remove the cached level pyramid for a log, if any.
+    """
+
+    with _pyramid_lock:
+        _pyramid_cache.pop(idx, None)
+
+
+def get_level_pyramid(idx: str) -> LevelPyramid:
+    """
+    Return the level pyramid for a log, building it from the log store if needed.
+    """
+
+    generation = log_store.generation(idx)
+    with _pyramid_lock:
+        cached = _pyramid_cache.get(idx)
+        if cached is not None and cached[0] == generation:
+            _pyramid_cache.move_to_end(idx)
+            return cached[1]
+    # The generation is read before the log: if the log changes in between, the
+    # next call sees a newer generation and rebuilds.
+    pyramid = LevelPyramid.from_logs(load_log_table(idx))
+    cache_level_pyramid(idx, pyramid, generation)
+    return pyramid
+
+
+@app.get("/table/{id}/histogram")
+def get_level_histogram(
+    id: str,
+    start: str | None = None,
+    end: str | None = None,
+    max_buckets: int = 500,
+    resolution: int | None = None,
+):
+    """
+    Return per-level log counts for a time range at a resolution that fits the bucket budget.
+
+    Args:
+        id (str): The Elasticsearch index ID.
+        start (str | None): ISO timestamp of the range start. Defaults to the start of the log.
+        end (str | None): Exclusive ISO timestamp of the range end. Defaults to the end of the log.
+        max_buckets (int): Maximum number of buckets to return when picking a resolution.
+        resolution (int | None): Force a resolution in seconds (1, 10, 60, 600 or 3600).
+
+    Returns:
+        dict: The chosen resolution in seconds and the list of non-empty buckets.
+    """
+
+    if max_buckets < 1:
+        raise HTTPException(status_code=400, detail="max_buckets must be positive")
+    try:
+        start_epoch = to_epoch_us(start) // 1_000_000 if start else None
+        end_epoch = to_epoch_us(end) // 1_000_000 if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        pyramid = get_level_pyramid(str(id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        return pyramid.query(start_epoch, end_epoch, max_buckets, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# -------------------------------------
+# Keyword Index
+# -------------------------------------
+# Inverted indexes for keyword queries on stored logs. They are built in the
+# background after an upload (or on first use) and kept in a small LRU cache, with
+# the log store generation they were built from (see get_level_pyramid).
+KEYWORD_INDEX_CACHE_SIZE = int(os.getenv("KEYWORD_INDEX_CACHE_SIZE", 8))
+_keyword_index_lock = threading.Lock()
+_keyword_index_cache: OrderedDict[str, tuple[str | None, KeywordIndex]] = OrderedDict()
+# Fingerprints of the indexed logs, computed when a chat asks for the index.
+_keyword_index_fingerprints: dict[str, tuple[KeywordIndex, str]] = {}
+
+
+def drop_keyword_index(idx: str):
+    """
+    Remove the cached keyword index for a log, if any.
+    """
+
+    with _keyword_index_lock:
+        _keyword_index_cache.pop(idx, None)
+        _keyword_index_fingerprints.pop(idx, None)
+
+
+def get_keyword_index(idx: str) -> KeywordIndex:
+    """
+    Return the keyword index of a log, building it from the log store if needed.
+    """
+
+    generation = log_store.generation(idx)
+    with _keyword_index_lock:
+        cached = _keyword_index_cache.get(idx)
+        if cached is not None and cached[0] == generation:
+            _keyword_index_cache.move_to_end(idx)
+            return cached[1]
+    with span("keyword_index", op="build"):
+        index = KeywordIndex(load_log_table(idx))
+    logger.info("Keyword index for %s: %s", idx, index.report())
+    with _keyword_index_lock:
+        _keyword_index_cache[idx] = (generation, index)
+        _keyword_index_cache.move_to_end(idx)
+        while len(_keyword_index_cache) > KEYWORD_INDEX_CACHE_SIZE:
+            _keyword_index_cache.popitem(last=False)
+    return index
+
+
+def chat_keyword_index(
+    idx: str, logs: LogTable, fingerprint: str
+) -> KeywordIndex | None:
+    """
+    Return the cached keyword index of a stored log if a chat's logs are that log.
+
+    Chat requests carry their own copy of the logs, so the index only applies when
+    they are identical to the indexed logs (same fingerprint); row numbers then
+    match. That holds even if the stored log has changed since, so the generation
+    is not checked. Indexes are not built here: they are built at ingest.
+    """
+
+    with _keyword_index_lock:
+        cached = _keyword_index_cache.get(idx)
+        stored = _keyword_index_fingerprints.get(idx)
+    if cached is None or len(cached[1].table) != len(logs):
+        return None
+    index = cached[1]
+    if stored is None or stored[0] is not index:
+        with span("log_fingerprint", op="keyword_index"):
+            stored = (index, log_fingerprint(index.table))
+        with _keyword_index_lock:
+            if _keyword_index_cache.get(idx) is cached:
+                _keyword_index_fingerprints[idx] = stored
+    return index if stored[1] == fingerprint else None
+
+
+@app.get("/table/{id}/keyword_index")
+def get_keyword_index_report(id: str):
+    """
+    Return the size and build time of a log's keyword index (building it if needed).
+    """
+
+    try:
+        return get_keyword_index(str(id)).report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------------------------------------
+# Known Issue Registry
+# -------------------------------------
+# Known issues stored on the server, so chat requests can reference them by name
+# and version instead of sending them every time. Keyword matches are cached per
+# (logs, issue version): a follow-up question on the same logs skips the scans.
+known_issue_registry = KnownIssueRegistry(
+    os.getenv("KNOWN_ISSUES_DB", "data/known_issues.sqlite3"), embed=encode_texts
+)
+ISSUE_MATCH_CACHE_SIZE = int(os.getenv("ISSUE_MATCH_CACHE_SIZE", 256))
+_issue_match_lock = threading.Lock()
+_issue_match_cache: OrderedDict[tuple[str, str], tuple[dict, dict]] = OrderedDict()
+
+
+def resolve_known_issues(request: ChatRequest) -> dict[str, CompiledIssue]:
+    """
+    Return the issues of a chat request: the ones sent in 'known_issues' and the
+    registry issues referenced in 'known_issue_refs'.
+
+    Raises:
+        HTTPException: 400 if a sent issue is invalid, 404 if a referenced issue
+            doesn't exist and 409 if it isn't at the expected version.
+    """
+
+    try:
+        issues = {
+            name: CompiledIssue(name, details)
+            for name, details in (request.known_issues or {}).items()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.known_issue_refs:
+        try:
+            issues.update(known_issue_registry.resolve(request.known_issue_refs))
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    return issues
+
+
+def match_known_issues(
+    logs: LogTable,
+    issues: dict[str, CompiledIssue],
+    fingerprint: str | None = None,
+    session: ChatSession | None = None,
+    log_id: str | None = None,
+) -> dict[str, tuple[dict, dict]]:
+    """
+    Find the keyword hits and their context for each issue, reusing matches of the
+    same logs and issue version from the chat session or the shared cache.
+
+    Args:
+        logs (LogTable): The logs.
+        issues (dict[str, CompiledIssue]): Issues by name.
+        fingerprint (str | None, optional): Fingerprint of the logs, if known.
+        session (ChatSession | None, optional): Chat session to reuse and record
+            matches in.
+        log_id (str | None, optional): Stored log the logs come from; its keyword
+            index is used to find the hits when the logs are identical to it.
+
+    Returns:
+        dict: Issue name -> (rows per category, context windows per category).
+    """
+
+    if fingerprint is None:
+        with span("log_fingerprint"):
+            fingerprint = log_fingerprint(logs)
+    matches = {}
+    context_index = None
+    keyword_index = None
+    for name, issue in issues.items():
+        if session is not None:
+            matches[name] = session.get("matches", issue.version)
+            if matches[name] is not None:
+                continue
+        key = (fingerprint, issue.version)
+        with _issue_match_lock:
+            cached = _issue_match_cache.get(key)
+            if cached is not None:
+                _issue_match_cache.move_to_end(key)
+        if cached is not None:
+            matches[name] = cached
+            if session is not None:
+                session.put("matches", issue.version, cached)
+            continue
+        if context_index is None:
+            with span("build_context_index"):
+                context_index = ContextIndex(logs)
+            if log_id is not None:
+                keyword_index = chat_keyword_index(log_id, logs, fingerprint)
+        with span("extract_issue_rows", issue=name, indexed=keyword_index is not None):
+            matches[name] = issue.match(
+                context_index,
+                before=ISSUE_CONTEXT_ROWS,
+                after=ISSUE_CONTEXT_ROWS,
+                seconds=ISSUE_CONTEXT_SECONDS,
+                keyword_index=keyword_index,
+            )
+        with _issue_match_lock:
+            _issue_match_cache[key] = matches[name]
+            while len(_issue_match_cache) > ISSUE_MATCH_CACHE_SIZE:
+                _issue_match_cache.popitem(last=False)
+        if session is not None:
+            session.put("matches", issue.version, matches[name])
+    return matches
+
+
+# Pre-ranking of known issues: only the ISSUE_RANK_TOP_K issues scoring at least
+# ISSUE_RANK_MIN_SCORE (keyword coverage and query similarity, see issue_ranking.py)
+# are evaluated by the model. ISSUE_RANK_TOP_K=0 lifts the cap.
+ISSUE_RANKING = os.getenv("ISSUE_RANKING", "true").lower() == "true"
+ISSUE_RANK_TOP_K = int(os.getenv("ISSUE_RANK_TOP_K", 5))
+ISSUE_RANK_MIN_SCORE = float(os.getenv("ISSUE_RANK_MIN_SCORE", 0.2))
+ISSUE_RANK_KEYWORD_WEIGHT = float(os.getenv("ISSUE_RANK_KEYWORD_WEIGHT", 0.5))
+
+
+def rank_known_issues(
+    message: str,
+    issues: dict[str, CompiledIssue],
+    matches: dict[str, tuple[dict, dict]],
+    session: ChatSession | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Rank the issues of a chat request and pick the ones to evaluate (see rank_issues).
+
+    The query is embedded once (through the router's cache when there is one).
+    Registry issues missing an embedding are embedded and stored by the registry;
+    the issues sent with the request are embedded in a single batch and kept in the
+    chat session, if any, for the next turns. If embedding fails, issues are ranked
+    by their keyword hits alone.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The kept and the skipped issue scores.
+    """
+
+    def embedded(text: str) -> list[float] | None:
+        return session.get("embeddings", text) if session is not None else None
+
+    query_vector = None
+    try:
+        with span("embed_issues"):
+            query_vector = embedded(message)
+            if query_vector is None:
+                query_vector = (
+                    intent_router.embed(message)
+                    if intent_router is not None
+                    else list(encode_texts([message])[0])
+                )
+                if session is not None:
+                    session.put("embeddings", message, query_vector)
+            missing = []
+            for name, issue in issues.items():
+                if issue.embedding is not None or not issue.text:
+                    continue
+                if known_issue_registry.get(name) is issue:
+                    known_issue_registry.embedding(issue)
+                else:
+                    issue.embedding = embedded(issue.text)
+                    if issue.embedding is None:
+                        missing.append(issue)
+            if missing:
+                vectors = encode_texts([issue.text for issue in missing])
+                for issue, vector in zip(missing, vectors):
+                    issue.embedding = list(vector)
+                    if session is not None:
+                        session.put("embeddings", issue.text, issue.embedding)
+    except Exception:
+        logger.exception("Failed to embed the query or issues; ranking by keywords")
+    with span("rank_issues", issues=len(issues)):
+        return rank_issues(
+            issues,
+            {name: extracted for name, (extracted, _) in matches.items()},
+            query_vector,
+            top_k=ISSUE_RANK_TOP_K,
+            min_score=ISSUE_RANK_MIN_SCORE,
+            keyword_weight=ISSUE_RANK_KEYWORD_WEIGHT,
+        )
+
+
+# Chat Sessions
+# -------------------------------------
+# Work done for a conversation about a log (see chat_sessions.py), kept for
+# CHAT_SESSION_TTL_SECONDS of inactivity within CHAT_SESSION_MAX sessions and about
+# CHAT_SESSION_MAX_BYTES of state.
+chat_sessions = SessionStore(
+    ttl_seconds=float(os.getenv("CHAT_SESSION_TTL_SECONDS", 1800)),
+    max_sessions=int(os.getenv("CHAT_SESSION_MAX", 256)),
+    max_bytes=int(os.getenv("CHAT_SESSION_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+
+@app.delete("/chat_sessions/{session_id}")
+def delete_chat_session(session_id: str):
+    """
+    Forget the state of a conversation, e.g. when the user starts a new one.
+    """
+
+    return {"status": "success", "dropped": chat_sessions.drop(session_id)}
+
+
+@app.get("/known_issues")
+def list_known_issues():
+    """
+    Return the registry version and every known issue with its version.
+    """
+
+    return {
+        "version": known_issue_registry.version,
+        "issues": {
+            name: {**issue.details, "version": issue.version}
+            for name, issue in known_issue_registry.issues().items()
+        },
+    }
+
+
+@app.get("/known_issues/{name}")
+def get_known_issue(name: str):
+    """
+    Return a known issue with its version.
+    """
+
+    issue = known_issue_registry.get(name)
+    if issue is None:
+        raise HTTPException(status_code=404, detail=f"Unknown known issue '{name}'.")
+    return {**issue.details, "version": issue.version}
+
+
+@app.put("/known_issues/{name}")
+def put_known_issue(name: str, issue: KnownIssue):
+    """
+    Create or replace a known issue. Returns its new version and the registry's.
+    """
+
+    try:
+        stored = known_issue_registry.put(name, issue.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "name": name,
+        "version": stored.version,
+        "registry_version": known_issue_registry.version,
+    }
+
+
+@app.delete("/known_issues/{name}")
+def delete_known_issue(name: str):
+    """
+    Delete a known issue.
+    """
+
+    if not known_issue_registry.delete(name):
+        raise HTTPException(status_code=404, detail=f"Unknown known issue '{name}'.")
+    return {"status": "success", "registry_version": known_issue_registry.version}
+
+
+# -------------------------------------
+# Log Catalog
+# -------------------------------------
+# The catalog is cached in-process and invalidated whenever this server uploads,
+# deletes or finishes embedding a log. The TTL only guards against changes made
+# to Elasticsearch from outside this process.
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", 30))
+_catalog_lock = threading.Lock()
+_catalog_cache: dict[str, Any] = {
+    "entries": None,
+    "expires_at": 0.0,
+    "generation": 0,
+}
+
+
+def invalidate_log_catalog():
+    """
+    Drop the cached log catalog so the next GET /table refetches it.
+    """
+
+    with _catalog_lock:
+        _catalog_cache["entries"] = None
+        _catalog_cache["expires_at"] = 0.0
+        _catalog_cache["generation"] += 1
+
+
+def fetch_log_catalog(es: Elasticsearch) -> list[dict[str, Any]]:
+    """
+    Fetch metadata and sizes for every log index in two requests.
+
+    Index '_meta' objects come from a single wildcard mapping request and
+    document counts/store sizes from a single '_cat/indices' request, so the
+    cost does not grow with the number of stored logs.
+
+    Args:
+        es (Elasticsearch): The Elasticsearch client.
+
+    Returns:
+        list[dict]: One entry per log with id, title, description, doc_count,
+        store_size (bytes) and embeddings_ready.
+    """
+
+    with span("es_query", op="log_catalog"):
+        mappings = es.indices.get_mapping(
+            index="*",
+            filter_path=[
+                "*.mappings._meta.title",
+                "*.mappings._meta.description",
+                "*.mappings._meta.embeddings_ready",
+            ],
+        )
+        cat = es.cat.indices(
+            index="*", format="json", bytes="b", h="index,docs.count,store.size"
+        )
+    sizes = {row["index"]: row for row in cat}
+
+    log_files = []
+    for index, row in sorted(sizes.items()):
+        if index.startswith("."):
+            continue
+        meta = mappings.get(index, {}).get("mappings", {}).get("_meta", {})
+        log_files.append(
+            {
+                "id": index,
+                "title": meta.get("title", "TITLE"),
+                "description": meta.get("description", "DESCRIPTION"),
+                "doc_count": int(row.get("docs.count") or 0),
+                "store_size": int(row.get("store.size") or 0),
+                "embeddings_ready": bool(meta.get("embeddings_ready", False)),
+            }
+        )
+    return log_files
+
+
+def get_log_catalog() -> list[dict[str, Any]]:
+    """
+    Return the log catalog (see fetch_log_catalog), from the cache when fresh.
+    """
+
+    with _catalog_lock:
+        if (
+            _catalog_cache["entries"] is not None
+            and time.monotonic() < _catalog_cache["expires_at"]
+        ):
+            return _catalog_cache["entries"]
+        generation = _catalog_cache["generation"]
+
+    es = get_es_client()
+    log_files = fetch_log_catalog(es)
+
+    with _catalog_lock:
+        # Don't cache a result that raced with an upload or delete.
+        if _catalog_cache["generation"] == generation:
+            _catalog_cache["entries"] = log_files
+            _catalog_cache["expires_at"] = time.monotonic() + CATALOG_TTL_SECONDS
+    return log_files
+
+
+@app.get("/table")
+def list_log_indices():
+    """
+    List all log indices in Elasticsearch with their metadata, size and embedding readiness.
+    """
+
+    try:
+        return get_log_catalog()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 def compute_embeddings(input_data: list[str]) -> list[list[float]]:
     """
-    Compute embeddings for a list of texts using the SentenceTransformer model.
+    Compute embeddings for the first message of each entry (see encode_texts).
 
     Args:
         input_data (list[str]): List of texts to embed.
@@ -486,20 +1765,48 @@ def compute_embeddings(input_data: list[str]) -> list[list[float]]:
     """
 
     texts = [text[0] for text in input_data]
-    embeddings = emb_model.encode(
-        texts, batch_size=64, convert_to_tensor=True, show_progress_bar=False
-    )
-    return [embedding.tolist() for embedding in embeddings]
+    with span("embedding", texts=len(texts)):
+        return encode_texts(texts)
+
+
+# Default number of k-NN candidates per shard; more is slower but more accurate.
+SEARCH_NUM_CANDIDATES = int(os.getenv("SEARCH_NUM_CANDIDATES", 50))
+
+# Logs searched by a cross-log search, newest first. Each searched log costs a query
+# (when its hits are not cached), so this bounds the cost of a new search.
+SEARCH_MAX_INDICES = int(os.getenv("SEARCH_MAX_INDICES", 256))
+
+# Per-log hits of recent cross-log searches, so repeated searches only query the
+# logs that changed.
+candidate_cache = CandidateCache(int(os.getenv("SEARCH_CACHE_ENTRIES", 10_000)))
 
 
-def search_similar(q: str, index: str, k: int = 10) -> list[dict[str, Any]]:
+def search_similar(
+    q: str,
+    index: str,
+    k: int = 10,
+    num_candidates: int | None = None,
+    levels: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    hybrid: bool = False,
+) -> list[dict[str, Any]]:
     """
     Search for logs similar to a query using Elasticsearch's k-NN functionality.
 
+    Level and time filters are applied inside the k-NN search. With 'hybrid', BM25
+    results are fused in as well (see similarity_search.search).
+
     Args:
         q (str): Query text.
         index (str): Elasticsearch index to search.
         k (int, optional): Number of similar documents to retrieve. Defaults to 10.
+        num_candidates (int | None, optional): k-NN candidates per shard (and the
+            depth of each ranking when hybrid). Defaults to SEARCH_NUM_CANDIDATES.
+        levels (list[str] | None, optional): Only search these levels. Defaults to None.
+        start (str | None, optional): ISO 8601 start time (inclusive). Defaults to None.
+        end (str | None, optional): ISO 8601 end time (exclusive). Defaults to None.
+        hybrid (bool, optional): Fuse k-NN with BM25 results. Defaults to False.
 
     Returns:
         list[dict]: List of similar log documents with the 'embedding' field removed.
@@ -513,22 +1820,121 @@ def search_similar(q: str, index: str, k: int = 10) -> list[dict[str, Any]]:
     # compute_embeddings expects a list of texts, so we wrap q in a list.
     query_embedding = compute_embeddings([q])[0]
 
-    # Use Elasticsearch's knn query
-    response = es.search(
-        index=index,
-        knn={
-            "field": "embedding",
-            "query_vector": query_embedding,
-            "num_candidates": 50,
-            "k": k,
-        },
-        size=k,
+    hits = similarity_search.search(
+        es,
+        index,
+        q,
+        query_embedding,
+        k,
+        num_candidates or SEARCH_NUM_CANDIDATES,
+        filters=build_filters(levels, start, end),
+        hybrid=hybrid,
+    )
+    return [hit["_source"] for hit in hits]
+
+
+def search_similar_incidents(
+    q: str,
+    k: int = 10,
+    num_candidates: int | None = None,
+    levels: list[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    hybrid: bool = False,
+    exclude: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Search every stored log with embeddings for entries similar to a query.
+
+    Each log's top hits are merged into a global top k (see
+    similarity_search.search_indices); per-log hits are cached in candidate_cache.
+    Only the SEARCH_MAX_INDICES most recently uploaded logs are searched.
+
+    Args:
+        q (str): Query text.
+        k (int, optional): Number of similar documents to retrieve. Defaults to 10.
+        num_candidates (int | None, optional): k-NN candidates per shard. Defaults to
+            SEARCH_NUM_CANDIDATES.
+        levels (list[str] | None, optional): Only search these levels. Defaults to None.
+        start (str | None, optional): ISO 8601 start time (inclusive). Defaults to None.
+        end (str | None, optional): ISO 8601 end time (exclusive). Defaults to None.
+        hybrid (bool, optional): Fuse k-NN with BM25 results. Defaults to False.
+        exclude (str | None, optional): Log ID to leave out (e.g. the current one).
+
+    Returns:
+        list[dict]: Similar log documents with 'log_id' and 'score' added, best first.
+    """
+
+    indices = [
+        entry["id"]
+        for entry in get_log_catalog()
+        if entry["embeddings_ready"] and entry["id"] != exclude
+    ]
+    if not indices:
+        return []
+    indices.sort(key=lambda idx: log_store.modified(idx) or 0.0, reverse=True)
+
+    es = get_es_client()
+    query_embedding = compute_embeddings([q])[0]
+    hits = similarity_search.search_indices(
+        es,
+        indices,
+        q,
+        query_embedding,
+        k,
+        num_candidates or SEARCH_NUM_CANDIDATES,
+        filters=build_filters(levels, start, end),
+        hybrid=hybrid,
+        cache=candidate_cache,
+        versions={idx: log_store.generation(idx) for idx in indices},
+        max_indices=SEARCH_MAX_INDICES,
+    )
+    return [
+        {**hit["_source"], "log_id": hit["_index"], "score": hit["_score"]}
+        for hit in hits
+    ]
+
+
+@app.get("/similar_incidents")
+def get_similar_incidents(
+    q: str,
+    k: int = 10,
+    num_candidates: int | None = None,
+    levels: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    hybrid: bool = False,
+    exclude: str | None = None,
+):
+    """
+    Search all stored logs for entries similar to a query ("have we seen this
+    before?"). Levels are comma separated; see search_similar_incidents.
+    """
+
+    try:
+        return search_similar_incidents(
+            q,
+            k=k,
+            num_candidates=num_candidates,
+            levels=levels.split(",") if levels is not None else None,
+            start=start,
+            end=end,
+            hybrid=hybrid,
+            exclude=exclude,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Expose stage latencies, LLM token counts and request durations for Prometheus.
+    """
+
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
     )
-    hits = response.get("hits", {}).get("hits", [])
-    logs = [hit["_source"] for hit in hits]
-    for log in logs:
-        log.pop("embedding", None)
-    return logs
 
 
 # API endpoint to get all the enabled models
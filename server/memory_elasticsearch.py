@@ -0,0 +1,411 @@
+import copy
+import itertools
+import json
+import math
+import re
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+from elastic_transport import JsonSerializer
+
+
+class _Indices:
+    """The 'indices' namespace of InMemoryElasticsearch."""
+
+    def __init__(self, store: "InMemoryElasticsearch"):
+        self._store = store
+
+    def exists(self, index: str, **kwargs: Any) -> bool:
+        return index in self._store._indices
+
+    def create(
+        self,
+        index: str,
+        body: dict | None = None,
+        mappings: dict | None = None,
+        **kwargs,
+    ):
+        with self._store._lock:
+            if index in self._store._indices:
+                raise ValueError(f"index [{index}] already exists")
+            mappings = mappings or (body or {}).get("mappings", {})
+            self._store._indices[index] = {
+                "mappings": copy.deepcopy(mappings),
+                "docs": {},
+            }
+        return {"acknowledged": True, "index": index}
+
+    def delete(self, index: str, **kwargs: Any):
+        with self._store._lock:
+            self._store._require(index)
+            del self._store._indices[index]
+        return {"acknowledged": True}
+
+    def get_mapping(self, index: str = "*", **kwargs: Any) -> dict[str, Any]:
+        # filter_path is ignored: callers only read the paths they asked for.
+        with self._store._lock:
+            names = self._store._resolve(index)
+            return {
+                name: {
+                    "mappings": copy.deepcopy(self._store._indices[name]["mappings"])
+                }
+                for name in names
+            }
+
+    def put_mapping(
+        self,
+        index: str,
+        meta: dict | None = None,
+        properties: dict | None = None,
+        **kwargs,
+    ):
+        with self._store._lock:
+            mappings = self._store._require(index)["mappings"]
+            if meta is not None:
+                mappings["_meta"] = copy.deepcopy(meta)
+            if properties:
+                mappings.setdefault("properties", {}).update(properties)
+        return {"acknowledged": True}
+
+    def refresh(self, index: str | None = None, **kwargs: Any):
+        return {"_shards": {"failed": 0}}
+
+
+class _Cat:
+    """The 'cat' namespace of InMemoryElasticsearch."""
+
+    def __init__(self, store: "InMemoryElasticsearch"):
+        self._store = store
+
+    def indices(self, index: str = "*", **kwargs: Any) -> list[dict[str, str]]:
+        # Always answers like format="json", bytes="b".
+        with self._store._lock:
+            rows = []
+            for name in self._store._resolve(index):
+                docs = self._store._indices[name]["docs"]
+                size = sum(len(json.dumps(doc, default=str)) for doc in docs.values())
+                rows.append(
+                    {
+                        "index": name,
+                        "docs.count": str(len(docs)),
+                        "store.size": str(size),
+                    }
+                )
+            return rows
+
+
+class InMemoryElasticsearch:
+    """
+    In-process stand-in for the subset of the Elasticsearch client the server uses.
+
+    Supports index creation/deletion with mappings and '_meta', bulk indexing through
+    elasticsearch.helpers.bulk, searches with scrolling, delete_by_query with
+    match_all, brute-force cosine k-NN searches (with filters), msearch and
+    '_cat/indices'.
+    Queries may use match_all, match (scored with BM25), term, terms, range and bool
+    clauses. It is meant for
+    load tests and local development without an Elasticsearch node (ES_BACKEND=memory),
+    not for production: everything is kept in memory and searches scan every document.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indices: dict[str, dict[str, Any]] = {}
+        # Scroll id -> (remaining hits, page size).
+        self._scrolls: dict[str, tuple[list[dict[str, Any]], int]] = {}
+        self._scroll_ids = itertools.count()
+        self.indices = _Indices(self)
+        self.cat = _Cat(self)
+        # elasticsearch.helpers.bulk serializes actions with the client's serializer.
+        self.transport = SimpleNamespace(
+            serializers=SimpleNamespace(get_serializer=lambda _: JsonSerializer())
+        )
+
+    def _require(self, index: str) -> dict[str, Any]:
+        if index not in self._indices:
+            raise KeyError(f"no such index [{index}]")
+        return self._indices[index]
+
+    def _resolve(self, index: str) -> list[str]:
+        if index in ("*", "_all"):
+            return sorted(self._indices)
+        self._require(index)
+        return [index]
+
+    def options(self, **kwargs: Any) -> "InMemoryElasticsearch":
+        return self
+
+    def ping(self, **kwargs: Any) -> bool:
+        return True
+
+    def bulk(self, operations: list[bytes | str | dict], **kwargs: Any):
+        """
+        Apply 'index' and 'update' operations (action line followed by the document).
+
+        'index' creates a missing index; 'update' merges 'doc' into an existing
+        document and fails for a missing index or document.
+        """
+
+        lines = [
+            json.loads(op) if isinstance(op, (bytes, str)) else op for op in operations
+        ]
+        items = []
+        errors = False
+        with self._lock:
+            for action, source in zip(lines[::2], lines[1::2]):
+                op_type, meta = next(iter(action.items()))
+                index = meta["_index"]
+                if op_type == "update":
+                    doc_id = str(meta["_id"])
+                    doc = self._indices.get(index, {}).get("docs", {}).get(doc_id)
+                    if doc is None:
+                        errors = True
+                        error = {"type": "document_missing_exception"}
+                        items.append(
+                            {
+                                op_type: {
+                                    "_index": index,
+                                    "_id": doc_id,
+                                    "status": 404,
+                                    "error": error,
+                                }
+                            }
+                        )
+                        continue
+                    doc.update(source["doc"])
+                    items.append(
+                        {op_type: {"_index": index, "_id": doc_id, "status": 200}}
+                    )
+                    continue
+                if index not in self._indices:
+                    self.indices.create(index=index)
+                doc_id = str(meta.get("_id", len(self._indices[index]["docs"])))
+                self._indices[index]["docs"][doc_id] = source
+                items.append({op_type: {"_index": index, "_id": doc_id, "status": 201}})
+        return SimpleNamespace(body={"errors": errors, "items": items})
+
+    def delete_by_query(self, index: str, body: dict | None = None, **kwargs: Any):
+        with self._lock:
+            docs = self._require(index)["docs"]
+            deleted = len(docs)
+            docs.clear()
+        return {"deleted": deleted}
+
+    def search(
+        self,
+        index: str,
+        body: dict | None = None,
+        query: dict | None = None,
+        knn: dict | None = None,
+        size: int = 10,
+        scroll: str | None = None,
+        source_excludes: list[str] | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """
+        Run a query (optionally scrolled) or a k-NN search.
+        """
+
+        with self._lock:
+            docs = list(self._require(index)["docs"].items())
+        query = query or (body or {}).get("query") or {"match_all": {}}
+        if knn is not None:
+            filters = knn.get("filter", [])
+            docs = [
+                (doc_id, source)
+                for doc_id, source in docs
+                if all(_matches(source, clause) for clause in filters)
+            ]
+            hits = self._knn(docs, knn)[:size]
+        else:
+            hits = _score(docs, query)
+        for hit in hits:
+            hit["_index"] = index
+
+        response: dict[str, Any] = {"hits": {"total": {"value": len(hits)}}}
+        page = copy.deepcopy(hits[:size])
+        for hit in page:
+            for field in source_excludes or ():
+                hit["_source"].pop(field, None)
+        response["hits"]["hits"] = page
+        if scroll is not None:
+            scroll_id = str(next(self._scroll_ids))
+            with self._lock:
+                self._scrolls[scroll_id] = (hits[size:], size)
+            response["_scroll_id"] = scroll_id
+        return response
+
+    def msearch(self, searches: list[dict[str, Any]], **kwargs: Any) -> dict[str, Any]:
+        """
+        Run header/body pairs of searches; a failing search returns an error entry.
+        """
+
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2]):
+            source = body.get("_source", {})
+            try:
+                response = self.search(
+                    index=header["index"],
+                    query=body.get("query"),
+                    knn=body.get("knn"),
+                    size=body.get("size", 10),
+                    source_excludes=source.get("excludes"),
+                )
+            except KeyError as e:
+                responses.append({"error": {"reason": str(e)}, "status": 404})
+                continue
+            responses.append({**response, "status": 200})
+        return {"responses": responses}
+
+    def scroll(self, scroll_id: str, **kwargs: Any):
+        with self._lock:
+            remaining, size = self._scrolls.get(scroll_id, ([], 0))
+            page = remaining[:size]
+            self._scrolls[scroll_id] = (remaining[size:], size)
+        return {"_scroll_id": scroll_id, "hits": {"hits": copy.deepcopy(page)}}
+
+    def clear_scroll(self, scroll_id: str | None = None, **kwargs: Any):
+        with self._lock:
+            self._scrolls.pop(scroll_id, None)
+        return {"succeeded": True}
+
+    def _knn(
+        self, docs: list[tuple[str, dict]], knn: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        field = knn["field"]
+        query = knn["query_vector"]
+        query_norm = math.sqrt(sum(x * x for x in query)) or 1.0
+        scored = []
+        for doc_id, source in docs:
+            vector = source.get(field)
+            if not vector:
+                continue
+            norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+            cosine = sum(a * b for a, b in zip(query, vector)) / (query_norm * norm)
+            # Elasticsearch scores cosine similarity as (1 + cosine) / 2.
+            scored.append(((1 + cosine) / 2, doc_id, source))
+        scored.sort(key=lambda hit: hit[0], reverse=True)
+        return [
+            {"_id": doc_id, "_score": score, "_source": source}
+            for score, doc_id, source in scored[: knn.get("k", 10)]
+        ]
+
+
+def _tokens(value: Any) -> list[str]:
+    if isinstance(value, list):
+        return [token for item in value for token in _tokens(item)]
+    return re.findall(r"\w+", str(value).lower()) if value is not None else []
+
+
+def _match_text(clause: dict[str, Any]) -> tuple[str, str]:
+    field, value = next(iter(clause.items()))
+    if isinstance(value, dict):
+        value = value["query"]
+    return field, str(value)
+
+
+def _as_datetime(value: Any) -> datetime | None:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _in_range(value: Any, bounds: dict[str, Any]) -> bool:
+    if isinstance(value, str):
+        value = _as_datetime(value)
+        convert = _as_datetime
+    else:
+        convert = lambda bound: bound
+    if value is None:
+        return False
+    checks = {
+        "gte": lambda bound: value >= bound,
+        "gt": lambda bound: value > bound,
+        "lte": lambda bound: value <= bound,
+        "lt": lambda bound: value < bound,
+    }
+    return all(
+        check(convert(bounds[op])) for op, check in checks.items() if op in bounds
+    )
+
+
+def _matches(source: dict[str, Any], clause: dict[str, Any]) -> bool:
+    """Whether a document passes a query clause (scores are ignored)."""
+
+    kind, spec = next(iter(clause.items()))
+    if kind == "match_all":
+        return True
+    if kind == "match":
+        field, text = _match_text(spec)
+        return bool(set(_tokens(text)) & set(_tokens(source.get(field))))
+    if kind in ("term", "terms"):
+        field, value = next(iter(spec.items()))
+        if isinstance(value, dict):
+            value = value["value"]
+        values = value if kind == "terms" else [value]
+        actual = source.get(field)
+        actual = actual if isinstance(actual, list) else [actual]
+        return any(item in values for item in actual)
+    if kind == "range":
+        field, bounds = next(iter(spec.items()))
+        return _in_range(source.get(field), bounds)
+    if kind == "bool":
+        required = _as_list(spec.get("must")) + _as_list(spec.get("filter"))
+        should = _as_list(spec.get("should"))
+        minimum = spec.get("minimum_should_match", 0 if required else 1)
+        return (
+            all(_matches(source, c) for c in required)
+            and not any(_matches(source, c) for c in _as_list(spec.get("must_not")))
+            and (not should or sum(_matches(source, c) for c in should) >= minimum)
+        )
+    raise ValueError(f"Unsupported query clause '{kind}'")
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _scoring_matches(query: dict[str, Any]) -> list[dict[str, Any]]:
+    """The match clauses that contribute to the score (not those in 'filter')."""
+
+    kind, spec = next(iter(query.items()))
+    if kind == "match":
+        return [spec]
+    if kind == "bool":
+        clauses = _as_list(spec.get("must")) + _as_list(spec.get("should"))
+        return [match for clause in clauses for match in _scoring_matches(clause)]
+    return []
+
+
+def _score(docs: list[tuple[str, dict]], query: dict[str, Any]) -> list[dict]:
+    """Return the documents matching a query, scored with BM25 (k1=1.2, b=0.75)."""
+
+    hits = [
+        {"_id": doc_id, "_score": 1.0, "_source": source}
+        for doc_id, source in docs
+        if _matches(source, query)
+    ]
+    matches = _scoring_matches(query)
+    if not matches or not hits:
+        return hits
+
+    for hit in hits:
+        hit["_score"] = 0.0
+    for match in matches:
+        field, text = _match_text(match)
+        tokens = {doc_id: _tokens(source.get(field)) for doc_id, source in docs}
+        average_length = (sum(map(len, tokens.values())) / len(tokens)) or 1.0
+        for token in set(_tokens(text)):
+            frequency = sum(1 for doc_tokens in tokens.values() if token in doc_tokens)
+            idf = math.log(1 + (len(docs) - frequency + 0.5) / (frequency + 0.5))
+            for hit in hits:
+                doc_tokens = tokens[hit["_id"]]
+                tf = doc_tokens.count(token)
+                norm = 1.2 * (0.25 + 0.75 * len(doc_tokens) / average_length)
+                hit["_score"] += idf * tf * 2.2 / (tf + norm)
+    hits.sort(key=lambda hit: hit["_score"], reverse=True)
+    return hits
@@ -0,0 +1,274 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+# Histogram buckets in seconds, from fast in-process work up to slow LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class MetricsRegistry:
+    """
+    Minimal thread-safe registry of counters and histograms in the Prometheus text format.
+
+    Metrics are created on first use. Label sets are stored as sorted tuples of
+    (name, value) pairs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, list[float]]] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """
+        Set the TYPE ('counter' or 'histogram') and HELP text of a metric.
+        """
+
+        with self._lock:
+            self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1, **labels: Any):
+        """
+        Increment a counter.
+        """
+
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels: Any,
+    ):
+        """
+        Record an observation in a histogram.
+        """
+
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            bounds = self._buckets.setdefault(name, buckets)
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts, then the sum and the total count.
+            values = series.setdefault(key, [0.0] * (len(bounds) + 2))
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    values[i] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+
+        def fmt(labels: tuple, extra: tuple = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            escaped = (
+                (k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+            )
+            return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                kind, help_text = self._help.get(name, ("counter", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{fmt(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                kind, help_text = self._help.get(name, ("histogram", name))
+                bounds = self._buckets[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, values in sorted(series.items()):
+                    for bound, count in zip(bounds, values):
+                        le = (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{fmt(labels, le)} {count:g}")
+                    inf = (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{fmt(labels, inf)} {values[-1]:g}")
+                    lines.append(f"{name}_sum{fmt(labels)} {values[-2]:g}")
+                    lines.append(f"{name}_count{fmt(labels)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe(
+    "log_viewer_stage_seconds", "histogram", "Duration of instrumented stages."
+)
+REGISTRY.describe(
+    "log_viewer_llm_tokens_total", "counter", "LLM tokens by model and kind."
+)
+REGISTRY.describe(
+    "log_viewer_http_request_seconds",
+    "histogram",
+    "Time until the response headers are sent, by route.",
+)
+REGISTRY.describe(
+    "log_viewer_event_loop_lag_seconds",
+    "histogram",
+    "How late the event loop ran a periodic timer; high values block every client.",
+)
+
+# Event loop lag is normally well under a millisecond.
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Trace:
+    """
+    Spans recorded while handling one request.
+
+    Attributes:
+        started (float): perf_counter() value when the trace started.
+        spans (list[dict]): Finished spans as {"name", "start_ms", "duration_ms", **attributes}.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, duration: float, attrs: dict[str, Any]):
+        """
+        Add a finished span (start is a perf_counter() value, duration in seconds).
+        """
+
+        span = {
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+        }
+        span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+
+    def elapsed_ms(self) -> float:
+        """
+        Return the time since the trace started in milliseconds.
+        """
+
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def server_timing(self) -> str:
+        """
+        Summarize the spans as a Server-Timing header value (durations summed per name).
+        """
+
+        totals: dict[str, list[float]] = {}
+        with self._lock:
+            for span in self.spans:
+                total = totals.setdefault(span["name"], [0.0, 0])
+                total[0] += span["duration_ms"]
+                total[1] += 1
+        entries = [
+            f'{name};dur={duration:.2f};desc="{count} call(s)"'
+            for name, (duration, count) in totals.items()
+        ]
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def start_trace() -> Trace:
+    """
+    Start a trace for the current context (e.g. one HTTP request) and return it.
+
+    Tasks and threads started from this context (asyncio.create_task,
+    asyncio.to_thread, offload.run_blocking, FastAPI's threadpool) record their spans
+    into it too.
+    """
+
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Trace | None:
+    """
+    Return the trace of the current context, if any.
+    """
+
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """
+    Time a block of code as a named stage.
+
+    The duration is always recorded in the stage histogram. It is also added to the
+    current trace, if there is one, together with the attributes. The yielded dict
+    can be used to add attributes from inside the block (e.g. token counts).
+
+    Args:
+        name (str): Stage name, e.g. "plan", "llm" or "es_query".
+        **attrs: Initial span attributes.
+
+    Yields:
+        dict[str, Any]: The span attributes.
+    """
+
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        duration = time.perf_counter() - start
+        REGISTRY.observe("log_viewer_stage_seconds", duration, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, start, duration, attrs)
+
+
+def record_tokens(
+    attrs: dict[str, Any], model: str, prompt_tokens: int, completion_tokens: int
+):
+    """
+    Count LLM tokens and add them to the attributes of the enclosing span.
+
+    Args:
+        attrs (dict[str, Any]): Attributes yielded by span().
+        model (str): Model identifier.
+        prompt_tokens (int): Number of prompt tokens.
+        completion_tokens (int): Number of completion tokens.
+    """
+
+    attrs["prompt_tokens"] = prompt_tokens
+    attrs["completion_tokens"] = completion_tokens
+    REGISTRY.inc(
+        "log_viewer_llm_tokens_total", prompt_tokens, model=model, kind="prompt"
+    )
+    REGISTRY.inc(
+        "log_viewer_llm_tokens_total", completion_tokens, model=model, kind="completion"
+    )
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    Record event loop lag until cancelled.
+
+    Sleeps for 'interval' seconds in a loop and records how much later than
+    requested each wake-up happened. Any synchronous work on the loop (a CPU-bound
+    stage, a blocking call) shows up as lag for every request served by it.
+
+    Args:
+        interval (float, optional): Seconds between measurements. Defaults to 0.5.
+    """
+
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        REGISTRY.observe("log_viewer_event_loop_lag_seconds", lag, buckets=LAG_BUCKETS)
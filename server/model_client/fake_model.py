@@ -0,0 +1,155 @@
+import asyncio
+import json
+import random
+from model_client.model_client import ModelClient
+from metrics import record_tokens, span
+from typing import Any
+
+# Canned responses as (prompt marker, response), checked in order. The markers
+# match the prompts built by ChatAgent so every step of /chat_stream gets a
+# response in the format it parses.
+DEFAULT_RESPONSES: list[tuple[str, str]] = [
+    (
+        "Generate a filter group in JSON format",
+        json.dumps(
+            {
+                "title": "Errors",
+                "description": "Highlights error rows.",
+                "filters": [
+                    {
+                        "text": "error",
+                        "regex": False,
+                        "caseSensitive": False,
+                        "color": "#ffd6d6",
+                        "description": "Error rows",
+                    }
+                ],
+            }
+        ),
+    ),
+    (
+        "should this issue be flagged?",
+        "**Issue Summary**:\nThe logs match this known issue.\n"
+        "**Resolution**:\nFollow the documented resolution.",
+    ),
+    ("yes: [brief explanation]", "yes: canned decision"),
+]
+
+DEFAULT_TEXT = (
+    "The logs show steady Info traffic with a short burst of errors. "
+    "Most messages come from the media session and transport components."
+)
+
+
+def fake_object(schema: dict[str, Any]) -> Any:
+    """
+    Build a value matching a JSON schema (booleans are True, strings are canned text).
+    """
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fake_object(prop)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [fake_object(schema.get("items", {}))]
+    if kind == "boolean":
+        return True
+    if kind in ("integer", "number"):
+        return 0
+    return "canned response"
+
+
+class FakeModelClient(ModelClient):
+    """
+    Model client returning canned responses after a simulated delay.
+
+    The delay of a call is 'latency' (time to first token) plus the response length
+    in tokens divided by 'tokens_per_second', scaled by a random factor within
+    +/- 'jitter'. Used for load tests and local development without an LLM.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        tokens_per_second: float = 50.0,
+        responses: list[tuple[str, str]] | None = None,
+        default_response: str = DEFAULT_TEXT,
+        jitter: float = 0.0,
+        seed: int | None = None,
+    ):
+        """
+        Initialize the fake client.
+
+        Args:
+            latency (float, optional): Seconds before the first token. Defaults to 0.5.
+            tokens_per_second (float, optional): Simulated generation speed. Defaults to 50.
+            responses (list[tuple[str, str]] | None, optional): (prompt marker, response)
+                pairs checked in order. Defaults to DEFAULT_RESPONSES.
+            default_response (str, optional): Response when no marker matches.
+            jitter (float, optional): Relative random variation of the delay. Defaults to 0.
+            seed (int | None, optional): Seed for the jitter. Defaults to None.
+        """
+
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.responses = DEFAULT_RESPONSES if responses is None else responses
+        self.default_response = default_response
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Approximate the number of tokens of a text (about 4 characters per token)."""
+
+        return max(1, len(text) // 4)
+
+    async def _respond(self, prompt: str, response: str, **attrs: Any) -> str:
+        with span("llm", model="fake", **attrs) as span_attrs:
+            completion_tokens = self.count_tokens(response)
+            delay = self.latency + completion_tokens / self.tokens_per_second
+            if self.jitter:
+                delay *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(max(delay, 0))
+            record_tokens(
+                span_attrs, "fake", self.count_tokens(prompt), completion_tokens
+            )
+        self.calls += 1
+        return response
+
+    async def chat_completion(self, prompt: str) -> str:
+        """
+        Return the canned response for the prompt after the simulated delay.
+
+        Args:
+            prompt (str): The input prompt.
+
+        Returns:
+            str: The first response whose marker occurs in the prompt, or the default.
+        """
+
+        response = next(
+            (text for marker, text in self.responses if marker in prompt),
+            self.default_response,
+        )
+        return await self._respond(prompt, response)
+
+    async def structured_completion(
+        self, prompt: str, schema: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Return an object matching the schema after the simulated delay.
+
+        Args:
+            prompt (str): The input prompt.
+            schema (dict[str, Any]): JSON schema of the expected object.
+
+        Returns:
+            dict[str, Any]: An object built from the schema by fake_object.
+        """
+
+        value = fake_object(schema)
+        await self._respond(prompt, json.dumps(value), structured=True)
+        return value
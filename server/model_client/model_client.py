@@ -1,4 +1,10 @@
 import abc
+import json
+import logging
+from typing import Any
+from utils import clean_response_content
+
+logger = logging.getLogger(__name__)
 
 
 class ModelClient(abc.ABC):
@@ -16,3 +22,29 @@ class ModelClient(abc.ABC):
             str: The generated response.
         """
         pass
+
+    async def structured_completion(
+        self, prompt: str, schema: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Asynchronously generate a JSON object for the given prompt.
+
+        The default implementation asks for a plain completion and parses it as
+        JSON, so the prompt itself must describe the expected format. Clients whose
+        backend supports structured output should override this to enforce the schema.
+
+        Args:
+            prompt (str): The input prompt.
+            schema (dict[str, Any]): JSON schema of the expected object.
+
+        Returns:
+            dict[str, Any]: The parsed object, or an empty dict if the response is not a JSON object.
+        """
+
+        response = await self.chat_completion(prompt)
+        try:
+            parsed = json.loads(clean_response_content(response or ""))
+        except json.JSONDecodeError as e:
+            logger.warning("Error decoding structured response: %s", e)
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
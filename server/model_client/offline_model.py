@@ -1,7 +1,9 @@
 import asyncio
+import json
 from model_client.model_client import ModelClient
+from metrics import record_tokens, span
 from llama_cpp import Llama
-from typing import Iterator
+from typing import Any, Iterator
 
 
 class OfflineModelClient(ModelClient):
@@ -34,10 +36,50 @@ class OfflineModelClient(ModelClient):
             str: The generated response.
         """
         
-        output = await asyncio.to_thread(
-            self.model.create_chat_completion,
-            messages=[{"role": "system", "content": prompt}],
-        )
-        if isinstance(output, Iterator):
-            return ""
+        with span("llm", model="offline") as attrs:
+            output = await asyncio.to_thread(
+                self.model.create_chat_completion,
+                messages=[{"role": "system", "content": prompt}],
+            )
+            if isinstance(output, Iterator):
+                return ""
+            self._record_usage(attrs, output)
         return output["choices"][0]["message"]["content"] or ""
+
+    async def structured_completion(
+        self, prompt: str, schema: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Asynchronously generate a JSON object constrained to a schema by llama.cpp's grammar.
+
+        Args:
+            prompt (str): The input prompt.
+            schema (dict[str, Any]): JSON schema of the expected object.
+
+        Returns:
+            dict[str, Any]: The parsed object, or an empty dict if nothing was generated.
+        """
+
+        with span("llm", model="offline", structured=True) as attrs:
+            output = await asyncio.to_thread(
+                self.model.create_chat_completion,
+                messages=[{"role": "system", "content": prompt}],
+                response_format={"type": "json_object", "schema": schema},
+            )
+            if isinstance(output, Iterator):
+                return {}
+            self._record_usage(attrs, output)
+        content = output["choices"][0]["message"]["content"]
+        return json.loads(content) if content else {}
+
+    def _record_usage(self, attrs: dict[str, Any], output: dict[str, Any]):
+        """Add the token usage of a completion to the current span and the token counters."""
+
+        usage = output.get("usage")
+        if usage:
+            record_tokens(
+                attrs,
+                "offline",
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+            )
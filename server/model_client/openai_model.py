@@ -1,6 +1,9 @@
 import asyncio
+import json
 from model_client.model_client import ModelClient
+from metrics import record_tokens, span
 from openai import OpenAI
+from typing import Any
 
 
 class OpenAIModelClient(ModelClient):
@@ -31,10 +34,55 @@ class OpenAIModelClient(ModelClient):
             str: The generated chat response.
         """
 
-        response = await asyncio.to_thread(
-            self.client.chat.completions.create,
-            model=self.model,
-            messages=[{"role": "system", "content": prompt}],
-        )
+        with span("llm", model=self.model) as attrs:
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=[{"role": "system", "content": prompt}],
+            )
+            self._record_usage(attrs, response)
         content = response.choices[0].message.content
         return content if content is not None else ""
+
+    async def structured_completion(
+        self, prompt: str, schema: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Asynchronously generate a JSON object that follows a schema using structured outputs.
+
+        Args:
+            prompt (str): The prompt for which to generate a response.
+            schema (dict[str, Any]): JSON schema of the expected object.
+
+        Returns:
+            dict[str, Any]: The parsed object, or an empty dict if the model returned nothing.
+        """
+
+        with span("llm", model=self.model, structured=True) as attrs:
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=[{"role": "system", "content": prompt}],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "response",
+                        "schema": schema,
+                        "strict": True,
+                    },
+                },
+            )
+            self._record_usage(attrs, response)
+        content = response.choices[0].message.content
+        return json.loads(content) if content else {}
+
+    def _record_usage(self, attrs: dict[str, Any], response: Any):
+        """Add the token usage of a completion to the current span and the token counters."""
+
+        if response.usage is not None:
+            record_tokens(
+                attrs,
+                self.model,
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+            )
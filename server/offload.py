@@ -0,0 +1,37 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Threads for CPU-bound and blocking request stages (statistics, row extraction,
+# embedding a query, synchronous Elasticsearch calls). Bounded so a burst of large
+# chat requests queues here instead of starving the event loop and the server.
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", min(4, os.cpu_count() or 1)))
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on the bounded CPU executor and await its result.
+
+    The caller's context is copied into the worker thread, so spans recorded by the
+    function land in the current request's trace.
+
+    Args:
+        fn (Callable): The function to run.
+        *args: Positional arguments for fn.
+        **kwargs: Keyword arguments for fn.
+
+    Returns:
+        The function's return value (exceptions are re-raised in the caller).
+    """
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        cpu_executor, functools.partial(context.run, fn, *args, **kwargs)
+    )
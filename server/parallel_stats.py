@@ -0,0 +1,207 @@
+import os
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from typing import Any
+from sketch import DEFAULT_SKETCH_CAPACITY, SpaceSaving
+from anomaly import detect_anomalies
+from utils import (
+    compute_stats,
+    count_levels,
+    find_keyword_rows,
+    get_log_level_counts,
+    keyword_sketch,
+    stats_interval,
+)
+
+# Logs smaller than this are not worth the cost of shipping shards to worker processes.
+SHARDED_STATS_MIN_ROWS = int(os.getenv("SHARDED_STATS_MIN_ROWS", 50_000))
+
+
+def split_into_shards(logs: list[dict], shard_count: int) -> list[list[dict]]:
+    """
+    Split logs into at most 'shard_count' contiguous, roughly equal shards.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+        shard_count (int): Number of shards wanted.
+
+    Returns:
+        list[list[dict]]: The shards, in log order.
+    """
+
+    shard_count = max(1, min(shard_count, len(logs)))
+    size, remainder = divmod(len(logs), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < remainder else 0)
+        shards.append(logs[start:end])
+        start = end
+    return shards
+
+
+def compute_partial_stats(
+    logs: list[dict],
+    start_time: datetime,
+    interval: timedelta,
+    keywords: dict[str, list[str]] | None,
+    top_n: int,
+    capacity: int,
+) -> dict[str, Any]:
+    """
+    Compute the mergeable aggregates for one shard.
+
+    Runs inside a worker process, so everything returned must be picklable.
+
+    Args:
+        logs (list[dict] | LogTable): The shard's log entries.
+        start_time (datetime): Bucket alignment time shared by all shards.
+        interval (timedelta): Time bucket interval.
+        keywords (dict[str, list[str]] | None): Issue keywords to extract rows for.
+        top_n (int): Maximum number of rows to keep per keyword.
+        capacity (int): Capacity of the keyword sketches.
+
+    Returns:
+        dict: Level counts per bucket, overall level counts, keyword sketches and the
+        first matching rows per (category, keyword).
+    """
+
+    return {
+        "level_counts": dict(get_log_level_counts(logs, interval, start_time)),
+        "level_totals": count_levels(logs),
+        "keywords": keyword_sketch(logs, capacity),
+        "filtered_keywords": keyword_sketch(logs, capacity, filter_token_shapes=True),
+        "matches": {
+            category: [find_keyword_rows(logs, kw, top_n) for kw in kw_list]
+            for category, kw_list in (keywords or {}).items()
+        },
+    }
+
+
+def combine_partial_stats(partials: list[dict[str, Any]], top_n: int) -> dict[str, Any]:
+    """
+    Merge shard aggregates, given in log order, into whole-log aggregates.
+
+    - Level counts are summed per bucket; buckets keep first-seen order.
+    - Overall level counts are summed.
+    - Keyword sketches are merged with SpaceSaving.merge.
+    - Matching rows are concatenated per keyword and cut back to the first 'top_n'.
+
+    Args:
+        partials (list[dict]): Outputs of compute_partial_stats in shard order.
+        top_n (int): Maximum number of rows to keep per keyword.
+
+    Returns:
+        dict: The combined aggregates, in the same shape as a single partial.
+    """
+
+    level_counts: dict[datetime, dict[str, int]] = {}
+    level_totals = {"Debug": 0, "Info": 0, "Warn": 0, "Error": 0}
+    keywords: SpaceSaving | None = None
+    filtered_keywords: SpaceSaving | None = None
+    matches: dict[str, list[list[dict]]] = {}
+
+    for partial in partials:
+        for bucket, counts in partial["level_counts"].items():
+            target = level_counts.setdefault(bucket, dict.fromkeys(counts, 0))
+            for level, count in counts.items():
+                target[level] += count
+        for level, count in partial["level_totals"].items():
+            level_totals[level] += count
+        keywords = (
+            partial["keywords"]
+            if keywords is None
+            else keywords.merge(partial["keywords"])
+        )
+        filtered_keywords = (
+            partial["filtered_keywords"]
+            if filtered_keywords is None
+            else filtered_keywords.merge(partial["filtered_keywords"])
+        )
+        for category, per_keyword in partial["matches"].items():
+            merged = matches.setdefault(category, [[] for _ in per_keyword])
+            for rows, new_rows in zip(merged, per_keyword):
+                rows.extend(new_rows[: max(0, max(top_n, 1) - len(rows))])
+
+    return {
+        "level_counts": level_counts,
+        "level_totals": level_totals,
+        "keywords": keywords or SpaceSaving(),
+        "filtered_keywords": filtered_keywords or SpaceSaving(),
+        "matches": matches,
+    }
+
+
+def compute_log_stats_sharded(
+    logs: list[dict],
+    keywords: dict[str, list[str]] | None = None,
+    top_n: int = 5,
+    executor: Executor | None = None,
+    shard_count: int | None = None,
+    interval: timedelta | None = None,
+    capacity: int = DEFAULT_SKETCH_CAPACITY,
+) -> dict[str, Any]:
+    """
+    Compute the same statistics as utils.compute_log_stats over contiguous shards.
+
+    Shards are processed on 'executor' (typically a ProcessPoolExecutor) and merged
+    with combine_partial_stats. Without an executor, or for logs smaller than
+    SHARDED_STATS_MIN_ROWS, the log is processed in-process as a single shard.
+
+    Level statistics, level totals and extracted rows are identical to the serial
+    path. Keyword rankings are identical as long as the sketches never evict
+    (vocabulary per shard below 'capacity'); otherwise they carry the usual
+    Space-Saving error bounds.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+        keywords (dict[str, list[str]] | None, optional): Issue keywords (category to
+            keyword list) to extract matching warning/error rows for. Defaults to None.
+        top_n (int, optional): Maximum number of rows per keyword. Defaults to 5.
+        executor (Executor | None, optional): Pool to run shards on. Defaults to None.
+        shard_count (int | None, optional): Number of shards. Defaults to the CPU count.
+        interval (timedelta | None, optional): Time bucket interval. Defaults to
+            utils.stats_interval of the logs.
+        capacity (int, optional): Capacity of the keyword sketches. Defaults to 1024.
+
+    Returns:
+        dict: 'level_stats', 'simple_stats', 'top_keywords' and 'anomalies' as in
+        utils.compute_log_stats (before JSON conversion), plus 'extracted' in the
+        shape of utils.extract_top_rows when keywords are given.
+    """
+
+    start_time = (
+        datetime.fromisoformat(logs[0]["timestamp"].replace("Z", "+00:00"))
+        if logs
+        else None
+    )
+    if interval is None:
+        interval = stats_interval(logs)
+    args = (start_time, interval, keywords, top_n, capacity)
+
+    if executor is None or len(logs) < SHARDED_STATS_MIN_ROWS:
+        partials = [compute_partial_stats(logs, *args)]
+    else:
+        shards = split_into_shards(logs, shard_count or os.cpu_count() or 1)
+        futures = [
+            executor.submit(compute_partial_stats, shard, *args) for shard in shards
+        ]
+        partials = [future.result() for future in futures]
+
+    combined = combine_partial_stats(partials, top_n)
+    simple_stats: dict[str, Any] = dict(combined["level_totals"])
+    simple_stats["Most Common Keywords"] = [
+        entry["keyword"] for entry in combined["keywords"].top_k(5)
+    ]
+    result = {
+        "level_stats": compute_stats(combined["level_counts"]),
+        "simple_stats": simple_stats,
+        "top_keywords": combined["filtered_keywords"].top_k(20),
+        "anomalies": detect_anomalies(combined["level_counts"], logs, interval),
+    }
+    if keywords is not None:
+        result["extracted"] = {
+            category: [row for rows in per_keyword for row in rows]
+            for category, per_keyword in combined["matches"].items()
+        }
+    return result
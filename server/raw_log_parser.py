@@ -0,0 +1,185 @@
+import mmap
+import os
+import re
+from concurrent.futures import Executor
+from typing import Any, Iterable
+
+# Files smaller than this are parsed in-process; shipping chunks to workers costs more.
+PARALLEL_PARSE_MIN_BYTES = int(os.getenv("PARALLEL_PARSE_MIN_BYTES", 8 * 1024 * 1024))
+
+# A record starts with a line like
+#   2024-09-30T17:32:28.734Z <Info> [0x720] []spark-media-external.cpp:159 Media...
+# (the thread is optional). Every other line continues the previous record's messages.
+_TIMESTAMP = r"\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?"
+HEADER = re.compile(
+    rf"({_TIMESTAMP})[ \t]+<(\w+)>[ \t]*(\[0x[0-9A-Fa-f]+\])?[ \t]?(.*)", re.ASCII
+)
+# The same record start, searched for in raw bytes to split files into chunks.
+RECORD_START = re.compile(
+    rb"^" + _TIMESTAMP.encode() + rb"[ \t]+<\w+>", re.ASCII | re.MULTILINE
+)
+
+LEVELS = {
+    "debug": "Debug",
+    "trace": "Debug",
+    "verbose": "Debug",
+    "info": "Info",
+    "information": "Info",
+    "notice": "Info",
+    "warn": "Warn",
+    "warning": "Warn",
+    "error": "Error",
+    "err": "Error",
+    "fatal": "Error",
+    "critical": "Error",
+}
+
+
+def parse_text(text: str) -> tuple[list[dict[str, Any]], int]:
+    """
+    Parse raw Webex/Spark log text into log entries.
+
+    Each header line starts an entry with its 'timestamp', 'level' (normalized to
+    Debug/Info/Warn/Error; unknown levels become Info), 'thread ID' (if present) and
+    the rest of the line as the first message (empty for a bare header, as in the
+    client's parser). Following non-empty lines are appended to the entry's
+    'messages'.
+
+    Args:
+        text (str): The log text.
+
+    Returns:
+        tuple[list[dict], int]: The log entries and the number of non-empty lines
+        before the first header, which can't belong to any entry.
+    """
+
+    logs: list[dict[str, Any]] = []
+    messages: list[str] | None = None
+    orphans = 0
+    match = HEADER.match
+    for line in text.split("\n"):
+        line = line.rstrip("\r")
+        header = match(line)
+        if header is None:
+            if not line.strip():
+                continue
+            if messages is None:
+                orphans += 1
+            else:
+                messages.append(line)
+            continue
+        timestamp, level, thread, message = header.groups()
+        messages = [message or ""]
+        log = {
+            "timestamp": timestamp.replace(" ", "T", 1),
+            "level": LEVELS.get(level.lower(), "Info"),
+        }
+        if thread is not None:
+            log["thread ID"] = thread
+        log["messages"] = messages
+        logs.append(log)
+    return logs, orphans
+
+
+def format_logs(logs: Iterable[dict[str, Any]]) -> str:
+    """
+    Render log entries in the raw text format parse_text reads (used to produce
+    test and benchmark input).
+    """
+
+    lines = []
+    for log in logs:
+        messages = log.get("messages") or [""]
+        thread = f" {log['thread ID']}" if log.get("thread ID") else ""
+        lines.append(f"{log['timestamp']} <{log['level']}>{thread} {messages[0]}")
+        lines.extend(messages[1:])
+    return "\n".join(lines) + "\n"
+
+
+def find_chunk_boundaries(data: bytes | mmap.mmap, chunk_count: int) -> list[int]:
+    """
+    Split raw log bytes into about 'chunk_count' chunks that start on a record.
+
+    Each cut is moved forward from an even split point to the next header line, so
+    no record (or multi-line continuation) is split between chunks.
+
+    Args:
+        data (bytes | mmap): The file contents.
+        chunk_count (int): Number of chunks wanted.
+
+    Returns:
+        list[int]: Increasing offsets starting with 0 and ending with len(data);
+        chunk i is data[offsets[i]:offsets[i + 1]].
+    """
+
+    size = len(data)
+    boundaries = [0]
+    for i in range(1, max(1, chunk_count)):
+        target = max(size * i // chunk_count, boundaries[-1] + 1)
+        line_start = data.rfind(b"\n", 0, target) + 1
+        start = RECORD_START.search(data, line_start)
+        while start is not None and start.start() < target:
+            start = RECORD_START.search(data, start.end())
+        if start is None:
+            break
+        if start.start() > boundaries[-1]:
+            boundaries.append(start.start())
+    boundaries.append(size)
+    return boundaries
+
+
+def parse_chunk(path: str, start: int, end: int) -> tuple[list[dict[str, Any]], int]:
+    """
+    Parse bytes [start, end) of a log file, read through a memory map.
+
+    Runs inside a worker process, so it opens the file itself and everything it
+    returns must be picklable.
+    """
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        text = m[start:end].decode("utf-8", errors="replace")
+    return parse_text(text)
+
+
+def parse_log_file(
+    path: str, executor: Executor | None = None, chunk_count: int | None = None
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Parse a raw Webex/Spark log file into log entries.
+
+    The file is memory-mapped and split at record boundaries into chunks that are
+    parsed on 'executor' (typically a ProcessPoolExecutor) and concatenated in file
+    order. Without an executor, or for files smaller than PARALLEL_PARSE_MIN_BYTES,
+    the file is parsed in-process. Both paths return the same entries.
+
+    Args:
+        path (str): Path of the log file.
+        executor (Executor | None, optional): Pool to parse chunks on. Defaults to None.
+        chunk_count (int | None, optional): Number of chunks. Defaults to the CPU count.
+
+    Returns:
+        tuple[list[dict], int]: The log entries and the number of lines skipped
+        before the first record (see parse_text).
+    """
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return [], 0
+    if executor is None or size < PARALLEL_PARSE_MIN_BYTES:
+        return parse_chunk(path, 0, size)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        boundaries = find_chunk_boundaries(m, chunk_count or os.cpu_count() or 1)
+    futures = [
+        executor.submit(parse_chunk, path, start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+    logs: list[dict[str, Any]] = []
+    orphans = 0
+    for i, future in enumerate(futures):
+        chunk_logs, chunk_orphans = future.result()
+        logs.extend(chunk_logs)
+        # Only the first chunk can start before a record.
+        if i == 0:
+            orphans = chunk_orphans
+    return logs, orphans
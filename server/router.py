@@ -0,0 +1,182 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Labeled example queries per routing decision. A query that is clearly closer to
+# one side than the other is answered locally; everything else goes to the LLM.
+DEFAULT_EXEMPLARS: dict[str, dict[bool, list[str]]] = {
+    "summary": {
+        True: [
+            "Can you generate a summary for my logs?",
+            "Summarize these logs.",
+            "Give me an overview of what happened in this log file.",
+            "What is going on in these logs?",
+            "Describe the overall log activity.",
+        ],
+        False: [
+            "Filter for debug logs.",
+            "Show only errors.",
+            "Filter out info logs.",
+            "Highlight lines that contain timeout.",
+            "Add a filter for warnings.",
+        ],
+    },
+    "issues": {
+        True: [
+            "Can you look for potential issues in my logs?",
+            "Are there any problems in these logs?",
+            "Why did the call fail?",
+            "Detect known issues in this log.",
+            "What went wrong here?",
+        ],
+        False: [
+            "Can you filter for debug logs?",
+            "Generate me a summary.",
+            "Show only info logs.",
+            "Highlight thread 0x720.",
+            "Give me an overview of the logs.",
+        ],
+    },
+    "filter": {
+        True: [
+            "Can you filter for debug logs?",
+            "Show only errors.",
+            "Filter out debug logs.",
+            "Highlight lines matching this regex.",
+            "Only show warnings that mention media.",
+        ],
+        False: [
+            "Summarize these logs.",
+            "Give me an overview of what happened.",
+            "What is going on in these logs?",
+            "Describe the overall log activity.",
+        ],
+    },
+}
+
+
+def _normalize(vector: list[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class IntentRouter:
+    """
+    Answer yes/no routing decisions locally by comparing embeddings with labeled examples.
+
+    For a decision, the query is compared (cosine similarity) with the "yes" and "no"
+    examples. If the best match on one side is at least 'threshold' and beats the
+    best match on the other side by at least 'margin', that side is the answer.
+    Otherwise the router abstains and the caller should ask the LLM.
+
+    The examples are embedded on the first decision rather than at construction, so
+    creating a router never waits on the embedding model (or service). While they
+    can't be embedded, the router abstains.
+
+    Attributes:
+        threshold (float): Minimum similarity to the closest example.
+        margin (float): Minimum similarity gap between the two sides.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], list[list[float]]],
+        exemplars: dict[str, dict[bool, list[str]]] | None = None,
+        threshold: float = 0.8,
+        margin: float = 0.1,
+        cache_size: int = 128,
+    ):
+        """
+        Initialize the router (the examples are embedded on first use).
+
+        Args:
+            encode (Callable): Function embedding a list of texts into a list of vectors.
+            exemplars (dict | None, optional): Examples per decision, keyed by decision
+                name and then by answer. Defaults to DEFAULT_EXEMPLARS.
+            threshold (float, optional): Minimum similarity to the closest example. Defaults to 0.8.
+            margin (float, optional): Minimum similarity gap between the two sides. Defaults to 0.1.
+            cache_size (int, optional): Number of query embeddings to keep. Defaults to 128.
+        """
+
+        self.encode = encode
+        self.threshold = threshold
+        self.margin = margin
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._exemplar_texts = exemplars or DEFAULT_EXEMPLARS
+        self._exemplars: dict[str, dict[bool, list[tuple[str, list[float]]]]] | None = (
+            None
+        )
+
+    def _embedded_exemplars(
+        self,
+    ) -> dict[str, dict[bool, list[tuple[str, list[float]]]]]:
+        if self._exemplars is None:
+            embedded: dict[str, dict[bool, list[tuple[str, list[float]]]]] = {}
+            for decision, sides in self._exemplar_texts.items():
+                embedded[decision] = {}
+                for answer, texts in sides.items():
+                    vectors = [_normalize(list(v)) for v in self.encode(texts)]
+                    embedded[decision][answer] = list(zip(texts, vectors))
+            self._exemplars = embedded
+        return self._exemplars
+
+    def embed(self, text: str) -> list[float]:
+        """
+        Return the normalized embedding of a query, reusing recent ones.
+        """
+
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                return self._cache[text]
+        vector = _normalize(list(self.encode([text])[0]))
+        with self._lock:
+            self._cache[text] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def route(self, decision: str, message: str) -> tuple[bool, str] | None:
+        """
+        Try to answer a routing decision locally.
+
+        Args:
+            decision (str): Decision name, e.g. "summary", "issues" or "filter".
+            message (str): The user query.
+
+        Returns:
+            tuple[bool, str] | None: The decision and a brief explanation, or None if
+            the router is not confident (or knows no examples for the decision, or
+            embedding failed).
+        """
+
+        try:
+            sides = self._embedded_exemplars().get(decision)
+            if not sides or True not in sides or False not in sides:
+                return None
+            query = self.embed(message)
+        except Exception:
+            logger.warning("Routing '%s' locally failed; asking the LLM", decision)
+            return None
+        best: dict[bool, tuple[float, str]] = {}
+        for answer, examples in sides.items():
+            best[answer] = max(
+                ((_dot(query, vector), text) for text, vector in examples),
+                default=(-1.0, ""),
+            )
+
+        answer = best[True][0] >= best[False][0]
+        score, example = best[answer]
+        if score < self.threshold or score - best[not answer][0] < self.margin:
+            return None
+        return answer, f'Matched the example "{example}" (similarity {score:.2f}).'
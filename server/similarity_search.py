@@ -0,0 +1,415 @@
+import heapq
+import json
+import logging
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Iterable
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Dimension of the msmarco-MiniLM-L12-cos-v5 embeddings.
+EMBEDDING_DIMS = 384
+
+# Rank constant of reciprocal rank fusion (the value used by Elasticsearch's RRF).
+RRF_RANK_CONSTANT = 60
+
+# Indices searched per msearch request when fanning out over every log.
+MSEARCH_BATCH_INDICES = 64
+
+
+def index_mapping(title: str, description: str) -> dict[str, Any]:
+    """
+    Return the mapping of a log index: the fields used for filtering and lexical
+    search, the embedding vector and the log metadata in '_meta'.
+
+    Args:
+        title (str): Title metadata.
+        description (str): Description metadata.
+
+    Returns:
+        dict: The body for indices.create.
+    """
+
+    return {
+        "mappings": {
+            "_meta": {
+                "title": title,
+                "description": description,
+                "embeddings_ready": False,
+            },
+            "properties": {
+                "messages": {"type": "text"},
+                "level": {"type": "keyword"},
+                "thread ID": {"type": "keyword"},
+                # Rows with odd timestamps are still indexed, just not filterable.
+                "timestamp": {"type": "date", "ignore_malformed": True},
+                "embedding": {
+                    "type": "dense_vector",
+                    "dims": EMBEDDING_DIMS,
+                    "index": True,
+                    "similarity": "cosine",
+                },
+            },
+        }
+    }
+
+
+def build_filters(
+    levels: list[str] | None = None, start: str | None = None, end: str | None = None
+) -> list[dict[str, Any]]:
+    """
+    Build the filter clauses restricting a search to some levels and a time range.
+
+    Levels are matched with 'match' clauses, which are exact on the 'keyword' level
+    field of new indices and still work on the analyzed 'text' field that dynamic
+    mapping gave older ones.
+
+    Args:
+        levels (list[str] | None, optional): Levels to keep. Defaults to None (all).
+        start (str | None, optional): ISO 8601 start time (inclusive). Defaults to None.
+        end (str | None, optional): ISO 8601 end time (exclusive). Defaults to None.
+
+    Returns:
+        list[dict]: Filter clauses (empty when nothing is filtered).
+    """
+
+    filters: list[dict[str, Any]] = []
+    if levels:
+        filters.append(
+            {
+                "bool": {
+                    "should": [{"match": {"level": level}} for level in levels],
+                    "minimum_should_match": 1,
+                }
+            }
+        )
+    if start is not None or end is not None:
+        bounds = {}
+        if start is not None:
+            bounds["gte"] = start
+        if end is not None:
+            bounds["lt"] = end
+        filters.append({"range": {"timestamp": bounds}})
+    return filters
+
+
+def knn_clause(
+    query_vector: list[float],
+    k: int,
+    num_candidates: int,
+    filters: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """
+    Build a k-NN search clause. Filters are applied during the search, not after,
+    so 'k' hits are returned even when few documents pass the filters.
+    """
+
+    clause: dict[str, Any] = {
+        "field": "embedding",
+        "query_vector": query_vector,
+        "k": k,
+        "num_candidates": max(num_candidates, k),
+    }
+    if filters:
+        clause["filter"] = filters
+    return clause
+
+
+def lexical_query(
+    text: str, filters: list[dict[str, Any]] | None = None
+) -> dict[str, Any]:
+    """
+    Build a BM25 query for the text on the 'messages' field, with optional filters.
+    """
+
+    return {
+        "bool": {
+            "must": [{"match": {"messages": {"query": text}}}],
+            "filter": filters or [],
+        }
+    }
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[dict[str, Any]]],
+    size: int,
+    rank_constant: int = RRF_RANK_CONSTANT,
+) -> list[dict[str, Any]]:
+    """
+    Merge ranked hit lists with reciprocal rank fusion.
+
+    Each hit scores sum(1 / (rank_constant + rank)) over the lists it appears in
+    (ranks start at 1), so documents ranked well by both retrievers come first and
+    the retrievers' incomparable raw scores are never mixed.
+
+    Args:
+        rankings (list[list[dict]]): Elasticsearch hits of each retriever, best first.
+        size (int): Number of hits to return.
+        rank_constant (int, optional): Dampens the weight of top ranks. Defaults to 60.
+
+    Returns:
+        list[dict]: The fused hits with '_score' set to their RRF score, best first.
+    """
+
+    fused: dict[str, dict[str, Any]] = {}
+    for hits in rankings:
+        for rank, hit in enumerate(hits, start=1):
+            key = (hit.get("_index"), str(hit["_id"]))
+            entry = fused.setdefault(key, {**hit, "_score": 0.0})
+            entry["_score"] += 1 / (rank_constant + rank)
+    return sorted(fused.values(), key=lambda hit: hit["_score"], reverse=True)[:size]
+
+
+def search(
+    es: Any,
+    index: str,
+    text: str,
+    query_vector: list[float],
+    k: int,
+    num_candidates: int,
+    filters: list[dict[str, Any]] | None = None,
+    hybrid: bool = False,
+) -> list[dict[str, Any]]:
+    """
+    Run a filtered k-NN search, optionally fused with BM25 results.
+
+    Filters are applied inside the k-NN search, which also narrows the candidates
+    it has to score. With 'hybrid', a BM25 match on 'messages' runs as well and the
+    two rankings are merged with reciprocal rank fusion. This helps queries that name
+    exact identifiers (error codes, executables), which embeddings tend to blur.
+
+    Args:
+        es (Elasticsearch): The Elasticsearch client.
+        index (str): Index to search.
+        text (str): Query text (for BM25).
+        query_vector (list[float]): Query embedding.
+        k (int): Number of hits to return.
+        num_candidates (int): k-NN candidates per shard; also the depth of each
+            ranking when hybrid.
+        filters (list[dict] | None, optional): Clauses from build_filters. Defaults to None.
+        hybrid (bool, optional): Fuse k-NN with BM25 results. Defaults to False.
+
+    Returns:
+        list[dict]: The hits, best first, without the 'embedding' field.
+    """
+
+    candidates = max(num_candidates, k)
+    # Each ranking has to go deeper than k for the fusion to have something to merge.
+    depth = candidates if hybrid else k
+    with span("es_query", op="knn"):
+        response = es.search(
+            index=index,
+            knn=knn_clause(query_vector, depth, candidates, filters),
+            size=depth,
+            source_excludes=["embedding"],
+        )
+    lexical = None
+    if hybrid:
+        with span("es_query", op="bm25"):
+            lexical = es.search(
+                index=index,
+                query=lexical_query(text, filters),
+                size=depth,
+                source_excludes=["embedding"],
+            )
+    return _top_hits(response, lexical, k)
+
+
+def _top_hits(
+    knn_response: dict[str, Any], lexical_response: dict[str, Any] | None, k: int
+) -> list[dict[str, Any]]:
+    """
+    Return the top k hits of a k-NN response, fused with a BM25 response if given.
+    """
+
+    hits = knn_response.get("hits", {}).get("hits", [])
+    if lexical_response is not None:
+        hits = reciprocal_rank_fusion(
+            [hits, lexical_response.get("hits", {}).get("hits", [])], size=k
+        )
+    hits = hits[:k]
+    for hit in hits:
+        hit["_source"].pop("embedding", None)
+    return hits
+
+
+class CandidateCache:
+    """
+    LRU cache of the top hits of each index for recent searches.
+
+    Fanning a search out over every stored log costs a query per log, so the hits
+    of each (index, search) pair are kept and only indices that are new or changed
+    since are queried again. Entries are dropped per index when a log is uploaded,
+    re-embedded or deleted.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int, optional): Maximum (index, search) entries kept.
+                Defaults to 10000.
+        """
+
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], list[dict[str, Any]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, index: str, key: str) -> list[dict[str, Any]] | None:
+        """Return the cached hits of a search on an index, if any."""
+
+        with self._lock:
+            hits = self._entries.get((index, key))
+            if hits is None:
+                return None
+            self._entries.move_to_end((index, key))
+            return [dict(hit) for hit in hits]
+
+    def put(self, index: str, key: str, hits: list[dict[str, Any]]):
+        """Store the hits of a search on an index."""
+
+        with self._lock:
+            self._entries[(index, key)] = [dict(hit) for hit in hits]
+            self._entries.move_to_end((index, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, index: str | None = None):
+        """Drop the entries of an index (or every entry)."""
+
+        with self._lock:
+            if index is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == index]:
+                del self._entries[key]
+
+
+def search_indices(
+    es: Any,
+    indices: Iterable[str],
+    text: str,
+    query_vector: list[float],
+    k: int,
+    num_candidates: int,
+    filters: list[dict[str, Any]] | None = None,
+    hybrid: bool = False,
+    cache: CandidateCache | None = None,
+    versions: dict[str, Any] | None = None,
+    max_indices: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Run a search (see search()) on many indices and merge their top hits.
+
+    Each index contributes its own top hits of each retriever, so no log is crowded
+    out by a larger one. Indices without cached hits are queried together in msearch
+    requests of MSEARCH_BATCH_INDICES indices. The per-index k-NN lists are merged by
+    score into a global ranking (scores are comparable between indices: same model).
+    With 'hybrid', the BM25 lists are merged by score the same way (as Elasticsearch
+    merges shards, each with its own term statistics) and the two global rankings
+    are fused with reciprocal rank fusion; fusing per index would give the best hit
+    of every index the same score. Indices that fail to search (e.g. without
+    embeddings) are skipped.
+
+    Args:
+        es (Elasticsearch): The Elasticsearch client.
+        indices (Iterable[str]): Indices to search, most relevant first.
+        text (str): Query text (for BM25).
+        query_vector (list[float]): Query embedding.
+        k (int): Number of hits to return.
+        num_candidates (int): k-NN candidates per shard.
+        filters (list[dict] | None, optional): Clauses from build_filters. Defaults to None.
+        hybrid (bool, optional): Fuse k-NN with BM25 results. Defaults to False.
+        cache (CandidateCache | None, optional): Cache of per-index hits. Defaults to None.
+        versions (dict[str, Any] | None, optional): A version of each index (e.g. its
+            log store generation). Cached hits of another version are not used, so
+            indices changed by another process are searched again. Defaults to None.
+        max_indices (int | None, optional): Search only the first max_indices
+            indices, bounding the fan-out of a search that is not cached. Defaults
+            to None (all of them).
+
+    Returns:
+        list[dict]: The hits, best first, with '_index' naming their log.
+    """
+
+    candidates = max(num_candidates, k)
+    depth = candidates if hybrid else k
+    retrievers = ("knn", "bm25") if hybrid else ("knn",)
+    key = json.dumps(
+        [text, k, candidates, filters or [], hybrid], sort_keys=True, default=str
+    )
+    versions = versions or {}
+    indices = list(indices)
+    if max_indices is not None and len(indices) > max_indices:
+        logger.info("Searching %d of %d indices", max_indices, len(indices))
+        indices = indices[:max_indices]
+
+    def cache_key(index: str, retriever: str) -> str:
+        return f"{versions.get(index)}:{retriever}:{key}"
+
+    rankings: dict[str, list[list[dict[str, Any]]]] = {r: [] for r in retrievers}
+    pending = []
+    for index in indices:
+        cached = [
+            cache.get(index, cache_key(index, retriever)) if cache is not None else None
+            for retriever in retrievers
+        ]
+        if any(hits is None for hits in cached):
+            pending.append(index)
+            continue
+        for retriever, hits in zip(retrievers, cached):
+            rankings[retriever].append(hits)
+
+    source = {"excludes": ["embedding"]}
+    for start in range(0, len(pending), MSEARCH_BATCH_INDICES):
+        batch = pending[start : start + MSEARCH_BATCH_INDICES]
+        searches: list[dict[str, Any]] = []
+        for index in batch:
+            knn = knn_clause(query_vector, depth, candidates, filters)
+            searches += [
+                {"index": index},
+                {"knn": knn, "size": depth, "_source": source},
+            ]
+            if hybrid:
+                query = lexical_query(text, filters)
+                searches += [
+                    {"index": index},
+                    {"query": query, "size": depth, "_source": source},
+                ]
+        with span("es_query", op="msearch", indices=len(batch)):
+            responses = iter(es.msearch(searches=searches)["responses"])
+        for index in batch:
+            index_responses = [next(responses) for _ in retrievers]
+            failed = [response for response in index_responses if "error" in response]
+            if failed:
+                logger.warning("Skipping index %s: %s", index, failed[0]["error"])
+                continue
+            for retriever, response in zip(retrievers, index_responses):
+                hits = response.get("hits", {}).get("hits", [])[:depth]
+                for hit in hits:
+                    hit["_index"] = index
+                    hit["_source"].pop("embedding", None)
+                if cache is not None:
+                    cache.put(index, cache_key(index, retriever), hits)
+                rankings[retriever].append(hits)
+
+    merged = [
+        list(
+            islice(
+                heapq.merge(*lists, key=lambda hit: hit["_score"], reverse=True),
+                depth,
+            )
+        )
+        for lists in rankings.values()
+    ]
+    if hybrid:
+        return reciprocal_rank_fusion(merged, size=k)
+    return merged[0][:k]
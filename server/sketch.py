@@ -0,0 +1,205 @@
+import heapq
+import re
+from typing import Any, Iterable
+
+DEFAULT_SKETCH_CAPACITY = 1024
+
+# Tokens that carry no keyword signal on their own: punctuation runs, plain and
+# hex numbers, long hex IDs/UUIDs and file system paths.
+_NOISE_TOKEN = re.compile(
+    r"""^(?:
+        [\W_]+
+        | [-+]?\d+(?:\.\d+)?
+        | 0x[0-9a-fA-F]+
+        | [0-9a-fA-F-]{8,}
+        | .*[\\/].*[\\/].*
+    )$""",
+    re.VERBOSE,
+)
+
+
+def is_informative_token(token: str) -> bool:
+    """
+    Return False for tokens that look like numbers, hex IDs, UUIDs, paths or punctuation.
+
+    Args:
+        token (str): A whitespace-delimited token from a log message.
+
+    Returns:
+        bool: Whether the token is worth counting as a keyword.
+    """
+
+    return not _NOISE_TOKEN.match(token)
+
+
+# Variable parts of a log message: hex numbers, long hex IDs/UUIDs and digit runs.
+_VARIABLE_PART = re.compile(r"0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*|\d+")
+
+
+def log_template(message: str) -> str:
+    """
+    Reduce a log message to its template by masking numbers and IDs with '<*>'.
+
+    Args:
+        message (str): A log message.
+
+    Returns:
+        str: The message template, e.g. 'GetTrack vid=<*> cid=<*>'.
+    """
+
+    return _VARIABLE_PART.sub("<*>", message)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter sketch (Metwally et al.) with bounded memory.
+
+    At most 'capacity' items are tracked. When a new item arrives and the sketch is
+    full, the item with the smallest count is replaced and the new item inherits
+    that count as its error. Every reported count overestimates the true count by
+    at most its error, and any item occurring more than total / capacity times is
+    guaranteed to be tracked.
+
+    Attributes:
+        capacity (int): Maximum number of tracked items.
+        total (int): Total count of all items added.
+        counts (dict[str, int]): Estimated count per tracked item.
+        errors (dict[str, int]): Maximum overestimation per tracked item.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SKETCH_CAPACITY):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            capacity (int, optional): Maximum number of tracked items. Defaults to 1024.
+        """
+
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        # Min-heap of (count, item) with exactly one entry per tracked item. Entries
+        # may be stale (lower than the real count) and are fixed up lazily on eviction.
+        self._heap: list[tuple[int, str]] = []
+
+    def add(self, item: str, count: int = 1):
+        """
+        Add occurrences of an item to the sketch.
+
+        Args:
+            item (str): The item to count.
+            count (int, optional): Number of occurrences. Defaults to 1.
+        """
+
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+            return
+
+        floor, evicted = self._pop_min()
+        del counts[evicted]
+        del self.errors[evicted]
+        counts[item] = floor + count
+        self.errors[item] = floor
+        heapq.heappush(self._heap, (floor + count, item))
+
+    def update(self, items: Iterable[str]):
+        """
+        Add one occurrence of every item in an iterable.
+        """
+
+        for item in items:
+            self.add(item)
+
+    def _pop_min(self) -> tuple[int, str]:
+        """Pop the tracked item with the smallest current count."""
+
+        heap = self._heap
+        while True:
+            count, item = heapq.heappop(heap)
+            current = self.counts[item]
+            if current == count:
+                return count, item
+            heapq.heappush(heap, (current, item))
+
+    def min_count(self) -> int:
+        """
+        Return the count an untracked item may have had at most.
+
+        This is 0 while the sketch has never evicted anything.
+        """
+
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Combine two sketches into a new one (Agarwal et al. mergeable summaries).
+
+        An item missing from a full sketch is assumed to have that sketch's minimum
+        count there, which is added to both its count and its error. The merged
+        sketch keeps the largest 'capacity' items and the same error guarantees.
+
+        Args:
+            other (SpaceSaving): The sketch to merge with.
+
+        Returns:
+            SpaceSaving: A new sketch with the capacity of this one.
+        """
+
+        floor_self = self.min_count()
+        floor_other = other.min_count()
+        merged_counts: dict[str, int] = {}
+        merged_errors: dict[str, int] = {}
+        items = list(self.counts)
+        items.extend(item for item in other.counts if item not in self.counts)
+        for item in items:
+            merged_counts[item] = self.counts.get(item, floor_self)
+            merged_counts[item] += other.counts.get(item, floor_other)
+            merged_errors[item] = self.errors.get(item, floor_self)
+            merged_errors[item] += other.errors.get(item, floor_other)
+
+        merged = SpaceSaving(self.capacity)
+        merged.total = self.total + other.total
+        kept = heapq.nlargest(
+            self.capacity, merged_counts.items(), key=lambda entry: entry[1]
+        )
+        # Preserve first-seen order so ties rank the same way as in a serial pass.
+        kept_items = {item for item, _ in kept}
+        for item in merged_counts:
+            if item in kept_items:
+                merged.counts[item] = merged_counts[item]
+                merged.errors[item] = merged_errors[item]
+        merged._heap = [(count, item) for item, count in merged.counts.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def top_k(self, k: int) -> list[dict[str, Any]]:
+        """
+        Return the k items with the highest estimated counts.
+
+        Ties keep the order in which items were first tracked.
+
+        Args:
+            k (int): Number of items to return.
+
+        Returns:
+            list[dict]: Items as {"keyword": item, "count": estimate, "error": bound},
+            where the true count lies in [count - error, count].
+        """
+
+        top = heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1])
+        return [
+            {"keyword": item, "count": count, "error": self.errors[item]}
+            for item, count in top
+        ]
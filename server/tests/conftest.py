@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+from log_table import LogTable
+
+START = datetime(2024, 9, 30, 17, 0, 0, tzinfo=timezone.utc)
+
+
+def make_log(
+    timestamp: str | int,
+    level: str = "Info",
+    messages: Iterable[str] = ("message",),
+    thread: str = "[0x720]",
+) -> dict:
+    """Build a log entry; an integer timestamp is milliseconds after START."""
+
+    if isinstance(timestamp, int):
+        moment = START + timedelta(milliseconds=timestamp)
+        timestamp = moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return {
+        "timestamp": timestamp,
+        "level": level,
+        "thread ID": thread,
+        "messages": list(messages),
+    }
+
+
+def make_table(
+    messages: list[str | list[str]], levels: str | list[str] = "Info"
+) -> LogTable:
+    """Build a table with one row per message (or list of messages), a second apart."""
+
+    if isinstance(levels, str):
+        levels = [levels] * len(messages)
+    return LogTable.from_logs(
+        make_log(row * 1000, level, [message] if isinstance(message, str) else message)
+        for row, (message, level) in enumerate(zip(messages, levels))
+    )
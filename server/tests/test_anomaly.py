@@ -0,0 +1,60 @@
+from anomaly import LevelBurstDetector, detect_anomalies
+from utils import get_log_level_counts
+from tests.conftest import make_log
+
+
+def steady_logs_with_error_burst() -> list[dict]:
+    logs = []
+    for second in range(120):
+        for i in range(5):
+            logs.append(make_log(second * 1000 + i * 100, "Info", ["heartbeat ok"]))
+        if second == 90:
+            for i in range(12):
+                logs.append(
+                    make_log(
+                        second * 1000 + 500 + i * 10,
+                        "Error",
+                        [f"CMediaTrackMgr::GetTrack No Track! vid={i}"],
+                    )
+                )
+    return logs
+
+
+def test_detects_error_burst_with_templates():
+    logs = steady_logs_with_error_burst()
+
+    anomalies = detect_anomalies(get_log_level_counts(logs), logs)
+
+    assert len(anomalies) == 1
+    burst = anomalies[0]
+    assert burst["level"] == "Error"
+    assert burst["count"] == 12
+    assert burst["start"] == "2024-09-30T17:01:30.000Z"
+    assert burst["end"] == "2024-09-30T17:01:31.000Z"
+    assert burst["z_score"] >= 4
+    assert burst["top_templates"] == [
+        {"template": "CMediaTrackMgr::GetTrack No Track! vid=<*>", "count": 12}
+    ]
+
+
+def test_steady_traffic_has_no_anomalies():
+    logs = [make_log(second * 1000, "Info", ["heartbeat"]) for second in range(300)]
+
+    assert detect_anomalies(get_log_level_counts(logs), logs) == []
+
+
+def test_unsorted_logs_still_get_templates():
+    logs = steady_logs_with_error_burst()
+    logs.reverse()
+
+    anomalies = detect_anomalies(get_log_level_counts(logs), logs)
+
+    assert anomalies and anomalies[0]["top_templates"][0]["count"] == 12
+
+
+def test_detector_adapts_to_level_shift():
+    detector = LevelBurstDetector(alpha=0.5)
+    scores = [detector.score(10)[0] for _ in range(30)]
+
+    assert scores[0] > 4
+    assert abs(scores[-1]) < 1
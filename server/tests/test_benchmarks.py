@@ -0,0 +1,82 @@
+from collections import Counter
+from benchmarks.load_test import percentile, summarize
+from benchmarks.run_benchmarks import check_thresholds, run
+from benchmarks.synthetic_logs import generate_logs
+from utils import build_bulk_actions
+
+
+def test_generator_is_deterministic_and_ordered():
+    logs = generate_logs(2000, seed=7)
+
+    assert logs == generate_logs(2000, seed=7)
+    assert logs != generate_logs(2000, seed=8)
+    timestamps = [log["timestamp"] for log in logs]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[0] == "2024-09-30T17:32:28.734Z"
+    assert set(logs[0]) == {"timestamp", "level", "thread ID", "messages"}
+
+
+def test_generator_follows_level_mix_and_skew():
+    logs = generate_logs(5000, level_mix={"Info": 3, "Error": 1}, template_skew=2)
+
+    levels = Counter(log["level"] for log in logs)
+    assert set(levels) == {"Info", "Error"}
+    assert 0.2 < levels["Error"] / len(logs) < 0.3
+    templates = Counter(
+        log["messages"][0][:30] for log in logs if log["level"] == "Info"
+    )
+    assert templates.most_common(1)[0][1] > levels["Info"] / 2
+
+
+def test_run_and_thresholds():
+    results = run([500], repeat=1)
+
+    assert {r["benchmark"] for r in results} == {
+        "get_log_level_counts",
+        "compute_stats",
+        "extract_top_rows",
+        "get_simple_stats",
+        "build_bulk_actions",
+        "log_table_from_logs",
+        "get_log_level_counts_table",
+        "extract_top_rows_table",
+        "get_simple_stats_table",
+        "keyword_index_build",
+        "extract_top_rows_index",
+        "parse_raw_text",
+    }
+    assert check_thresholds(results, {}) == []
+    regressions = check_thresholds(results, {"compute_stats": {"max_us_per_row": -1}})
+    assert len(regressions) == 1 and regressions[0].startswith("compute_stats")
+
+
+def test_build_bulk_actions():
+    logs = [{"level": "Info"}, {"level": "Error"}]
+
+    assert build_bulk_actions(logs, "idx") == [
+        {"_index": "idx", "_id": 0, "_source": logs[0]},
+        {"_index": "idx", "_id": 1, "_source": logs[1]},
+    ]
+
+
+def test_load_report_percentiles():
+    samples = [
+        {"type": "chat", "ok": True, "latency_ms": float(ms), "ttfe_ms": ms / 10}
+        for ms in range(1, 101)
+    ]
+    samples.append({"type": "list", "ok": False, "latency_ms": 5.0})
+
+    report = summarize(samples, elapsed=10)
+
+    assert percentile([], 50) is None
+    assert report["throughput_per_s"] == 10.1
+    assert (report["chat"]["p50_ms"], report["chat"]["p99_ms"]) == (50.0, 99.0)
+    assert report["chat"]["ttfe_p95_ms"] == 9.5
+    assert report["list"] == {
+        "count": 1,
+        "errors": 1,
+        "throughput_per_s": 0.1,
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None,
+    }
@@ -0,0 +1,38 @@
+from chat_sessions import SessionStore
+
+
+def test_sessions_reuse_state_until_the_logs_change():
+    store = SessionStore()
+    session = store.get("conversation", "log-1", "fingerprint-a")
+    session.put("stats", "stats", {"level_stats": {"Error": 3}})
+    session.put("verdicts", ("v1", "any issues?"), "")
+    session.put("embeddings", "any issues?", [0.5, 0.5])
+
+    assert store.get("conversation", "log-1", "fingerprint-a") is session
+    assert session.get("verdicts", ("v1", "any issues?")) == ""
+    assert store.get("conversation", "log-2", "fingerprint-a") is not session
+
+    # New logs under the same key drop what was derived from the old ones.
+    assert store.get("conversation", "log-1", "fingerprint-b") is session
+    assert session.get("stats", "stats") is None
+    assert session.get("verdicts", ("v1", "any issues?")) is None
+    assert session.get("embeddings", "any issues?") == [0.5, 0.5]
+    assert session.nbytes == len("[0.5, 0.5]")
+
+
+def test_sessions_expire_and_are_evicted_over_the_limits():
+    store = SessionStore(ttl_seconds=60, max_sessions=2, max_bytes=100)
+    first = store.get("a", "log", "f")
+    store.get("b", "log", "f")
+    store.get("c", "log", "f").put("similar", "q", "x" * 50)
+    store.trim()
+    assert len(store) == 2 and store.get("a", "log", "f") is not first
+
+    # 52 + 62 bytes is over the limit: the least recently used session goes.
+    store.get("a", "log", "f").put("similar", "q", "x" * 60)
+    store.trim()
+    assert len(store) == 1 and store.get("a", "log", "f").nbytes == 62
+
+    store.get("a", "log", "f").last_used -= 61
+    assert store.get("e", "log", "f") is not None and len(store) == 1
+    assert store.drop("e") == 1 and len(store) == 0
@@ -0,0 +1,76 @@
+import gzip
+import pytest
+import codec
+from benchmarks.synthetic_logs import generate_logs
+from benchmarks.wire_formats import measure
+
+
+def test_negotiate_encoding():
+    assert codec.negotiate_encoding(None) is None
+    assert codec.negotiate_encoding("identity") is None
+    assert codec.negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert codec.negotiate_encoding("gzip;q=0, *;q=0.5") == (
+        "zstd" if codec.zstandard is not None else None
+    )
+    assert codec.negotiate_encoding("zstd;q=0.5, gzip") == "gzip"
+
+
+def test_negotiate_media_type():
+    assert codec.negotiate_media_type(None) == codec.JSON_MEDIA_TYPE
+    assert codec.negotiate_media_type("*/*") == codec.JSON_MEDIA_TYPE
+    assert codec.negotiate_media_type(
+        "application/msgpack, application/json;q=0.5"
+    ) == ("application/msgpack" if codec.msgpack is not None else "application/json")
+
+
+@pytest.mark.parametrize("encoding", codec.supported_encodings() + [None])
+@pytest.mark.parametrize("media_type", codec.supported_media_types())
+def test_round_trip(encoding, media_type):
+    logs = generate_logs(200, seed=3)
+
+    body = codec.compress(codec.encode_body(logs, media_type), encoding)
+    data = codec.decompress(body, encoding)
+
+    assert codec.decode_body(data, f"{media_type}; charset=utf-8") == logs
+
+
+def test_gzip_upload_body():
+    payload = {"logs": [{"messages": ["Naïve café"]}], "title": "t"}
+    body = gzip.compress(codec.dumps(payload))
+
+    assert codec.decode_body(codec.decompress(body, "gzip"), None) == payload
+
+
+def test_invalid_bodies():
+    with pytest.raises(ValueError):
+        codec.decompress(b"not gzip", "gzip")
+    with pytest.raises(ValueError):
+        codec.decompress(b"{}", "br")
+    with pytest.raises(ValueError):
+        codec.decode_body(b"{", "application/json")
+
+
+def test_dumps_falls_back_for_large_integers():
+    assert codec.loads(codec.dumps({"n": 2**70})) == {"n": 2**70}
+
+
+def test_measure_wire_formats():
+    rows = generate_logs(500, seed=1)
+
+    results = measure(rows, repeat=1)
+
+    by_key = {(r["format"], r["encoding"]): r for r in results}
+    assert by_key[("json", "identity")]["ratio"] == 1
+    assert by_key[("json", "gzip")]["bytes"] < by_key[("json", "identity")]["bytes"]
+
+
+def test_streaming_decompressor():
+    data = codec.dumps(generate_logs(300, seed=4))
+    body = gzip.compress(data)
+
+    decode = codec.decompressor("gzip")
+    chunks = [decode(body[i : i + 1000]) for i in range(0, len(body), 1000)]
+
+    assert b"".join(chunks) == data
+    with pytest.raises(ValueError):
+        codec.decompressor("br")
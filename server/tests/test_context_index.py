@@ -0,0 +1,96 @@
+from context_index import ContextIndex, keyword_context
+from log_table import LogTable
+from utils import extract_top_rows
+
+
+def make_logs(seconds, levels=None):
+    levels = levels or ["Info"] * len(seconds)
+    return [
+        {
+            "timestamp": f"2024-09-30T17:32:{second:02d}.000Z",
+            "level": level,
+            "thread ID": "[0x1]",
+            "messages": [f"line {i}"],
+        }
+        for i, (second, level) in enumerate(zip(seconds, levels))
+    ]
+
+
+def test_rows_around_clamps_to_the_table():
+    index = ContextIndex(LogTable.from_logs(make_logs(range(10))))
+
+    assert list(index.rows_around(5, 2, 1)) == [3, 4, 5, 6]
+    assert list(index.rows_around(0, 2, 2)) == [0, 1, 2]
+    assert list(index.rows_around(9, 1, 3)) == [8, 9]
+
+
+def test_rows_within_sorted_logs_uses_the_table_column():
+    table = LogTable.from_logs(make_logs([0, 1, 1, 2, 5, 6, 10]))
+    index = ContextIndex(table)
+
+    assert index._timestamps is table.timestamps
+    assert index.rows_within(3, 1) == [1, 2, 3]
+    assert index.rows_within(4, 1) == [4, 5]
+    assert index.rows_within(6, 0) == [6]
+
+
+def test_rows_within_unsorted_logs_and_unparsed_timestamps():
+    logs = make_logs([5, 1, 4, 2, 9, 3])
+    logs[2]["timestamp"] = "not a time"
+    index = ContextIndex(LogTable.from_logs(logs))
+
+    # Rows 1, 3 and 5 are at 1s, 2s and 3s; row 2 is never part of a time window.
+    assert index.rows_within(3, 1) == [1, 3, 5]
+    assert index.rows_within(0, 2) == [0, 5]
+    assert index.rows_within(2, 100) == [2]
+
+
+def test_windows_merge_overlaps_and_render_lines():
+    index = ContextIndex(LogTable.from_logs(make_logs(range(20))))
+
+    windows = index.windows([12, 3, 5], before=1, after=1)
+
+    assert [(w["rows"], w["hits"]) for w in windows] == [
+        ([2, 6], [3, 5]),
+        ([11, 13], [12]),
+    ]
+    assert windows[1]["lines"] == [
+        "2024-09-30T17:32:11.000Z <Info> [0x1] line 11",
+        "2024-09-30T17:32:12.000Z <Info> [0x1] line 12",
+        "2024-09-30T17:32:13.000Z <Info> [0x1] line 13",
+    ]
+
+
+def test_windows_of_out_of_order_logs_keep_every_row():
+    index = ContextIndex(LogTable.from_logs(make_logs([0, 40, 1, 40, 2, 41, 3])))
+
+    # Hit 0 spans rows 0 and 2, hit 1 rows 1, 3 and 5: one window with all of them.
+    (window,) = index.windows([0, 1], seconds=1.5)
+
+    assert window["rows"] == [0, 5] and window["hits"] == [0, 1]
+    assert [line.split()[-1] for line in window["lines"]] == ["0", "1", "2", "3", "5"]
+
+
+def test_windows_keep_rows_nearest_the_hits():
+    index = ContextIndex(LogTable.from_logs(make_logs(range(30))))
+
+    (window,) = index.windows([15], seconds=30, max_rows=5)
+
+    assert window["rows"] == [13, 17]
+    assert len(window["lines"]) == 5
+
+
+def test_keyword_context_matches_extract_top_rows():
+    levels = ["Info", "Error", "Info", "Warn", "Info", "Error", "Info"]
+    logs = make_logs(range(7), levels)
+    logs[4]["messages"] = ["line 4 mentions line 1"]
+    table = LogTable.from_logs(logs)
+    keywords = {"numbers": ["line 1", "line 5"], "none": ["missing"]}
+
+    extracted, context = keyword_context(
+        ContextIndex(table), keywords, before=1, after=1
+    )
+
+    assert extracted == extract_top_rows(table, keywords)
+    assert [w["hits"] for w in context["numbers"]] == [[1], [5]]
+    assert context["none"] == []
@@ -0,0 +1,136 @@
+import threading
+import time
+import pytest
+from embedding_jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    PRIORITY_BACKFILL,
+    PRIORITY_INTERACTIVE,
+    RUNNING,
+    EmbeddingJobQueue,
+    JobCancelled,
+)
+
+
+def test_priority_order_and_progress(tmp_path):
+    ran = []
+
+    def handler(job, progress):
+        ran.append(job["log_id"])
+        progress(5, 10)
+        progress(10, 10)
+
+    queue = EmbeddingJobQueue(str(tmp_path / "jobs.sqlite3"), handler)
+    queue.submit("backfill-1", priority=PRIORITY_BACKFILL)
+    queue.submit("backfill-2", priority=PRIORITY_BACKFILL)
+    queue.submit("upload", priority=PRIORITY_INTERACTIVE)
+
+    while queue.run_next():
+        pass
+
+    assert ran == ["upload", "backfill-1", "backfill-2"]
+    job = queue.latest("upload")
+    assert (job["status"], job["done"], job["total"]) == (DONE, 10, 10)
+
+
+def test_resubmit_and_cancel(tmp_path):
+    queue = EmbeddingJobQueue(str(tmp_path / "jobs.sqlite3"), lambda job, p: None)
+    first = queue.submit("log-1")
+    second = queue.submit("log-1")
+
+    assert queue.get(first["id"])["status"] == CANCELLED
+    assert queue.cancel("log-1") == 1
+    assert queue.get(second["id"])["status"] == CANCELLED
+    assert queue.run_next() is False
+
+
+def test_cancel_stops_running_job(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def handler(job, progress):
+        for done in range(0, 100, 10):
+            progress(done, 100)
+            batches.append(done)
+            started.set()
+            release.wait(5)
+
+    queue = EmbeddingJobQueue(str(tmp_path / "jobs.sqlite3"), handler)
+    queue.submit("log-1")
+    queue.start()
+    try:
+        assert started.wait(5)
+        queue.cancel("log-1")
+        release.set()
+    finally:
+        queue.stop(timeout=5)
+
+    assert batches == [0]
+    assert queue.latest("log-1")["status"] == CANCELLED
+
+
+def test_failures_and_restart_recovery(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+
+    def fail(job, progress):
+        raise RuntimeError("boom")
+
+    queue = EmbeddingJobQueue(path, fail)
+    failed = queue.submit("bad")
+    queue.run_next()
+    assert queue.get(failed["id"])["status"] == FAILED
+    assert queue.get(failed["id"])["error"] == "boom"
+
+    # A job left running by a crashed server is claimed again once its lease expires.
+    pending = queue.submit("log-1")
+    assert queue._claim_next()["id"] == pending["id"]
+    restarted = EmbeddingJobQueue(path, lambda job, p: None, lease_seconds=0.05)
+    assert restarted._claim_next() is None
+    time.sleep(0.1)
+    assert restarted._claim_next()["owner"] == restarted.owner
+    with pytest.raises(JobCancelled, match="taken over"):
+        queue._progress(pending["id"])(1, 2)
+
+
+def test_queues_sharing_a_database(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = EmbeddingJobQueue(path, lambda job, p: None)
+    job = first.submit("log-1")
+    assert first._claim_next()["id"] == job["id"]
+    progress = first._progress(job["id"])
+
+    # Another worker starting up leaves the running job alone and can't claim it.
+    second = EmbeddingJobQueue(path, lambda job, p: None)
+    assert second.get(job["id"])["status"] == RUNNING
+    assert second._claim_next() is None
+    progress(1, 2)
+
+    # Concurrent dispatchers claim each queued job exactly once.
+    for i in range(20):
+        first.submit(f"log-{i + 2}")
+    claims = {first.owner: [], second.owner: []}
+
+    def drain(queue):
+        while (claimed := queue._claim_next()) is not None:
+            claims[queue.owner].append(claimed["id"])
+
+    threads = [threading.Thread(target=drain, args=(q,)) for q in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    claimed = claims[first.owner] + claims[second.owner]
+    assert sorted(claimed) == sorted(set(claimed)) and len(claimed) == 20
+
+
+def test_progress_raises_after_cancel(tmp_path):
+    queue = EmbeddingJobQueue(str(tmp_path / "jobs.sqlite3"), lambda job, p: None)
+    job = queue.submit("log-1")
+    queue._claim_next()
+    progress = queue._progress(job["id"])
+    progress(1, 2)
+    queue.cancel("log-1")
+
+    with pytest.raises(JobCancelled):
+        progress(2, 2)
@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from embedding_service import EmbeddingClient, EmbeddingServer, parse_address
+
+
+def fake_encode(calls):
+    def encode(texts):
+        calls.append(len(texts))
+        if "fail" in texts:
+            raise ValueError("cannot embed")
+        return [[float(len(text)), 0.5] for text in texts]
+
+    return encode
+
+
+@pytest.fixture
+def service(tmp_path):
+    calls = []
+    server = EmbeddingServer(
+        fake_encode(calls), str(tmp_path / "emb.sock"), max_wait=0.05
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, calls
+    server.close()
+
+
+def test_parse_address():
+    assert parse_address("/tmp/emb.sock") == "/tmp/emb.sock"
+    assert parse_address("localhost:7000") == ("localhost", 7000)
+    assert parse_address(":7000") == ("127.0.0.1", 7000)
+
+
+def test_encode_round_trip_and_errors(service):
+    server, _ = service
+    client = EmbeddingClient(server.address)
+
+    assert client.encode(["a", "abc"]) == [[1.0, 0.5], [3.0, 0.5]]
+    assert client.encode([]) == []
+    with pytest.raises(RuntimeError, match="cannot embed"):
+        client.encode(["fail"])
+    assert client.encode(["ab"]) == [[2.0, 0.5]]
+
+
+def test_concurrent_requests_share_batches(service):
+    server, calls = service
+    client = EmbeddingClient(server.address)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda i: client.encode(["x" * i]), range(1, 17)))
+
+    assert results == [[[float(i), 0.5]] for i in range(1, 17)]
+    assert sum(calls) == 16
+    assert len(calls) < 16
+
+
+def test_refuses_to_replace_a_running_service(service):
+    server, _ = service
+
+    with pytest.raises(RuntimeError):
+        EmbeddingServer(fake_encode([]), server.address)
+
+
+def test_timeout_is_not_retried(tmp_path):
+    calls = []
+    release = threading.Event()
+
+    def slow_encode(texts):
+        calls.append(len(texts))
+        release.wait(5)
+        return [[0.0] for _ in texts]
+
+    server = EmbeddingServer(slow_encode, str(tmp_path / "slow.sock"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = EmbeddingClient(server.address, timeout=0.2)
+        with pytest.raises(TimeoutError):
+            client.encode(["a"])
+        release.set()
+        # A resent request would be encoded right after the first one.
+        time.sleep(0.3)
+        assert calls == [1]
+    finally:
+        server.close()
+
+
+def test_tcp_requires_an_authkey(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_SERVICE_AUTHKEY", raising=False)
+    with pytest.raises(ValueError):
+        EmbeddingServer(fake_encode([]), "127.0.0.1:0")
+    with pytest.raises(ValueError):
+        EmbeddingClient("127.0.0.1:7000")
+
+    monkeypatch.setenv("EMBEDDING_SERVICE_AUTHKEY", "secret")
+    server = EmbeddingServer(fake_encode([]), "127.0.0.1:0")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.address
+        assert EmbeddingClient(f"{host}:{port}").encode(["ab"]) == [[2.0, 0.5]]
+    finally:
+        server.close()
@@ -0,0 +1,47 @@
+import time
+import pytest
+from agent import ChatAgent, PLAN_SCHEMA
+from model_client.fake_model import FakeModelClient
+
+LOGS = [
+    {
+        "timestamp": "2024-09-30T17:32:28.734Z",
+        "level": "Error",
+        "thread ID": "[0x720]",
+        "messages": ["CMediaTrackMgr::GetTrack No Track! vid=1"],
+    }
+]
+
+
+@pytest.mark.asyncio
+async def test_canned_responses_follow_agent_formats():
+    model = FakeModelClient(latency=0, tokens_per_second=1e9)
+    agent = ChatAgent(model, "base")
+
+    assert await agent.evaluate_decision("are there problems") == (
+        True,
+        "canned decision",
+    )
+    filter_group = await agent.generate_filter_group("show errors", {})
+    assert filter_group["filters"][0]["text"] == "error"
+    issue = await agent.evaluate_issue("Issue", {"logs": LOGS}, "why", [])
+    assert issue.startswith("**Issue Summary**")
+
+    decisions = await agent.plan("summarize", LOGS)
+    assert decisions["summary"] == (True, "canned response")
+    assert agent.routes["summary"] == "planner"
+    assert model.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_delay_scales_with_response_tokens():
+    model = FakeModelClient(latency=0.05, tokens_per_second=400, responses=[])
+    model.default_response = "x" * 80  # 20 tokens -> 0.05 s of generation
+
+    start = time.perf_counter()
+    await model.chat_completion("prompt")
+    assert 0.09 <= time.perf_counter() - start < 0.5
+
+    assert set(await model.structured_completion("p", PLAN_SCHEMA)) == set(
+        PLAN_SCHEMA["properties"]
+    )
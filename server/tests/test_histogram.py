@@ -0,0 +1,97 @@
+import pytest
+from histogram import LevelPyramid, parse_timestamp, to_epoch_us
+from utils import compute_stats
+from tests.conftest import make_log
+
+
+@pytest.fixture
+def logs():
+    return [
+        make_log("2024-09-30T17:32:28.734Z", "Info"),
+        make_log("2024-09-30T17:32:28.900Z", "Error"),
+        make_log("2024-09-30T17:32:39.100Z", "Warn"),
+        make_log("2024-09-30T17:33:05.000Z", "Info"),
+        make_log("2024-09-30T18:05:00.000Z", "Debug"),
+    ]
+
+
+def epoch(timestamp: str) -> int:
+    return int(parse_timestamp(timestamp).timestamp())
+
+
+def test_rollups_preserve_totals(logs):
+    pyramid = LevelPyramid.from_logs(logs)
+
+    for resolution in pyramid.resolutions:
+        total = sum(sum(row) for row in pyramid.counts[resolution])
+        assert total == len(logs)
+
+    assert len(pyramid.starts[1]) == 4
+    assert len(pyramid.starts[10]) == 4
+    assert len(pyramid.starts[60]) == 3
+    assert len(pyramid.starts[3600]) == 2
+
+
+def test_query_range_and_budget(logs):
+    pyramid = LevelPyramid.from_logs(logs)
+
+    result = pyramid.query(
+        epoch("2024-09-30T17:32:00Z"), epoch("2024-09-30T17:33:00Z"), max_buckets=10
+    )
+    assert result["resolution"] == 1
+    assert result["buckets"] == [
+        {
+            "bucket": "2024-09-30T17:32:28Z",
+            "Debug": 0,
+            "Info": 1,
+            "Warn": 0,
+            "Error": 1,
+        },
+        {
+            "bucket": "2024-09-30T17:32:39Z",
+            "Debug": 0,
+            "Info": 0,
+            "Warn": 1,
+            "Error": 0,
+        },
+    ]
+
+    assert pyramid.pick_resolution(max_buckets=3) == 60
+    assert pyramid.pick_resolution(max_buckets=1) == 3600
+    coarse = pyramid.query(max_buckets=2)
+    assert coarse["resolution"] == 600
+    assert [b["Info"] for b in coarse["buckets"]] == [2, 0]
+
+
+def test_forced_resolution(logs):
+    pyramid = LevelPyramid.from_logs(logs)
+
+    assert pyramid.query(resolution=600)["resolution"] == 600
+    with pytest.raises(ValueError):
+        pyramid.query(resolution=5)
+
+
+def test_level_counts_feed_compute_stats(logs):
+    pyramid = LevelPyramid.from_logs(logs)
+
+    stats = compute_stats(pyramid.level_counts(60))
+    assert stats["overall_total"] == len(logs)
+    assert stats["count_intervals"] == 3
+    assert stats["max_total"]["count"] == 3
+
+
+def test_timestamps_without_offset_are_utc(logs):
+    assert to_epoch_us("2024-09-30T17:32:28.734") == to_epoch_us(
+        "2024-09-30T17:32:28.734Z"
+    )
+    assert to_epoch_us("2024-09-30T19:32:28+02:00") == to_epoch_us(
+        "2024-09-30T17:32:28Z"
+    )
+
+    naive = [{**log, "timestamp": log["timestamp"][:-1]} for log in logs]
+    assert LevelPyramid.from_logs(naive).starts == LevelPyramid.from_logs(logs).starts
+
+
+def test_rejects_non_nested_resolutions(logs):
+    with pytest.raises(ValueError):
+        LevelPyramid.from_logs(logs, resolutions=(1, 15, 20))
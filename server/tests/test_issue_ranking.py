@@ -0,0 +1,48 @@
+from issue_ranking import rank_issues, score_issue
+from known_issues import CompiledIssue
+
+
+def make_issue(name, keywords, embedding=None):
+    return CompiledIssue(
+        name, {"description": name, "keywords": keywords}, embedding=embedding
+    )
+
+
+def test_score_combines_keyword_coverage_and_similarity():
+    issue = make_issue("vbg", {"a": ["x"], "b": ["y"], "empty": []}, [1.0, 0.0])
+    extracted = {"a": [{"messages": ["x"]}, {"messages": ["x"]}], "b": []}
+
+    score = score_issue(issue, extracted, [1.0, 1.0], keyword_weight=0.5)
+
+    assert score["keyword_hits"] == 2
+    assert score["categories_hit"] == 1
+    assert score["similarity"] == round(2**-0.5, 4)
+    assert score["score"] == round(0.5 * 0.5 + 0.5 * 2**-0.5, 4)
+    # Without embeddings only the keywords count.
+    assert score_issue(issue, extracted)["score"] == 0.25
+
+
+def test_rank_keeps_top_k_above_threshold():
+    issues = {
+        "hit": make_issue("hit", {"a": ["x"]}),
+        "similar": make_issue("similar", {"a": ["z"]}, [0.0, 1.0]),
+        "unrelated": make_issue("unrelated", {"a": ["z"]}, [1.0, 0.0]),
+        "partial": make_issue("partial", {"a": ["x"], "b": ["z"]}),
+    }
+    extracted = {
+        "hit": {"a": [{"messages": ["x"]}]},
+        "partial": {"a": [{"messages": ["x"]}], "b": []},
+    }
+
+    kept, skipped = rank_issues(
+        issues, extracted, [0.0, 1.0], top_k=2, min_score=0.2, keyword_weight=0.5
+    )
+
+    assert [s["issue"] for s in kept] == ["hit", "similar"]
+    assert [(s["issue"], s["reason"]) for s in skipped] == [
+        ("partial", "top_k"),
+        ("unrelated", "below_threshold"),
+    ]
+
+    kept, skipped = rank_issues(issues, extracted, top_k=0)
+    assert len(kept) == 4 and skipped == []
@@ -0,0 +1,93 @@
+import random
+from benchmarks.synthetic_logs import generate_logs
+from keyword_index import KeywordIndex
+from log_table import LogTable
+from utils import extract_top_rows
+from tests.conftest import make_table
+
+
+def test_keyword_positions_match_substring_semantics():
+    table = make_table(
+        [
+            ["failed to launch wmlhost.exe"],
+            ["launcher started", "wmlhost is fine"],
+            ["relaunch wmlhost.exe"],
+            ["café: launch"],
+            [],
+            ["to launch"],
+        ]
+    )
+    index = KeywordIndex(table)
+
+    for keyword in [
+        "launch",
+        "aunc",
+        "to launch",
+        "o launch wml",
+        "launch wmlhost.exe",
+        "wmlhost.ex",
+        ".exe",
+        "é: la",
+        "é",
+        "started wmlhost",
+        "missing",
+        "",
+    ]:
+        assert index.find_rows(keyword) == table.find_rows(keyword), keyword
+
+
+def test_find_rows_matches_table_scan_on_synthetic_logs():
+    table = LogTable.from_logs(generate_logs(3000, seed=3))
+    index = KeywordIndex(table)
+    rng = random.Random(0)
+    keywords = ["No Track!", "GetProxyInfo", "0x", "HeartBeat", "fdNew", "e", "zzz"]
+    for _ in range(40):
+        # Random cuts through real messages exercise partial terms at both ends.
+        message = table.messages(rng.randrange(len(table)))[0]
+        start = rng.randrange(len(message))
+        keywords.append(message[start : start + rng.randrange(1, 30)])
+
+    for keyword in keywords:
+        for levels in (None, ("Error", "Warn"), ("Debug",)):
+            expected = table.find_rows(keyword, levels=levels)
+            assert index.find_rows(keyword, levels=levels) == expected, keyword
+            assert index.find_rows(keyword, levels=levels, limit=3) == expected[:3]
+
+
+def test_find_all_is_a_conjunction_over_messages():
+    table = make_table(
+        [
+            ["disk full", "retrying write"],
+            ["disk full"],
+            ["write failed: disk full"],
+            ["retrying"],
+        ],
+        levels=["Error", "Error", "Warn", "Error"],
+    )
+    index = KeywordIndex(table)
+
+    assert index.find_all(["disk full", "write"]) == [0, 2]
+    assert index.find_all(["disk full", "write"], levels=["Error"]) == [0]
+    assert index.find_all(["full retrying"]) == []
+    assert index.find_all(["disk"], levels=["Fatal"]) == []
+
+
+def test_report_sizes_and_build_time():
+    table = LogTable.from_logs(generate_logs(2000, seed=1))
+    index = KeywordIndex(table)
+
+    report = index.report()
+
+    assert report["rows"] == 2000
+    assert report["terms"] == len(index) > 0
+    assert 0 < report["index_bytes"] < report["table_bytes"]
+    assert report["build_ms"] >= 0
+
+
+def test_extract_top_rows_accepts_the_index():
+    table = LogTable.from_logs(generate_logs(2000, seed=2))
+    keywords = {"media": ["No Track!", "wmlhost"], "none": ["missing"]}
+
+    assert extract_top_rows(KeywordIndex(table), keywords) == extract_top_rows(
+        table, keywords
+    )
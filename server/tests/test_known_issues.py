@@ -0,0 +1,103 @@
+import pytest
+from context_index import ContextIndex
+from keyword_index import KeywordIndex
+from known_issues import CompiledIssue, KnownIssueRegistry, log_fingerprint
+from tests.conftest import make_table
+
+ISSUE = {
+    "description": "Virtual background is blurry",
+    "context": "wmlhost.exe fails to launch",
+    "keywords": {"wmlhost": ["wmlhost.exe", " wmlhost.exe ", ""], "error": ["1260"]},
+    "conditions": None,
+    "resolution": "Allow wmlhost.exe in the group policy.",
+}
+
+
+def test_compiled_issue_normalizes_keywords_and_versions_details():
+    issue = CompiledIssue("vbg", ISSUE)
+
+    assert issue.keywords == {"wmlhost": ("wmlhost.exe",), "error": ("1260",)}
+    assert issue.version == CompiledIssue("other name", dict(ISSUE)).version
+    assert issue.version != CompiledIssue("vbg", {**ISSUE, "context": "x"}).version
+    with pytest.raises(ValueError):
+        CompiledIssue("bad", {"keywords": {"a": "not a list"}})
+
+    table = make_table(["start", "failed to launch wmlhost.exe", "error 1260"], "Error")
+    extracted, context = issue.match(ContextIndex(table), before=1, after=0)
+    assert [row["messages"] for row in extracted["wmlhost"]] == [
+        ["failed to launch wmlhost.exe"]
+    ]
+    assert [w["hits"] for w in context["error"]] == [[2]]
+    assert issue.match(
+        ContextIndex(table), before=1, after=0, keyword_index=KeywordIndex(table)
+    ) == (extracted, context)
+
+
+def test_registry_crud_versions_and_persistence(tmp_path):
+    path = str(tmp_path / "issues.sqlite3")
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    registry = KnownIssueRegistry(path, embed=embed)
+    empty_version = registry.version
+    issue = registry.put("vbg", ISSUE)
+    assert registry.version != empty_version
+    assert issue.embedding == [float(len(issue.text)), 1.0]
+
+    # Changing only the resolution keeps the embedding of the description/context.
+    updated = registry.put("vbg", {**ISSUE, "resolution": "Reboot."})
+    assert updated.version != issue.version
+    assert len(embedded) == 1 and updated.embedding == issue.embedding
+
+    assert registry.resolve({"vbg": None}) == {"vbg": updated}
+    assert registry.resolve({"vbg": updated.version})["vbg"] is updated
+    with pytest.raises(ValueError):
+        registry.resolve({"vbg": issue.version})
+    with pytest.raises(KeyError):
+        registry.resolve({"missing": None})
+
+    version = registry.version
+    registry.close()
+    reopened = KnownIssueRegistry(path)
+    assert reopened.version == version
+    assert reopened.get("vbg").embedding == updated.embedding
+    assert reopened.delete("vbg") and not reopened.delete("vbg")
+    assert reopened.version == empty_version
+
+
+def test_log_fingerprint_identifies_identical_logs():
+    table = make_table(["a", "b"])
+
+    assert log_fingerprint(table) == log_fingerprint(make_table(["a", "b"]))
+    assert log_fingerprint(table) != log_fingerprint(make_table(["a", "c"]))
+    assert log_fingerprint(table) != log_fingerprint(table[:1])
+
+
+def test_registries_sharing_a_database_see_each_others_changes(tmp_path):
+    path = str(tmp_path / "issues.sqlite3")
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+    first = KnownIssueRegistry(path)
+    second = KnownIssueRegistry(path, embed=embed)
+    stored = first.put("vbg", ISSUE)
+    assert stored.embedding is None
+
+    assert second.resolve({"vbg": stored.version})["vbg"].version == stored.version
+    assert second.version == first.version
+
+    # The embedding computed by one process is stored for the others.
+    assert second.embedding(second.get("vbg")) == [1.0, 0.0]
+    assert first.get("vbg").embedding == [1.0, 0.0]
+    assert len(embedded) == 1
+
+    updated = first.put("vbg", {**ISSUE, "resolution": "Reboot."})
+    assert second.get("vbg").version == updated.version
+    first.delete("vbg")
+    assert second.get("vbg") is None and len(second) == 0
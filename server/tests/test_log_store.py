@@ -0,0 +1,86 @@
+import pytest
+from benchmarks.synthetic_logs import generate_logs
+from log_store import LogStore
+from log_table import LogTable
+from utils import compute_log_stats, get_log_level_counts
+
+
+@pytest.fixture
+def logs():
+    logs = generate_logs(2000, seed=11)
+    logs[7]["timestamp"] = "2024-09-30T19:32:28.736+02:00"
+    logs[8]["extra"] = {"source": "agent"}
+    return logs
+
+
+def test_round_trip_through_memory_maps(tmp_path, logs):
+    store = LogStore(str(tmp_path))
+    store.write("log-1", logs)
+
+    table = LogStore(str(tmp_path)).open("log-1")
+
+    assert isinstance(table.timestamps, memoryview)
+    assert table.to_dicts() == logs
+    assert table[500:510].to_dicts() == logs[500:510]
+    assert get_log_level_counts(table) == get_log_level_counts(logs)
+    assert compute_log_stats(table) == compute_log_stats(logs)
+    with pytest.raises(TypeError):
+        table.append(logs[0])
+
+
+def test_filter_rows(tmp_path, logs):
+    store = LogStore(str(tmp_path))
+    store.write("log-1", logs)
+    table = store.open("log-1")
+    start_us = table.timestamps[100]
+    end_us = table.timestamps[200]
+
+    rows = table.filter_rows(levels=["Warn", "Error"], start_us=start_us, end_us=end_us)
+
+    assert rows == [
+        i
+        for i in range(100, 200)
+        if logs[i]["level"] in ("Warn", "Error") and table.timestamps[i] < end_us
+    ]
+
+
+def test_rewrite_and_delete(tmp_path, logs):
+    store = LogStore(str(tmp_path))
+    store.write("log-1", logs)
+    old = store.open("log-1")
+
+    store.write("log-1", logs[:10])
+    assert len(store.open("log-1")) == 10
+    # Tables opened before the rewrite keep reading the old files.
+    assert old.to_dicts()[:3] == logs[:3]
+
+    store.delete("log-1")
+    assert store.open("log-1") is None and not store.exists("log-1")
+    store.delete("log-1")
+
+
+def test_stores_sharing_a_directory_see_each_others_writes(tmp_path, logs):
+    writer = LogStore(str(tmp_path))
+    reader = LogStore(str(tmp_path))
+    writer.write("log-1", logs)
+    assert len(reader.open("log-1")) == len(logs)
+    generation = reader.generation("log-1")
+    assert reader.modified("log-1") > 0
+
+    writer.write("log-1", logs[:10])
+    assert reader.generation("log-1") != generation
+    assert reader.open("log-1").to_dicts() == logs[:10]
+
+    writer.delete("log-1")
+    assert reader.open("log-1") is None and reader.generation("log-1") is None
+    assert reader.modified("log-1") is None
+
+
+def test_empty_log_and_invalid_ids(tmp_path):
+    store = LogStore(str(tmp_path))
+    store.write("empty", [])
+
+    assert len(store.open("empty")) == 0
+    assert LogTable.from_logs(store.open("empty")).to_dicts() == []
+    with pytest.raises(ValueError):
+        store.open("../outside")
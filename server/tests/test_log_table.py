@@ -0,0 +1,81 @@
+import pickle
+import pytest
+from benchmarks.synthetic_logs import generate_logs
+from log_table import LogTable
+from parallel_stats import compute_log_stats_sharded
+from utils import (
+    compute_log_stats,
+    extract_top_rows,
+    get_log_level_counts,
+    get_simple_stats,
+)
+
+KEYWORDS = {"media": ["No Track!", "wmlhost.exe"], "none": ["not in any log"]}
+
+
+@pytest.fixture(scope="module")
+def logs():
+    logs = generate_logs(3000, level_mix={"Info": 6, "Warn": 2, "Error": 2}, seed=5)
+    logs[3]["messages"] = ["first", "second message ünïcode"]
+    logs[4]["timestamp"] = "2024-09-30T19:32:28.736+02:00"
+    logs[5]["extra"] = {"source": "agent"}
+    del logs[6]["thread ID"]
+    return logs
+
+
+def test_rows_read_back_exactly(logs):
+    table = LogTable.from_logs(logs)
+
+    assert len(table) == len(logs)
+    assert table.to_dicts() == logs
+    assert table[3] == logs[3]
+    assert table[-1]["messages"] == logs[-1]["messages"]
+    assert "thread ID" not in table[6] and table[6].get("thread ID") is None
+    assert table[1:4].to_dicts() == logs[1:4]
+    assert table[::500].to_dicts() == logs[::500]
+    assert pickle.loads(pickle.dumps(table[2:8])).to_dicts() == logs[2:8]
+
+
+def test_utils_accept_tables(logs):
+    table = LogTable.from_logs(logs)
+
+    assert get_log_level_counts(table) == get_log_level_counts(logs)
+    assert extract_top_rows(table, KEYWORDS) == extract_top_rows(logs, KEYWORDS)
+    assert get_simple_stats(table) == get_simple_stats(logs)
+    assert compute_log_stats(table) == compute_log_stats(logs)
+    assert compute_log_stats_sharded(
+        table, keywords=KEYWORDS, shard_count=4
+    ) == compute_log_stats_sharded(logs, keywords=KEYWORDS, shard_count=4)
+
+
+def test_find_rows_respects_message_boundaries():
+    table = LogTable.from_logs(
+        [
+            {
+                "timestamp": "2024-09-30T17:32:28.734Z",
+                "level": "Error",
+                "messages": ["ab", "cd"],
+            },
+            {
+                "timestamp": "2024-09-30T17:32:28.735Z",
+                "level": "Info",
+                "messages": ["abcd"],
+            },
+            {
+                "timestamp": "2024-09-30T17:32:28.736Z",
+                "level": "Warn",
+                "messages": ["xbc", "bc"],
+            },
+        ]
+    )
+
+    assert table.find_rows("bc") == [1, 2]
+    assert table.find_rows("bc", levels=["Error", "Warn"]) == [2]
+    assert table.find_rows("", limit=2) == [0, 1]
+
+
+def test_memory_report(logs):
+    report = LogTable.from_logs(logs).memory_report(logs)
+
+    assert report["rows"] == len(logs)
+    assert report["ratio"] > 2
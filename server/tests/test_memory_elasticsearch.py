@@ -0,0 +1,83 @@
+from elasticsearch.helpers import bulk
+from memory_elasticsearch import InMemoryElasticsearch
+from utils import build_bulk_actions
+
+
+def make_client() -> InMemoryElasticsearch:
+    es = InMemoryElasticsearch()
+    es.indices.create(
+        index="logs",
+        body={"mappings": {"_meta": {"title": "Logs", "embeddings_ready": False}}},
+    )
+    return es
+
+
+def test_bulk_and_scroll_return_every_document():
+    es = make_client()
+    logs = [{"level": "Info", "messages": [f"line {i}"]} for i in range(25)]
+
+    bulk(es, build_bulk_actions(logs, "logs"), raise_on_error=True)
+
+    resp = es.search(
+        index="logs", body={"query": {"match_all": {}}}, scroll="2m", size=10
+    )
+    scroll_id = resp["_scroll_id"]
+    sources = [hit["_source"] for hit in resp["hits"]["hits"]]
+    while True:
+        resp = es.scroll(scroll_id=scroll_id, scroll="2m")
+        if not resp["hits"]["hits"]:
+            break
+        sources.extend(hit["_source"] for hit in resp["hits"]["hits"])
+    es.clear_scroll(scroll_id=scroll_id)
+
+    assert sources == logs
+    assert es.cat.indices(index="*", format="json")[0]["docs.count"] == "25"
+
+
+def test_meta_updates_and_knn():
+    es = make_client()
+    docs = [
+        {"messages": ["a"], "embedding": [1.0, 0.0]},
+        {"messages": ["b"], "embedding": [0.6, 0.8]},
+        {"messages": ["c"], "embedding": [0.0, 1.0]},
+    ]
+    bulk(es, build_bulk_actions(docs, "logs"))
+    es.indices.put_mapping(
+        index="logs", meta={"title": "Logs", "embeddings_ready": True}
+    )
+
+    meta = es.indices.get_mapping(index="*")["logs"]["mappings"]["_meta"]
+    assert meta["embeddings_ready"] is True
+
+    resp = es.search(
+        index="logs",
+        knn={"field": "embedding", "query_vector": [0.0, 2.0], "k": 2},
+        size=2,
+    )
+    assert [hit["_source"]["messages"] for hit in resp["hits"]["hits"]] == [
+        ["c"],
+        ["b"],
+    ]
+
+    es.delete_by_query(index="logs", body={"query": {"match_all": {}}})
+    assert es.search(index="logs", size=10)["hits"]["hits"] == []
+    es.indices.delete(index="logs")
+    assert not es.indices.exists(index="logs")
+
+
+def test_bulk_updates_existing_documents_only():
+    es = make_client()
+    bulk(es, build_bulk_actions([{"messages": ["a"]}], "logs"))
+
+    actions = [
+        {"_op_type": "update", "_index": index, "_id": doc_id, "doc": {"n": 1}}
+        for index, doc_id in [("logs", 0), ("logs", 1), ("deleted", 0)]
+    ]
+    ok, errors = bulk(es, actions, raise_on_error=False)
+
+    assert ok == 1 and len(errors) == 2
+    assert es.search(index="logs")["hits"]["hits"][0]["_source"] == {
+        "messages": ["a"],
+        "n": 1,
+    }
+    assert not es.indices.exists(index="deleted")
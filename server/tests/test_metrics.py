@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+import pytest
+from metrics import MetricsRegistry, current_trace, record_tokens, span, start_trace
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.describe("requests_total", "counter", "Requests.")
+    registry.inc("requests_total", route="/table")
+    registry.inc("requests_total", 2, route="/table")
+    registry.observe("latency_seconds", 0.3, buckets=(0.1, 0.5), stage="plan")
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/table"} 3' in text
+    assert 'latency_seconds_bucket{stage="plan",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{stage="plan",le="0.5"} 1' in text
+    assert 'latency_seconds_bucket{stage="plan",le="+Inf"} 1' in text
+    assert 'latency_seconds_sum{stage="plan"} 0.3' in text
+    assert 'latency_seconds_count{stage="plan"} 1' in text
+
+
+def test_spans_are_recorded_in_the_current_trace():
+    def handle_request():
+        trace = start_trace()
+        with span("plan", route="llm") as attrs:
+            record_tokens(attrs, "test-model", 12, 3)
+        with span("plan"):
+            pass
+        return trace
+
+    trace = contextvars.copy_context().run(handle_request)
+
+    assert [s["name"] for s in trace.spans] == ["plan", "plan"]
+    first = trace.spans[0]
+    assert first["route"] == "llm"
+    assert (first["prompt_tokens"], first["completion_tokens"]) == (12, 3)
+    assert trace.server_timing().startswith("plan;dur=")
+    assert 'desc="2 call(s)"' in trace.server_timing()
+    assert current_trace() is None
+
+
+@pytest.mark.asyncio
+async def test_spans_from_threads_and_tasks_join_the_trace():
+    async def handle_request():
+        trace = start_trace()
+
+        def work():
+            with span("stats"):
+                pass
+
+        await asyncio.to_thread(work)
+        await asyncio.create_task(asyncio.to_thread(work))
+        return trace
+
+    trace = await asyncio.create_task(handle_request())
+
+    assert [s["name"] for s in trace.spans] == ["stats", "stats"]
@@ -0,0 +1,46 @@
+import asyncio
+import time
+import pytest
+from metrics import REGISTRY, monitor_event_loop_lag, span, start_trace
+from offload import run_blocking
+
+
+@pytest.mark.asyncio
+async def test_run_blocking_keeps_the_trace_and_errors():
+    async def handle_request():
+        trace = start_trace()
+
+        def work(rows, scale=1):
+            with span("stats", rows=rows):
+                return rows * scale
+
+        assert await run_blocking(work, 3, scale=2) == 6
+        return trace
+
+    trace = await asyncio.create_task(handle_request())
+
+    assert [(s["name"], s["rows"]) for s in trace.spans] == [("stats", 3)]
+    with pytest.raises(ZeroDivisionError):
+        await run_blocking(lambda: 1 / 0)
+
+
+@pytest.mark.asyncio
+async def test_offloaded_work_does_not_lag_the_loop():
+    monitor = asyncio.create_task(monitor_event_loop_lag(0.01))
+    try:
+        await asyncio.sleep(0.05)
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                ticks.append(time.perf_counter() - start)
+
+        # time.sleep stands in for a blocking stage; offloaded, the loop keeps ticking.
+        await asyncio.gather(run_blocking(time.sleep, 0.2), ticker())
+    finally:
+        monitor.cancel()
+
+    assert max(ticks) < 0.15
+    assert "log_viewer_event_loop_lag_seconds_count" in REGISTRY.render()
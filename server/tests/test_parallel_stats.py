@@ -0,0 +1,62 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import pytest
+import parallel_stats
+from parallel_stats import compute_log_stats_sharded, split_into_shards
+from utils import compute_log_stats, extract_top_rows, to_json_safe
+
+KEYWORDS = {"media": ["GetTrack", "No Track!"], "video": ["vid=1"]}
+
+
+@pytest.fixture
+def logs():
+    rng = random.Random(3)
+    start = datetime(2024, 9, 30, 17, 32, 28, 734000, tzinfo=timezone.utc)
+    templates = [
+        "CMediaTrackMgr::GetTrack No Track! vid=1",
+        "RootLogger Adding blocklisted string",
+        "MediaMain::mediaMain heartbeat",
+        "WME session state changed",
+    ]
+    logs = []
+    for i in range(3000):
+        timestamp = start + timedelta(milliseconds=i * 37)
+        logs.append(
+            {
+                "timestamp": timestamp.isoformat().replace("+00:00", "Z"),
+                "level": rng.choice(["Debug", "Info", "Info", "Warn", "Error"]),
+                "thread ID": "[0x720]",
+                "messages": [rng.choice(templates)],
+            }
+        )
+    return logs
+
+
+def test_split_into_shards_is_contiguous(logs):
+    shards = split_into_shards(logs, 7)
+
+    assert len(shards) == 7
+    assert [log for shard in shards for log in shard] == logs
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+    assert split_into_shards([], 4) == [[]]
+
+
+def test_sharded_matches_serial(logs, monkeypatch):
+    monkeypatch.setattr(parallel_stats, "SHARDED_STATS_MIN_ROWS", 0)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        sharded = compute_log_stats_sharded(
+            logs, keywords=KEYWORDS, executor=executor, shard_count=5
+        )
+
+    extracted = sharded.pop("extracted")
+    assert to_json_safe(sharded) == compute_log_stats(logs)
+    assert extracted == extract_top_rows(logs, KEYWORDS)
+
+
+def test_small_logs_run_in_process(logs):
+    result = compute_log_stats_sharded(logs[:10], executor=None)
+
+    assert to_json_safe(result) == compute_log_stats(logs[:10])
+    assert "extracted" not in result
@@ -0,0 +1,84 @@
+import json
+import pytest
+from agent import ChatAgent
+from model_client.model_client import ModelClient
+
+
+class ScriptedModel(ModelClient):
+    def __init__(self, responses: list[str]):
+        self.responses = list(responses)
+        self.prompts: list[str] = []
+
+    async def chat_completion(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+LOGS = [
+    {
+        "timestamp": "2024-09-30T17:32:28.734Z",
+        "level": "Error",
+        "thread ID": "[0x720]",
+        "messages": ["CMediaTrackMgr::GetTrack No Track! vid=1"],
+    }
+]
+
+
+@pytest.mark.asyncio
+async def test_plan_uses_a_single_structured_call():
+    plan = {
+        "generate_summary": {"decision": False, "explanation": "specific query"},
+        "evaluate_issues": {"decision": True, "explanation": "asks for problems"},
+        "add_filter": {"decision": True, "explanation": "wants errors only"},
+    }
+    model = ScriptedModel(["```json\n" + json.dumps(plan) + "\n```"])
+    agent = ChatAgent(model, "base")
+
+    decisions = await agent.plan("show problems as errors only", LOGS)
+
+    assert decisions == {
+        "summary": (False, "specific query"),
+        "issues": (True, "asks for problems"),
+        "filter": (True, "wants errors only"),
+    }
+    assert agent.routes == {
+        "summary": "planner",
+        "issues": "planner",
+        "filter": "planner",
+    }
+    assert len(model.prompts) == 1
+    assert "Log Statistics" in model.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_plan_falls_back_to_single_prompts_for_missing_decisions():
+    plan = {"generate_summary": {"decision": True, "explanation": "overview"}}
+    model = ScriptedModel(
+        [json.dumps(plan), "no: not about issues", "yes: mentions a keyword"]
+    )
+    agent = ChatAgent(model, "base")
+
+    decisions = await agent.plan("summarize and highlight vid=1", LOGS)
+
+    assert decisions == {
+        "summary": (True, "overview"),
+        "issues": (False, "not about issues"),
+        "filter": (True, "mentions a keyword"),
+    }
+    assert agent.routes["summary"] == "planner"
+    assert agent.routes["issues"] == "llm"
+    assert len(model.prompts) == 3
+
+
+@pytest.mark.asyncio
+async def test_plan_survives_unparseable_response():
+    model = ScriptedModel(["not json", "yes: a", "no: b", "no: c"])
+    agent = ChatAgent(model, "base")
+
+    decisions = await agent.plan("hello", LOGS)
+
+    assert decisions == {
+        "summary": (True, "a"),
+        "issues": (False, "b"),
+        "filter": (False, "c"),
+    }
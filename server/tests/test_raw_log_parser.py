@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+import raw_log_parser
+from benchmarks.synthetic_logs import generate_logs
+from raw_log_parser import (
+    find_chunk_boundaries,
+    format_logs,
+    parse_log_file,
+    parse_text,
+)
+
+RAW = """started by launcher
+2024-09-30T17:32:28.734Z <Info> [0x720] []spark-media-external.cpp:159 MediaMain::mediaMain:: started
+2024-09-30T17:32:28.800Z <Warning> [0x1cd0] Call failed:
+   at wmlhost.exe
+   at MediaProcess
+
+2024-09-30 17:32:29.001 <ERROR> no thread here\r
+"""
+
+
+def test_parse_text_headers_and_continuations():
+    logs, skipped = parse_text(RAW)
+
+    assert skipped == 1
+    assert logs == [
+        {
+            "timestamp": "2024-09-30T17:32:28.734Z",
+            "level": "Info",
+            "thread ID": "[0x720]",
+            "messages": [
+                "[]spark-media-external.cpp:159 MediaMain::mediaMain:: started"
+            ],
+        },
+        {
+            "timestamp": "2024-09-30T17:32:28.800Z",
+            "level": "Warn",
+            "thread ID": "[0x1cd0]",
+            "messages": ["Call failed:", "   at wmlhost.exe", "   at MediaProcess"],
+        },
+        {
+            "timestamp": "2024-09-30T17:32:29.001",
+            "level": "Error",
+            "messages": ["no thread here"],
+        },
+    ]
+
+
+def test_bare_header_has_an_empty_first_message():
+    logs, _ = parse_text(
+        "2024-09-30T17:32:28.734Z <Info> [0x720]\n"
+        "2024-09-30T17:32:28.800Z <Info> [0x720] \n"
+        "   at wmlhost.exe\n"
+    )
+
+    assert [log["messages"] for log in logs] == [[""], ["", "   at wmlhost.exe"]]
+
+
+def test_chunk_boundaries_start_on_records():
+    data = format_logs(generate_logs(300, seed=2)).encode()
+
+    boundaries = find_chunk_boundaries(data, 7)
+
+    assert boundaries[0] == 0 and boundaries[-1] == len(data)
+    assert boundaries == sorted(set(boundaries))
+    for offset in boundaries[1:-1]:
+        assert raw_log_parser.RECORD_START.match(data, offset)
+        assert data[offset - 1 : offset] == b"\n"
+
+
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    logs = generate_logs(3000, seed=5)
+    logs[10]["messages"] = ["Exception:", "  frame 1", "  frame 2"]
+    path = tmp_path / "current_log.txt"
+    path.write_text("preamble\n" + format_logs(logs))
+    monkeypatch.setattr(raw_log_parser, "PARALLEL_PARSE_MIN_BYTES", 0)
+
+    with ThreadPoolExecutor(4) as executor:
+        parallel = parse_log_file(str(path), executor=executor, chunk_count=8)
+
+    assert parallel == parse_log_file(str(path)) == (logs, 1)
@@ -0,0 +1,116 @@
+import re
+import pytest
+from agent import ChatAgent
+from model_client.model_client import ModelClient
+from router import IntentRouter
+
+VOCABULARY = [
+    "summary",
+    "summarize",
+    "overview",
+    "filter",
+    "show",
+    "only",
+    "errors",
+    "debug",
+    "issues",
+    "problems",
+    "wrong",
+]
+
+
+def bag_of_words(texts: list[str]) -> list[list[float]]:
+    vectors = []
+    for text in texts:
+        words = re.findall(r"[a-z]+", text.lower())
+        vectors.append([float(words.count(word)) for word in VOCABULARY] + [0.1])
+    return vectors
+
+
+EXEMPLARS = {
+    "summary": {
+        True: ["summarize", "summary overview"],
+        False: ["filter debug", "show only errors"],
+    },
+    "filter": {
+        True: ["filter debug", "show only errors"],
+        False: ["summarize", "summary overview"],
+    },
+}
+
+
+class RecordingModel(ModelClient):
+    def __init__(self, response: str):
+        self.response = response
+        self.prompts: list[str] = []
+
+    async def chat_completion(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return self.response
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(bag_of_words, EXEMPLARS, threshold=0.7, margin=0.1)
+
+
+def test_confident_routes(router: IntentRouter):
+    decision, explanation = router.route("summary", "Please summarize")
+    assert decision is True
+    assert "summarize" in explanation
+
+    assert router.route("summary", "filter for debug logs")[0] is False
+    assert router.route("filter", "show only errors")[0] is True
+
+
+def test_abstains_when_uncertain(router: IntentRouter):
+    assert router.route("summary", "what time is it") is None
+    assert router.route("summary", "summary filter") is None
+    assert router.route("issues", "are there problems") is None
+
+
+@pytest.mark.asyncio
+async def test_agent_skips_llm_for_confident_decisions(router: IntentRouter):
+    model = RecordingModel("yes: llm decided")
+    agent = ChatAgent(model, "base", router=router)
+
+    decision, _ = await agent.decide_summary("filter for debug logs", [])
+    assert decision is False
+    assert agent.routes["summary"] == "local"
+    assert model.prompts == []
+
+    decision, explanation = await agent.evaluate_decision("are there problems")
+    assert (decision, explanation) == (True, "llm decided")
+    assert agent.routes["issues"] == "llm"
+    assert len(model.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_local_no_filter_defers_to_llm_when_issues_detected(
+    router: IntentRouter,
+):
+    model = RecordingModel("yes: issues have keywords")
+    agent = ChatAgent(model, "base", router=router)
+
+    decision, _ = await agent.decide_filter("summarize", {"Issue": {"keywords": {}}})
+    assert decision is True
+    assert agent.routes["filter"] == "llm"
+
+    decision, _ = await agent.decide_filter("summarize", {})
+    assert decision is False
+    assert agent.routes["filter"] == "local"
+
+
+def test_embeds_examples_lazily_and_abstains_when_encoding_fails():
+    available = False
+
+    def encode(texts):
+        if not available:
+            raise FileNotFoundError("embedding service is not up")
+        return bag_of_words(texts)
+
+    router = IntentRouter(encode, EXEMPLARS, threshold=0.5, margin=0.1)
+    assert router.route("summary", "Please summarize") is None
+
+    available = True
+    assert router.route("summary", "Please summarize")[0] is True
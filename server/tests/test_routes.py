@@ -0,0 +1,173 @@
+import gzip
+import importlib
+import json
+import os
+import sys
+import pytest
+
+ROUTE_ENV = {
+    "EMBEDDING_WORKERS": "0",
+    "ROUTER_ENABLED": "false",
+    "ES_BACKEND": "memory",
+}
+# Files of the app, created in a temporary directory. The embedding service is never
+# reached: no job runs without the startup hooks.
+ROUTE_PATHS = {
+    "EMBEDDING_SERVICE": "embedding.sock",
+    "LOG_STORE_DIR": "log_store",
+    "EMBEDDING_JOBS_DB": "embedding_jobs.sqlite3",
+    "KNOWN_ISSUES_DB": "known_issues.sqlite3",
+}
+
+LOGS = [
+    {
+        "timestamp": f"2024-09-30T17:32:{i:02d}.000Z",
+        "level": "Error" if i % 3 == 0 else "Info",
+        "thread ID": "[0x1]",
+        "messages": [f"message {i}", "continued"],
+    }
+    for i in range(40)
+]
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    pytest.importorskip("dotenv")
+    testclient = pytest.importorskip("fastapi.testclient")
+    directory = tmp_path_factory.mktemp("routes")
+    env = {
+        **ROUTE_ENV,
+        **{name: str(directory / path) for name, path in ROUTE_PATHS.items()},
+    }
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    sys.modules.pop("main", None)
+    try:
+        main = importlib.import_module("main")
+        # No context manager: the startup hooks (job dispatcher) don't run.
+        yield testclient.TestClient(main.app)
+    finally:
+        sys.modules.pop("main", None)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def test_table_round_trip(client):
+    response = client.post("/table/routes", json={"logs": LOGS, "title": "Routes"})
+    assert response.status_code == 200, response.text
+    assert response.json()["total_logs"] == len(LOGS)
+
+    response = client.get("/table/routes", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200, response.text
+    assert response.json() == LOGS
+
+    response = client.get("/table/routes", params={"levels": "Error", "limit": 2})
+    assert response.json() == [LOGS[0], LOGS[3]]
+
+
+def test_table_round_trip_compressed(client):
+    body = gzip.compress(json.dumps({"logs": LOGS}).encode())
+    response = client.post(
+        "/table/routes-gzip",
+        content=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get("/table/routes-gzip", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == LOGS
+
+    response = client.post("/table/routes-gzip", json={"logs": "not a list"})
+    assert response.status_code == 400
+    response = client.post("/table/routes-gzip", json=[])
+    assert response.status_code == 400
+
+    response = client.post(
+        "/table/routes-gzip",
+        content=b"not gzip",
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 400
+
+
+def test_histogram_reads_timestamps_without_offset_as_utc(client):
+    client.post("/table/routes-histogram", json={"logs": LOGS})
+
+    response = client.get(
+        "/table/routes-histogram/histogram",
+        params={"start": "2024-09-30T17:32:10", "end": "2024-09-30T17:32:20"},
+    )
+
+    assert response.status_code == 200, response.text
+    buckets = response.json()["buckets"]
+    assert [bucket["bucket"] for bucket in buckets] == [
+        f"2024-09-30T17:32:{second}Z" for second in range(10, 20)
+    ]
+
+
+@pytest.fixture
+def main(client, monkeypatch):
+    main = sys.modules["main"]
+    monkeypatch.setattr(main, "EMBEDDING_BATCH_ROWS", 10)
+    monkeypatch.setattr(
+        main, "embed_messages", lambda messages: [[0.0] * 384 for _ in messages]
+    )
+    return main
+
+
+def interrupt_after_first_batch(action):
+    def progress(done, total):
+        if done == 10 and not progress.interrupted:
+            progress.interrupted = True
+            action()
+
+    progress.interrupted = False
+    return progress
+
+
+def test_deleting_a_log_stops_its_embedding_job(client, main):
+    client.post("/table/routes-delete", json={"logs": LOGS})
+    delete = interrupt_after_first_batch(lambda: client.delete("/table/routes-delete"))
+
+    with pytest.raises(main.JobCancelled):
+        main.update_embeddings_for_logs("routes-delete", delete)
+
+    assert "routes-delete" not in [entry["id"] for entry in client.get("/table").json()]
+
+
+def test_reuploading_a_log_stops_its_embedding_job(client, main):
+    client.post("/table/routes-reupload", json={"logs": LOGS})
+    reupload = interrupt_after_first_batch(
+        lambda: client.post("/table/routes-reupload", json={"logs": LOGS[:15]})
+    )
+
+    with pytest.raises(main.JobCancelled):
+        main.update_embeddings_for_logs("routes-reupload", reupload)
+
+    hits = main.get_es_client().search(index="routes-reupload", size=100)["hits"]
+    assert sorted(hit["_source"]["messages"][0] for hit in hits["hits"]) == sorted(
+        log["messages"][0] for log in LOGS[:15]
+    )
+    assert all("embedding" not in hit["_source"] for hit in hits["hits"])
+    entry = next(e for e in client.get("/table").json() if e["id"] == "routes-reupload")
+    assert not entry["embeddings_ready"]
+
+
+def test_raw_log_with_a_bare_header_gets_embeddings(client, monkeypatch):
+    main = sys.modules["main"]
+    monkeypatch.setattr(main, "encode_texts", lambda texts: [[0.0] * 384] * len(texts))
+    raw = (
+        "2024-09-30T17:32:28.734Z <Info> [0x720]\n2024-09-30T17:32:29.000Z <Error> x\n"
+    )
+
+    response = client.post("/table/routes-raw/raw", content=raw.encode())
+    assert response.status_code == 200, response.text
+    main.update_embeddings_for_logs("routes-raw")
+
+    entry = next(e for e in client.get("/table").json() if e["id"] == "routes-raw")
+    assert entry["embeddings_ready"]
+    assert client.get("/table/routes-raw").json()[0]["messages"] == [""]
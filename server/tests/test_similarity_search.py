@@ -0,0 +1,159 @@
+from elasticsearch.helpers import bulk
+from benchmarks.search_quality import build_index, evaluate, hashing_embedder
+from benchmarks.synthetic_logs import generate_logs
+from memory_elasticsearch import InMemoryElasticsearch
+from similarity_search import (
+    build_filters,
+    index_mapping,
+    CandidateCache,
+    reciprocal_rank_fusion,
+    search,
+    search_indices,
+)
+from utils import build_bulk_actions
+
+
+def hit(doc_id):
+    return {"_id": doc_id, "_score": 1.0, "_source": {"id": doc_id}}
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion(
+        [[hit("a"), hit("b"), hit("c")], [hit("c"), hit("d"), hit("a")]], size=3
+    )
+
+    assert [h["_id"] for h in fused] == ["a", "c", "b"]
+    assert fused[0]["_score"] == 1 / 61 + 1 / 63
+
+
+def test_build_filters():
+    assert build_filters() == []
+    levels, time_range = build_filters(["Warn"], start="2024-09-30T17:32:29Z")
+    assert levels["bool"]["should"] == [{"match": {"level": "Warn"}}]
+    assert time_range == {"range": {"timestamp": {"gte": "2024-09-30T17:32:29Z"}}}
+
+
+def make_index(es=None, index="logs"):
+    es = es or InMemoryElasticsearch()
+    embed = hashing_embedder(32)
+    logs = [
+        {
+            "timestamp": f"2024-09-30T17:32:{second:02d}.000Z",
+            "level": level,
+            "messages": [message],
+        }
+        for second, (level, message) in enumerate(
+            [
+                ("Info", "media process started"),
+                ("Error", "failed to launch wmlhost.exe error=1260"),
+                ("Info", "media process failed to report stats"),
+                ("Warn", "launch of helper delayed"),
+                ("Error", "media process crashed"),
+            ]
+        )
+    ]
+    docs = [
+        {**log, "embedding": vector}
+        for log, vector in zip(logs, embed([log["messages"][0] for log in logs]))
+    ]
+    es.indices.create(index=index, body=index_mapping("t", "d"))
+    bulk(es, build_bulk_actions(docs, index))
+    return es, embed
+
+
+def test_filtered_and_hybrid_search():
+    es, embed = make_index()
+    query = "media process failed"
+    vector = embed([query])[0]
+
+    hits = search(es, "logs", query, vector, k=5, num_candidates=10)
+    assert len(hits) == 5
+    assert "embedding" not in hits[0]["_source"]
+
+    errors = search(es, "logs", query, vector, 5, 10, filters=build_filters(["Error"]))
+    assert {h["_source"]["level"] for h in errors} == {"Error"}
+    assert len(errors) == 2
+
+    late = search(
+        es,
+        "logs",
+        query,
+        vector,
+        5,
+        10,
+        filters=build_filters(start="2024-09-30T17:32:02Z", end="2024-09-30T17:32:04Z"),
+    )
+    assert sorted(h["_id"] for h in late) == ["2", "3"]
+
+    hybrid = search(es, "logs", "wmlhost.exe 1260", embed(["x"])[0], 1, 10, hybrid=True)
+    assert hybrid[0]["_id"] == "1"
+
+
+def test_search_quality_benchmark():
+    es = InMemoryElasticsearch()
+    embed = hashing_embedder()
+    build_index(es, generate_logs(400, seed=3), embed)
+
+    results = {r["configuration"]: r for r in evaluate(es, embed, 5, 20)}
+
+    assert set(results) == {"knn", "knn_filtered", "bm25", "hybrid", "hybrid_filtered"}
+    assert results["knn_filtered"]["precision_at_k"] >= results["knn"]["precision_at_k"]
+
+
+def test_search_indices_merges_and_caches_per_index_hits():
+    es, embed = make_index(index="capture-a")
+    make_index(es, index="capture-b")
+    query = "media process crashed"
+    vector = embed([query])[0]
+    calls = []
+    msearch = es.msearch
+    es.msearch = lambda **kwargs: calls.append(kwargs) or msearch(**kwargs)
+    cache = CandidateCache()
+
+    indices = ["capture-a", "capture-b", "missing"]
+    hits = search_indices(es, indices, query, vector, 3, 10, cache=cache)
+
+    assert len(calls) == 1
+    assert [h["_source"]["messages"] for h in hits[:2]] == [[query], [query]]
+    assert {h["_index"] for h in hits[:2]} == {"capture-a", "capture-b"}
+    scores = [h["_score"] for h in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert len(cache) == 2
+
+    assert search_indices(es, indices[:2], query, vector, 3, 10, cache=cache) == hits
+    assert len(calls) == 1
+
+    cache.invalidate("capture-b")
+    search_indices(es, indices[:2], query, vector, 3, 10, cache=cache)
+    assert len(calls) == 2 and len(calls[1]["searches"]) == 2
+
+    # An index changed by another process has a new version and is searched again.
+    versions = {"capture-a": "2"}
+    search_indices(
+        es, indices[:2], query, vector, 3, 10, cache=cache, versions=versions
+    )
+    assert len(calls) == 3 and calls[2]["searches"][0] == {"index": "capture-a"}
+
+
+def test_search_indices_fuses_hybrid_rankings_across_indices():
+    es, embed = make_index(index="capture-a")
+    log = {
+        "timestamp": "2024-09-30T17:32:00.000Z",
+        "level": "Info",
+        "messages": ["process restarted"],
+        "embedding": embed(["process restarted"])[0],
+    }
+    es.indices.create(index="capture-b", body=index_mapping("t", "d"))
+    bulk(es, build_bulk_actions([log], "capture-b"))
+    query = "media process crashed"
+
+    hits = search_indices(
+        es, ["capture-a", "capture-b"], query, embed([query])[0], 3, 10, hybrid=True
+    )
+
+    # The weak best hit of capture-b doesn't rank with the best of capture-a.
+    assert [h["_index"] for h in hits] == ["capture-a"] * 3
+    assert hits[0]["_source"]["messages"] == [query]
+    assert search_indices(
+        es, ["capture-a", "capture-b"], query, embed([query])[0], 3, 10, max_indices=1
+    ) == search(es, "capture-a", query, embed([query])[0], 3, 10)
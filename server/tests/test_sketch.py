@@ -0,0 +1,89 @@
+import json
+import random
+from collections import Counter
+from sketch import SpaceSaving, is_informative_token
+from utils import get_simple_stats, get_top_keywords
+
+
+def zipf_stream(n: int, vocabulary: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return rng.choices([f"w{i}" for i in range(vocabulary)], weights, k=n)
+
+
+def test_exact_when_capacity_covers_vocabulary():
+    stream = ["a", "b", "a", "c", "b", "a"]
+    sketch = SpaceSaving(capacity=10)
+    sketch.update(stream)
+
+    assert sketch.top_k(2) == [
+        {"keyword": "a", "count": 3, "error": 0},
+        {"keyword": "b", "count": 2, "error": 0},
+    ]
+
+
+def test_error_bounds_hold_with_small_capacity():
+    stream = zipf_stream(20000, 2000)
+    exact = Counter(stream)
+    sketch = SpaceSaving(capacity=50)
+    sketch.update(stream)
+
+    assert len(sketch.counts) == 50
+    for entry in sketch.top_k(10):
+        true_count = exact[entry["keyword"]]
+        assert entry["count"] - entry["error"] <= true_count <= entry["count"]
+    assert [e["keyword"] for e in sketch.top_k(3)] == [
+        k for k, _ in exact.most_common(3)
+    ]
+
+
+def test_merge_matches_serial_pass():
+    stream = zipf_stream(5000, 300)
+    serial = SpaceSaving(capacity=1000)
+    serial.update(stream)
+
+    left, right = SpaceSaving(capacity=1000), SpaceSaving(capacity=1000)
+    left.update(stream[:2000])
+    right.update(stream[2000:])
+    merged = left.merge(right)
+
+    assert merged.total == serial.total
+    assert merged.top_k(20) == serial.top_k(20)
+
+
+def test_merge_keeps_error_bounds_when_full():
+    stream = zipf_stream(20000, 2000)
+    exact = Counter(stream)
+    left, right = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+    left.update(stream[:10000])
+    right.update(stream[10000:])
+    merged = left.merge(right)
+
+    assert len(merged.counts) == 50
+    for entry in merged.top_k(10):
+        true_count = exact[entry["keyword"]]
+        assert entry["count"] - entry["error"] <= true_count <= entry["count"]
+
+
+def test_token_shape_filter():
+    assert is_informative_token("CMediaTrackMgr::GetTrack")
+    assert is_informative_token("vid=1")
+    assert not is_informative_token("0x1cd0")
+    assert not is_informative_token("3691033875")
+    assert not is_informative_token("87fb628b-45d8-4b70-8af1-ea7a6a7d6270")
+    assert not is_informative_token("C:\\Users\\AppData")
+    assert not is_informative_token("::")
+
+
+def test_keywords_are_serializable_lists():
+    logs = [
+        {"level": "Info", "messages": ["join 0x1f = ok"]},
+        {"level": "Error", "messages": ["join 0x2f = failed"]},
+    ]
+
+    stats = get_simple_stats(logs)
+    assert stats["Most Common Keywords"] == ["join", "=", "0x1f", "ok", "0x2f"]
+    json.dumps(stats)
+
+    filtered = get_top_keywords(logs, stop_words={"ok"}, filter_token_shapes=True)
+    assert [e["keyword"] for e in filtered] == ["join", "failed"]
@@ -0,0 +1,86 @@
+import json
+import pytest
+from datetime import timedelta
+from utils import (
+    compute_log_stats,
+    compute_stats,
+    get_log_level_counts,
+    get_simple_stats,
+    stats_interval,
+)
+
+
+@pytest.fixture
+def logs():
+    return [
+        {
+            "timestamp": "2024-09-30T17:32:28.734Z",
+            "level": "Info",
+            "thread ID": "[0x720]",
+            "messages": ["MediaMain::mediaMain started"],
+        },
+        {
+            "timestamp": "2024-09-30T17:32:28.900Z",
+            "level": "Debug",
+            "thread ID": "[0x1cd0]",
+            "messages": ["RootLogger Adding blocklisted string"],
+        },
+        {
+            "timestamp": "2024-09-30T17:32:30.100Z",
+            "level": "Error",
+            "thread ID": "[0x720]",
+            "messages": ["CMediaTrackMgr::GetTrack No Track! vid=1"],
+        },
+        {
+            "timestamp": "2024-09-30T17:32:30.200Z",
+            "level": "Warn",
+            "thread ID": "[0x720]",
+            "messages": ["CMediaTrackMgr::GetTrack retrying", "vid=1"],
+        },
+    ]
+
+
+def test_compute_log_stats_matches_direct_computation(logs):
+    stored = compute_log_stats(logs)
+
+    level_stats = compute_stats(get_log_level_counts(logs))
+    assert stored["level_stats"] == json.loads(json.dumps(level_stats, default=str))
+    assert stored["level_stats"]["overall_total"] == 4
+    assert stored["level_stats"]["count_intervals"] == 2
+
+    simple_stats = get_simple_stats(logs)
+    assert stored["simple_stats"]["Error"] == simple_stats["Error"] == 1
+    assert stored["simple_stats"]["Most Common Keywords"] == list(
+        simple_stats["Most Common Keywords"]
+    )
+
+
+def test_long_logs_are_counted_in_coarser_buckets():
+    # One entry per second for two hours.
+    logs = [
+        {
+            "timestamp": f"2024-09-30T{17 + i // 3600}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "level": "Info",
+            "messages": ["tick"],
+        }
+        for i in range(7200)
+    ]
+
+    assert stats_interval(logs[:3600]) == timedelta(seconds=1)
+    assert stats_interval(logs) == timedelta(seconds=10)
+    stored = compute_log_stats(logs)
+    assert stored["level_stats"]["count_intervals"] == 720
+    assert stored["level_stats"]["overall_total"] == 7200
+
+
+def test_compute_log_stats_is_json_serializable(logs):
+    stored = compute_log_stats(logs)
+
+    assert json.loads(json.dumps(stored)) == stored
+
+
+def test_compute_log_stats_empty():
+    stored = compute_log_stats([])
+
+    assert stored["level_stats"]["overall_total"] == 0
+    assert stored["simple_stats"]["Most Common Keywords"] == []
@@ -2,6 +2,15 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 import json
 from typing import Any
+from sketch import DEFAULT_SKETCH_CAPACITY, SpaceSaving, is_informative_token
+from anomaly import detect_anomalies
+from histogram import LevelPyramid
+from keyword_index import KeywordIndex
+from log_table import EPOCH, LogTable
+
+# Bucket budget of the level statistics and anomaly detection. Logs spanning more
+# active seconds than this are counted in coarser buckets (see stats_interval).
+STATS_MAX_BUCKETS = 3600
 
 
 def load_logs() -> list[dict]:
@@ -14,13 +23,15 @@ def load_logs() -> list[dict]:
         return json.load(f)
 
 
-def get_log_level_counts(logs, interval=timedelta(seconds=1)):
+def get_log_level_counts(logs, interval=timedelta(seconds=1), start_time=None):
     """
     Group log level counts into time intervals.
 
     Args:
-        logs (list[dict]): List of log entries with 'timestamp' and 'level' fields.
+        logs (list[dict] | LogTable): List of log entries with 'timestamp' and 'level' fields.
         interval (timedelta, optional): Time bucket interval. Defaults to 1 second.
+        start_time (datetime | None, optional): Time the buckets are aligned to.
+            Defaults to the timestamp of the first log.
 
     Returns:
         defaultdict: Mapping of time buckets to dictionaries with log level counts.
@@ -29,7 +40,14 @@ def get_log_level_counts(logs, interval=timedelta(seconds=1)):
     summary = defaultdict(lambda: {"Debug": 0, "Info": 0, "Warn": 0, "Error": 0})
     if not logs:
         return summary
-    start_time = datetime.fromisoformat(logs[0]["timestamp"].replace("Z", "+00:00"))
+    if start_time is None:
+        start_time = datetime.fromisoformat(logs[0]["timestamp"].replace("Z", "+00:00"))
+    if (
+        isinstance(logs, LogTable)
+        and not logs.unparsed_timestamps
+        and start_time.tzinfo is not None
+    ):
+        return _table_level_counts(logs, interval, start_time, summary)
     for log in logs:
         log_time = datetime.fromisoformat(log["timestamp"].replace("Z", "+00:00"))
         bucket = start_time + ((log_time - start_time) // interval) * interval
@@ -37,6 +55,52 @@ def get_log_level_counts(logs, interval=timedelta(seconds=1)):
     return summary
 
 
+def stats_interval(
+    logs, max_buckets: int = STATS_MAX_BUCKETS, pyramid: LevelPyramid | None = None
+) -> timedelta:
+    """
+    Pick the bucket interval of the level statistics of a log.
+
+    The interval is the finest histogram resolution (1s, 10s, 1m, 10m, 1h) whose
+    non-empty buckets over the log fit 'max_buckets', so multi-day logs don't
+    produce hundreds of thousands of buckets for compute_stats and anomaly detection.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+        max_buckets (int, optional): Bucket budget. Defaults to STATS_MAX_BUCKETS.
+        pyramid (LevelPyramid | None, optional): Level pyramid of the logs, if it
+            is already built. Defaults to None (built from the logs).
+
+    Returns:
+        timedelta: The bucket interval.
+    """
+
+    if pyramid is None:
+        pyramid = LevelPyramid.from_logs(logs)
+    return timedelta(seconds=pyramid.pick_resolution(max_buckets=max_buckets))
+
+
+def _table_level_counts(table: LogTable, interval, start_time, summary):
+    """
+    get_log_level_counts over the timestamp and level columns of a LogTable.
+
+    Buckets are computed in integer microseconds, which gives the same buckets as
+    the datetime arithmetic of the generic path.
+    """
+
+    start_us = (start_time - EPOCH) // timedelta(microseconds=1)
+    interval_us = interval // timedelta(microseconds=1)
+    level_names = table.level_names
+    buckets: dict[int, datetime] = {}
+    for epoch_us, code in zip(table.timestamps, table.levels):
+        index = (epoch_us - start_us) // interval_us
+        bucket = buckets.get(index)
+        if bucket is None:
+            bucket = buckets[index] = start_time + index * interval
+        summary[bucket][level_names[code]] += 1
+    return summary
+
+
 def compute_stats(level_counts: dict[str, dict]):
     """
     Compute summary statistics from log level counts.
@@ -77,7 +141,8 @@ def extract_top_rows(logs, keywords, top_n=5):
     Extract up to 'top_n' log entries per category that match given keywords and are warnings or errors.
 
     Args:
-        logs (list[dict]): List of log entries.
+        logs (list[dict] | LogTable | KeywordIndex): List of log entries, or the
+            keyword index of a LogTable.
         keywords (dict): Mapping of category to list of keywords.
         top_n (int, optional): Maximum number of logs to extract per keyword. Defaults to 5.
 
@@ -89,48 +154,214 @@ def extract_top_rows(logs, keywords, top_n=5):
     for category, kw_list in keywords.items():
         extracted[category] = []
         for kw in kw_list:
-            count = 0
-            for log in logs:
-                message = log.get("messages", "")
-                if (
-                    message
-                    and any(kw in msg for msg in message)
-                    and log.get("level", "") in ["Error", "Warn"]
-                ):
-                    extracted[category].append(log)
-                    count += 1
-                    if count >= top_n:
-                        break
+            extracted[category].extend(find_keyword_rows(logs, kw, top_n))
     return extracted
 
 
-def get_simple_stats(logs):
+def find_keyword_rows(logs, kw, top_n=5):
+    """
+    Return the first 'top_n' warning or error log entries whose messages contain a keyword.
+
+    Args:
+        logs (list[dict] | LogTable | KeywordIndex): List of log entries, or the
+            keyword index of a LogTable.
+        kw (str): Keyword to look for (plain substring match).
+        top_n (int, optional): Maximum number of logs to return. Defaults to 5.
+
+    Returns:
+        list[dict]: Matching log entries in log order.
+    """
+
+    if isinstance(logs, (LogTable, KeywordIndex)):
+        matches = logs.find_rows(kw, levels=("Error", "Warn"), limit=top_n)
+        table = logs.table if isinstance(logs, KeywordIndex) else logs
+        return [table.row_dict(row) for row in matches]
+    rows = []
+    for log in logs:
+        message = log.get("messages", "")
+        if (
+            message
+            and any(kw in msg for msg in message)
+            and log.get("level", "") in ["Error", "Warn"]
+        ):
+            rows.append(log)
+            if len(rows) >= top_n:
+                break
+    return rows
+
+
+def get_top_keywords(
+    logs,
+    top_k=5,
+    capacity=DEFAULT_SKETCH_CAPACITY,
+    stop_words=None,
+    filter_token_shapes=False,
+):
+    """
+    Find the most common whitespace-delimited keywords using a bounded-memory sketch.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+        top_k (int, optional): Number of keywords to return. Defaults to 5.
+        capacity (int, optional): Number of keywords tracked by the sketch. Defaults to 1024.
+        stop_words (set[str] | None, optional): Keywords to ignore. Defaults to None.
+        filter_token_shapes (bool, optional): Ignore numbers, hex IDs, UUIDs and paths. Defaults to False.
+
+    Returns:
+        list[dict]: Keywords as {"keyword", "count", "error"}, most common first. The
+        true count of each keyword lies in [count - error, count].
+    """
+
+    return keyword_sketch(logs, capacity, stop_words, filter_token_shapes).top_k(top_k)
+
+
+def keyword_sketch(
+    logs,
+    capacity=DEFAULT_SKETCH_CAPACITY,
+    stop_words=None,
+    filter_token_shapes=False,
+):
+    """
+    Build a Space-Saving sketch of the keywords in the log messages.
+
+    Sketches built over different parts of a log can be combined with SpaceSaving.merge.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+        capacity (int, optional): Number of keywords tracked by the sketch. Defaults to 1024.
+        stop_words (set[str] | None, optional): Keywords to ignore. Defaults to None.
+        filter_token_shapes (bool, optional): Ignore numbers, hex IDs, UUIDs and paths. Defaults to False.
+
+    Returns:
+        SpaceSaving: The keyword sketch.
+    """
+
+    sketch = SpaceSaving(capacity)
+    if isinstance(logs, LogTable):
+        message_lists = logs.iter_messages()
+    else:
+        message_lists = (log["messages"] for log in logs)
+    for messages in message_lists:
+        for message in messages:
+            words = message.split()
+            if stop_words:
+                words = [word for word in words if word not in stop_words]
+            if filter_token_shapes:
+                words = [word for word in words if is_informative_token(word)]
+            sketch.update(words)
+    return sketch
+
+
+def count_levels(logs) -> dict[str, int]:
+    """
+    Count the log entries of each level.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+
+    Returns:
+        dict: Counts for "Debug", "Info", "Warn" and "Error".
+
+    Raises:
+        KeyError: If a log has any other level.
+    """
+
+    counts = {"Debug": 0, "Info": 0, "Warn": 0, "Error": 0}
+    if isinstance(logs, LogTable):
+        for level, count in logs.level_counts().items():
+            counts[level] += count
+        return counts
+    for log in logs:
+        counts[log["level"]] += 1
+    return counts
+
+
+def get_simple_stats(logs, **keyword_options):
     """
     Compute overall log level counts and identify the most common keywords.
 
     Args:
-        logs (list[dict]): List of log entries.
+        logs (list[dict] | LogTable): List of log entries.
+        **keyword_options: Options forwarded to get_top_keywords (capacity, stop_words,
+            filter_token_shapes).
 
     Returns:
-        dict: Dictionary with overall counts for each log level and top 5 common keywords.
+        dict: Dictionary with overall counts for each log level and a list of the top 5 common keywords.
     """
 
     # this will simply compute stats like most log level counts, most common keywords, etc.
     # COMPUTE LEVEL COUNTS (not per interval, just overall)
-    stats: dict[str, Any] = {"Debug": 0, "Info": 0, "Warn": 0, "Error": 0}
-    for log in logs:
-        stats[log["level"]] += 1
+    stats: dict[str, Any] = count_levels(logs)
     # COMPUTE MOST COMMON KEYWORDS
-    keywords = defaultdict(int)
-    for log in logs:
-        for message in log["messages"]:
-            for word in message.split():
-                keywords[word] += 1
-    most_common = sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:5]
-    stats["Most Common Keywords"] = map(lambda x: x[0], most_common)
+    most_common = get_top_keywords(logs, top_k=5, **keyword_options)
+    stats["Most Common Keywords"] = [entry["keyword"] for entry in most_common]
     return stats
 
 
+def compute_log_stats(logs) -> dict[str, Any]:
+    """
+    Compute the per-log statistics used by the chat agent in a JSON-safe form.
+
+    This is meant to be run once at ingest so that chat requests can reuse the
+    result instead of rescanning the whole log on every message.
+
+    Args:
+        logs (list[dict] | LogTable): List of log entries.
+
+    Returns:
+        dict: Dictionary with 'level_stats' (the output of compute_stats over buckets
+        of stats_interval), 'simple_stats' (the output of get_simple_stats), 'top_keywords'
+        (the output of get_top_keywords with counts and error bounds) and 'anomalies'
+        (the output of anomaly.detect_anomalies).
+    """
+
+    interval = stats_interval(logs)
+    level_counts = get_log_level_counts(logs, interval)
+    level_stats = compute_stats(level_counts)
+    simple_stats = get_simple_stats(logs)
+    top_keywords = get_top_keywords(logs, top_k=20, filter_token_shapes=True)
+    return to_json_safe(
+        {
+            "level_stats": level_stats,
+            "simple_stats": simple_stats,
+            "top_keywords": top_keywords,
+            "anomalies": detect_anomalies(level_counts, logs, interval),
+        }
+    )
+
+
+def build_bulk_actions(
+    logs: list[dict], index: str, start: int = 0
+) -> list[dict[str, Any]]:
+    """
+    Build the Elasticsearch bulk actions indexing each log under its position as the id.
+
+    Args:
+        logs (list[dict]): List of log entries (with or without embeddings).
+        index (str): Target index name.
+        start (int, optional): Position of the first log, for batches of a larger
+            log. Defaults to 0.
+
+    Returns:
+        list[dict]: One action per log for elasticsearch.helpers.bulk.
+    """
+
+    return [
+        {"_index": index, "_id": start + i, "_source": log}
+        for i, log in enumerate(logs)
+    ]
+
+
+def to_json_safe(value: Any) -> Any:
+    """
+    Convert a value to plain JSON types, turning datetimes and other objects into strings.
+
+    Buckets end up as the same strings the prompts show (json.dumps with default=str).
+    """
+
+    return json.loads(json.dumps(value, default=str))
+
+
 def clean_response_content(response_content: str) -> str:
     """
     Remove markdown code block markers from the response content.